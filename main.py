@@ -2,79 +2,1081 @@
 Main file/entry point to orchestrate the Investment Company Classifier.
 """
 
+import argparse
+import json
 import logging
+import os
+import sys
 import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
+from src.batch import batch_output_name, resolve_inputs
+from src.checkpoints import CheckpointingSink, CheckpointStore, run_fingerprint
 from src.classifier import ClassificationEngine
 from src.config import config
-from src.data_loader import DataLoader
+from src.data_loader import DataLoader, RowFilter
+from src.enrichment import Enricher, enrichment_fingerprints
+from src.exceptions import ImproperlyConfiguredException
+from src.pipeline import ClassificationPipeline
+from src.polars_backend import (
+    PolarsClassificationEngine,
+    resolve_dataframe_backend,
+)
+from src.result_sinks import (
+    CsvResultSink,
+    JsonLinesResultSink,
+    create_result_sink,
+)
+from src.rule_cache import RuleResultCache
+from src.sampling import ReservoirSampler, pass_rates, sample_size_for
+from src.sharding import (
+    ShardSelector,
+    input_fingerprint,
+    merge_shards,
+    parse_shard,
+    shard_output_filename,
+    write_manifest,
+)
+from src.sqlite_source import SQLiteCompanySource
+from src.utils.logging_utils import RunSummary
+from src.utils.profiling import StageProfiler
+from src.watcher import DirectoryWatcher, FileLedger
 
+# Instantiate logger for this file/module
+logger = logging.getLogger(__name__)
 
-def main():
-    # Instantiate logger for this file/module
-    logger = logging.getLogger(__name__)
 
-    # Start function initial timer
-    start_time = time.time()
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive number")
+    return number
 
-    # Get configuration params
-    logger.info("Loading configuration data...")
 
-    data_sanitizing_strategy = config.get(
-        "application.data_sanitizing_strategy"
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Parse the command line arguments.
+    Without a command, the dataset is classified.
+
+    :param argv: The command line arguments, defaults to `sys.argv`.
+    :return: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.set_defaults(
+        command="classify",
+        shard=None,
+        sample=None,
+        resume=False,
+        profile=False,
+        limit=None,
     )
+    subparsers = parser.add_subparsers(dest="command")
+    # `dest` would otherwise reset the command to None
+    subparsers.default = "classify"
 
-    classification_engine = (
-        config.get("application.classification_engine") or "static"
+    classify_parser = subparsers.add_parser(
+        "classify", help="Classify the configured dataset."
+    )
+    classify_parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        metavar="i/N",
+        help="Only classify the i-th of N deterministic shards of the rows.",
+    )
+    classify_parser.add_argument(
+        "--sample",
+        type=positive_int,
+        nargs="?",
+        const=0,
+        metavar="SIZE",
+        help=(
+            "Estimate the pass rate of each rule on a random sample of SIZE "
+            "rows, defaults to the sampling section of config.yaml."
+        ),
+    )
+    classify_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "Profile the CPU time and peak memory of each stage, and write "
+            "the report to the output directory."
+        ),
+    )
+    classify_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "Resume an interrupted run from its checkpoints, skipping the "
+            "chunks already classified."
+        ),
+    )
+    classify_parser.add_argument(
+        "--limit",
+        type=positive_int,
+        metavar="N",
+        help=(
+            "Stop reading the input once N interesting companies were "
+            "found, requires a pipeline.chunk_size."
+        ),
     )
 
-    base_dir = str(Path(__file__).cwd()) + "/"
-    input_base_path = base_dir + config.get(
-        "data_sources.input_base_path", "data/input/"
+    subparsers.add_parser(
+        "merge", help="Combine the outputs of all shards of the dataset."
+    )
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="Classify many datasets with a single engine."
     )
-    output_base_path = base_dir + config.get(
-        "data_sources.output_base_path", "data/output/"
+    batch_parser.add_argument(
+        "inputs",
+        nargs="*",
+        metavar="INPUT",
+        help="Dataset paths or globs, relative to the input directory.",
+    )
+    batch_parser.add_argument(
+        "--manifest",
+        metavar="FILE",
+        help="A file listing more dataset paths or globs, one per line.",
+    )
+    batch_parser.add_argument(
+        "--workers",
+        type=positive_int,
+        metavar="N",
+        help=(
+            "Number of datasets classified concurrently, defaults to the "
+            "batch section of config.yaml."
+        ),
     )
-    input_filename = config.get("data_sources.input_filename")
 
-    # Load data
-    logger.info("Loading dataset...")
-    logger.info(f"Dataset name: {input_filename}...")
-    data_loader = DataLoader(data_sanitizing_strategy)
-    companies_df = data_loader.load_companies(
-        f"{input_base_path}{input_filename}"
+    watch_parser = subparsers.add_parser(
+        "watch", help="Classify every new dataset of the input directory."
+    )
+    watch_parser.add_argument(
+        "--interval",
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Seconds between two polls of the input directory, defaults to "
+            "the watch section of config.yaml."
+        ),
+    )
+    watch_parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Classify the datasets waiting in the input directory and exit.",
     )
 
-    # Initialize classifier
-    logger.info("Creating Classifier engine...")
-    classifier = ClassificationEngine()
-
-    # Classify companies
-    logger.info("Classification initiated...")
-    logger.info(f"Engine selected: {classification_engine}")
-    results_df = classifier.classify(classification_engine, companies_df)
-
-    # Convert to DataFrame and save
-    logger.info("Classification completed...")
-    logger.info("Saving results...")
-    filename = (
-        "parsed"
+    stream_parser = subparsers.add_parser(
+        "stream",
+        help="Classify JSON Lines records, writing the results to stdout.",
+    )
+    stream_parser.add_argument(
+        "input",
+        nargs="?",
+        default="-",
+        help="A JSON Lines file, or - to read stdin (default).",
+    )
+    stream_parser.add_argument(
+        "--batch-size",
+        type=int,
+        metavar="RECORDS",
+        help=(
+            "Records classified at once, defaults to the streaming section "
+            "of config.yaml."
+        ),
+    )
+    stream_parser.add_argument(
+        "--limit",
+        type=positive_int,
+        metavar="N",
+        help=(
+            "Stop reading the input once N interesting companies were found."
+        ),
+    )
+    return parser.parse_args(argv)
+
+
+def output_filename(input_filename: str, prefix: str = "parsed") -> str:
+    return (
+        prefix
         + "_"
         + datetime.now().strftime("%Y%m%d-%H%M%S")
         + "_"
         + input_filename
     )
 
-    # Get final timer and calculate duration
-    ending_time = time.time()
-    duration = ending_time - start_time
 
-    results_df.to_csv(f"{output_base_path}{filename}", index=False)
-    logger.info("Process completed!")
-    logger.info(f"File created: {filename}")
-    logger.info(f"Classification process duration: {duration:.2f}")
+def output_sink(output_base_path: str, filename: str):
+    """
+    Create the sink receiving the final results, with the configured format.
+
+    :param output_base_path: The output directory.
+    :param filename: The output file name.
+    :return: A result sink.
+    """
+    return create_result_sink(
+        config.get("output.format", "csv"),
+        f"{output_base_path}{filename}",
+        id_column=config.get("output.id_column"),
+        sqlite_path=config.get("output.sqlite_path"),
+    )
+
+
+def load_settings() -> dict:
+    """
+    Read the configuration params shared by the commands.
+
+    :return: A dictionary with the settings.
+    """
+    logger.debug("Loading configuration data...")
+    base_dir = str(Path(__file__).cwd()) + "/"
+    return {
+        "data_sanitizing_strategy": config.get(
+            "application.data_sanitizing_strategy"
+        ),
+        "classification_engine": (
+            config.get("application.classification_engine") or "static"
+        ),
+        "evaluation_strategy": config.get(
+            "application.evaluation_strategy", "factorized"
+        ),
+        "numeric_backend": config.get("application.numeric_backend", "numpy"),
+        "dataframe_backend": resolve_dataframe_backend(
+            config.get("application.dataframe_backend", "pandas")
+        ),
+        "input_base_path": base_dir
+        + config.get("data_sources.input_base_path", "data/input/"),
+        "output_base_path": base_dir
+        + config.get("data_sources.output_base_path", "data/output/"),
+        "input_filename": config.get("data_sources.input_filename"),
+        "source_type": config.get("data_sources.type", "csv"),
+        "sqlite_path": base_dir
+        + config.get("data_sources.sqlite_path", "data/input/companies.db"),
+        "sqlite_table": config.get("data_sources.sqlite_table", "companies"),
+        "chunk_size": config.get("pipeline.chunk_size", 0),
+        "rule_cache_path": (
+            base_dir + config.get("rule_cache.path", "data/cache/rules/")
+            if config.get("rule_cache.enabled", False)
+            else None
+        ),
+    }
+
+
+def create_enricher(
+    settings: dict, classifier: ClassificationEngine
+) -> Optional[Enricher]:
+    """
+    Create the enricher joining the sources declared in `rules.yaml`, with
+    the fields referenced by the dynamic rules.
+
+    :param settings: The settings returned by `load_settings`.
+    :param classifier: The classifier holding the dynamic rules.
+    :return: An Enricher, or None when no enrichment is needed.
+    """
+    rules_manager = classifier.rule_processor.rules_manager
+    if (
+        settings["classification_engine"] != "dynamic"
+        or not rules_manager.enrichments
+    ):
+        return None
+
+    rules = classifier.rule_processor.parse_rules()
+    if not isinstance(rules, list):
+        rules = [rules]
+    base_dir = str(Path(__file__).cwd()) + "/"
+    return Enricher.from_rules(
+        rules_manager.enrichments,
+        [field for rule in rules for field in rule.fields],
+        cache_path=base_dir
+        + config.get("enrichment.cache_path", "data/cache/"),
+    )
+
+
+def create_engines(settings: dict, summary: RunSummary):
+    """
+    Create the classifier and the data loader.
+
+    :param settings: The settings returned by `load_settings`.
+    :param summary: The run summary.
+    :return: A tuple with the classifier and the data loader.
+    """
+    logger.debug("Creating Classifier engine...")
+    with summary.stage("setup"):
+        classifier = ClassificationEngine(
+            settings["evaluation_strategy"], settings["numeric_backend"]
+        )
+        data_loader = DataLoader(
+            settings["data_sanitizing_strategy"],
+            enricher=create_enricher(settings, classifier),
+        )
+    classifier.profiler = summary.profiler
+    if (
+        settings["rule_cache_path"]
+        and settings["classification_engine"] == "dynamic"
+    ):
+        classifier.rule_cache = RuleResultCache(settings["rule_cache_path"])
+    return classifier, data_loader
+
+
+def set_rule_cache_summary(
+    classifier: ClassificationEngine, summary: RunSummary
+) -> None:
+    if classifier.rule_cache is not None:
+        summary.set(
+            rule_cache={
+                "hits": classifier.rule_cache.hits,
+                "misses": classifier.rule_cache.misses,
+            }
+        )
+
+
+def create_sqlite_source(
+    settings: dict, classifier: ClassificationEngine
+) -> SQLiteCompanySource:
+    """
+    Create the SQLite source, pushing the dynamic rules that can be
+    evaluated by SQLite into its query.
+
+    :param settings: The settings returned by `load_settings`.
+    :param classifier: The classifier holding the dynamic rules.
+    :return: A SQLite source.
+    """
+    rules = []
+    if settings["classification_engine"] == "dynamic":
+        rules = classifier.rule_processor.parse_rules()
+        if not isinstance(rules, list):
+            rules = [rules]
+    return SQLiteCompanySource(
+        settings["sqlite_path"],
+        settings["sqlite_table"],
+        rules,
+        sanitizing_strategy=settings["data_sanitizing_strategy"],
+    )
+
+
+def create_checkpoint_store(
+    settings: dict,
+    classifier: ClassificationEngine,
+    shard: Optional[tuple],
+    source: Optional[SQLiteCompanySource],
+) -> CheckpointStore:
+    """
+    Create the checkpoint store of a run, identified by the fingerprint of
+    its input, its rules, its enrichment sources and the settings shaping
+    its chunks.
+
+    :param settings: The settings returned by `load_settings`.
+    :param classifier: The classifier holding the dynamic rules.
+    :param shard: The shard index and count, if any.
+    :param source: The SQLite source, if any.
+    :return: A checkpoint store.
+    """
+    if not settings["chunk_size"]:
+        raise ImproperlyConfiguredException(
+            message="Checkpoints require a pipeline.chunk_size.",
+            parameter_name="pipeline.chunk_size",
+        )
+
+    if source:
+        input_description = {
+            "path": source.db_path,
+            "file": input_fingerprint(source.db_path),
+            "query": source.query,
+            "params": source.params,
+        }
+    else:
+        input_path = (
+            f"{settings['input_base_path']}{settings['input_filename']}"
+        )
+        input_description = {
+            "path": input_path,
+            "file": input_fingerprint(input_path),
+        }
+
+    rules = None
+    enrichments = None
+    if settings["classification_engine"] == "dynamic":
+        rules_manager = classifier.rule_processor.rules_manager
+        rules = rules_manager.rules
+        # Chunks joined against a modified source are not resumed
+        enrichments = enrichment_fingerprints(rules_manager.enrichments)
+    fingerprint = run_fingerprint(
+        input=input_description,
+        rules=rules,
+        enrichments=enrichments,
+        shard=shard,
+        output_format=config.get("output.format", "csv"),
+        **{
+            key: settings[key]
+            for key in (
+                "classification_engine",
+                "data_sanitizing_strategy",
+                "dataframe_backend",
+                "chunk_size",
+            )
+        },
+    )
+    return CheckpointStore(settings["output_base_path"], fingerprint)
+
+
+def create_pipeline(
+    settings: dict, classifier: ClassificationEngine, summary: RunSummary
+) -> ClassificationPipeline:
+    return ClassificationPipeline(
+        classifier,
+        settings["classification_engine"],
+        read_queue_size=config.get("pipeline.read_queue_size", 2),
+        write_queue_size=config.get("pipeline.write_queue_size", 2),
+        profiler=summary.profiler,
+    )
+
+
+def set_limit_summary(
+    pipeline: ClassificationPipeline,
+    total_rows: Optional[int],
+    limit: Optional[int],
+    summary: RunSummary,
+) -> None:
+    if limit:
+        summary.set(
+            limit=limit,
+            limit_reached=pipeline.limit_reached,
+            interesting_rows=pipeline.interesting_rows,
+            scanned_rows=total_rows,
+        )
+
+
+def run_polars_classification(
+    settings: dict,
+    classifier: ClassificationEngine,
+    data_loader: DataLoader,
+    sink,
+    summary: RunSummary,
+    input_path: str,
+    skip_chunks: int = 0,
+    limit: Optional[int] = None,
+) -> int:
+    """
+    Classify a CSV dataset with the Polars backend, in chunks when
+    `chunk_size` is set.
+
+    :param settings: The settings returned by `load_settings`.
+    :param classifier: The classifier.
+    :param data_loader: The data loader, providing the enrichment sources.
+    :param sink: The result sink.
+    :param summary: The run summary timing the stages.
+    :param input_path: The CSV dataset path.
+    :param skip_chunks: The number of leading chunks already classified.
+    :param limit: An optional number of interesting companies to find.
+    :return: The number of classified rows.
+    """
+    engine = PolarsClassificationEngine(
+        classifier,
+        settings["data_sanitizing_strategy"],
+        enricher=data_loader.enricher,
+    )
+    chunk_size = settings["chunk_size"]
+    if chunk_size:
+        logger.debug("Polars classification in chunks of %d", chunk_size)
+        pipeline = create_pipeline(settings, engine, summary)
+        chunks = engine.iter_companies(
+            input_path, chunk_size, skip_chunks=skip_chunks
+        )
+        with summary.stage("pipeline"):
+            total_rows = pipeline.run(chunks, sink, limit=limit)
+        set_limit_summary(pipeline, total_rows, limit, summary)
+        return total_rows
+
+    # The scan, sanitizing and rules run as a single Polars query
+    with summary.stage("classify"):
+        results_df = engine.classify(
+            settings["classification_engine"], engine.scan(input_path)
+        )
+    with summary.stage("write"):
+        sink.write(results_df)
+        sink.close()
+    return len(results_df)
+
+
+def run_classification(
+    settings: dict,
+    classifier: ClassificationEngine,
+    data_loader: DataLoader,
+    sink,
+    summary: RunSummary,
+    input_path: Optional[str] = None,
+    row_filter: Optional[RowFilter] = None,
+    source: Optional[SQLiteCompanySource] = None,
+    skip_chunks: int = 0,
+    limit: Optional[int] = None,
+) -> int:
+    """
+    Classify a dataset and write the results to a sink, in chunks when
+    `chunk_size` is set.
+
+    :param settings: The settings returned by `load_settings`.
+    :param classifier: The classifier.
+    :param data_loader: The data loader.
+    :param sink: The result sink.
+    :param summary: The run summary timing the stages.
+    :param input_path: The CSV dataset path, unless reading from `source`.
+    :param row_filter: An optional callable selecting the CSV rows.
+    :param source: An optional SQLite source replacing the CSV dataset.
+    :param skip_chunks: The number of leading chunks already classified.
+    :param limit: An optional number of interesting companies to find,
+            stopping the run once they are found.
+    :return: The number of classified rows.
+    """
+    classification_engine = settings["classification_engine"]
+    chunk_size = settings["chunk_size"]
+    if limit and not chunk_size:
+        raise ImproperlyConfiguredException(
+            message="--limit requires a pipeline.chunk_size.",
+            parameter_name="pipeline.chunk_size",
+        )
+    if settings["dataframe_backend"] == "polars":
+        if source or row_filter:
+            raise ImproperlyConfiguredException(
+                message=(
+                    "The polars backend only classifies whole CSV datasets."
+                ),
+                parameter_name="application.dataframe_backend",
+            )
+        return run_polars_classification(
+            settings,
+            classifier,
+            data_loader,
+            sink,
+            summary,
+            input_path,
+            skip_chunks=skip_chunks,
+            limit=limit,
+        )
+
+    if chunk_size:
+        # Overlap reading, classifying and writing the dataset's chunks
+        logger.debug("Classification initiated in chunks of %d", chunk_size)
+        pipeline = create_pipeline(settings, classifier, summary)
+        if source:
+            chunks = data_loader.iter_sqlite_companies(
+                source, chunk_size, skip_chunks=skip_chunks
+            )
+        else:
+            chunks = data_loader.iter_companies(
+                input_path,
+                chunk_size,
+                row_filter=row_filter,
+                skip_chunks=skip_chunks,
+            )
+        with summary.stage("pipeline"):
+            total_rows = pipeline.run(chunks, sink, limit=limit)
+        set_limit_summary(pipeline, total_rows, limit, summary)
+    else:
+        # Load data
+        logger.debug("Loading dataset %s...", input_path)
+        with summary.stage("load"):
+            if source:
+                companies_df = data_loader.load_sqlite_companies(source)
+            else:
+                companies_df = data_loader.load_companies(
+                    input_path, row_filter=row_filter
+                )
+
+        # Classify companies
+        logger.debug("Classification initiated...")
+        with summary.stage("classify"):
+            results_df = classifier.classify(
+                classification_engine, companies_df
+            )
+        total_rows = len(results_df)
+
+        # Convert to DataFrame and save
+        logger.debug("Saving results...")
+        with summary.stage("write"):
+            sink.write(results_df)
+            sink.close()
+    return total_rows
+
+
+def classify(args: argparse.Namespace, summary: RunSummary) -> None:
+    settings = load_settings()
+    classification_engine = settings["classification_engine"]
+    output_base_path = settings["output_base_path"]
+    input_filename = settings["input_filename"]
+    input_path = f"{settings['input_base_path']}{input_filename}"
+    chunk_size = settings["chunk_size"]
+
+    from_sqlite = settings["source_type"] == "sqlite"
+    if from_sqlite:
+        # Name the outputs after the table
+        input_filename = f"{settings['sqlite_table']}.csv"
+        if args.shard:
+            raise ImproperlyConfiguredException(
+                message="Shards can only be classified from CSV inputs.",
+                parameter_name="data_sources.type",
+            )
+    elif settings["source_type"] != "csv":
+        raise ImproperlyConfiguredException(
+            message=f"Unknown data source type: {settings['source_type']}",
+            parameter_name="data_sources.type",
+        )
+    if args.limit and (args.shard or args.resume):
+        raise ImproperlyConfiguredException(
+            message="--limit cannot be combined with --shard or --resume.",
+            parameter_name="limit",
+        )
+
+    shard_selector = None
+    row_filter = None
+    if args.shard:
+        shard_selector = ShardSelector(*args.shard)
+        row_filter = shard_selector.select
+        filename = shard_output_filename(input_filename, *args.shard)
+        summary.set(shard=f"{args.shard[0]}/{args.shard[1]}")
+    else:
+        filename = output_filename(input_filename)
+    summary.set(
+        input=input_filename,
+        engine=classification_engine,
+        evaluation_strategy=settings["evaluation_strategy"],
+        numeric_backend=settings["numeric_backend"],
+        dataframe_backend=settings["dataframe_backend"],
+        chunk_size=chunk_size,
+    )
+
+    # Initialize classifier
+    classifier, data_loader = create_engines(settings, summary)
+
+    source = None
+    if from_sqlite:
+        # Only fetch the rows that can pass the rules pushed into the query
+        source = create_sqlite_source(settings, classifier)
+        summary.set(pushed_rules=source.pushed_rule_ids)
+
+    checkpoint_store = None
+    # A limited run stops early, its output is never resumed
+    if args.resume or (
+        config.get("checkpoint.enabled", False) and not args.limit
+    ):
+        checkpoint_store = create_checkpoint_store(
+            settings, classifier, args.shard, source
+        )
+        checkpoint_store.start(filename, resume=args.resume)
+        # A resumed run completes the output of the interrupted run
+        filename = checkpoint_store.output
+
+    if args.shard:
+        # Shards always write CSV partial outputs, combined by `merge`
+        sink = CsvResultSink(f"{output_base_path}{filename}")
+    else:
+        sink = output_sink(output_base_path, filename)
+
+    replayed_rows = 0
+    if checkpoint_store:
+        with summary.stage("replay"):
+            replayed_rows = checkpoint_store.replay(sink)
+        summary.set(resumed_chunks=checkpoint_store.completed_chunks)
+        sink = CheckpointingSink(sink, checkpoint_store)
+
+    total_rows = replayed_rows + run_classification(
+        settings,
+        classifier,
+        data_loader,
+        sink,
+        summary,
+        input_path=input_path,
+        row_filter=row_filter,
+        source=source,
+        skip_chunks=(
+            checkpoint_store.completed_chunks if checkpoint_store else 0
+        ),
+        limit=args.limit,
+    )
+
+    if checkpoint_store:
+        # The output is complete, the checkpoints are no longer needed
+        checkpoint_store.clear()
+
+    if shard_selector:
+        manifest_path = write_manifest(
+            output_base_path,
+            input_path,
+            Path(sink.path).name,
+            shard_selector,
+            total_rows,
+            classification_engine,
+        )
+        summary.set(manifest=manifest_path.name)
+
+    if source:
+        summary.set(
+            source_rows=source.count_rows(), fetched_rows=source.fetched_rows
+        )
+
+    summary.set(rows=total_rows, output=Path(sink.path).name)
+    set_rule_cache_summary(classifier, summary)
+
+
+def sample(args: argparse.Namespace, summary: RunSummary) -> None:
+    if args.shard or args.limit or args.resume:
+        raise ImproperlyConfiguredException(
+            message=(
+                "--sample cannot be combined with --shard, --limit or "
+                "--resume."
+            ),
+            parameter_name="sample",
+        )
+    settings = load_settings()
+    if settings["source_type"] != "csv":
+        raise ImproperlyConfiguredException(
+            message="Samples can only be drawn from CSV inputs.",
+            parameter_name="data_sources.type",
+        )
+    if settings["dataframe_backend"] != "pandas":
+        raise ImproperlyConfiguredException(
+            message="Samples can only be classified by the pandas backend.",
+            parameter_name="application.dataframe_backend",
+        )
+    classification_engine = settings["classification_engine"]
+    input_filename = settings["input_filename"]
+
+    confidence = config.get("sampling.confidence", 0.95)
+    sample_size = args.sample or config.get("sampling.size", 0)
+    if not sample_size:
+        sample_size = sample_size_for(
+            config.get("sampling.target_error", 0.01), confidence
+        )
+    summary.set(
+        input=input_filename,
+        engine=classification_engine,
+        sample_size=sample_size,
+    )
+
+    classifier, data_loader = create_engines(settings, summary)
+
+    logger.debug(
+        "Sampling %d companies from %s...", sample_size, input_filename
+    )
+    sampler = ReservoirSampler(sample_size, seed=config.get("sampling.seed"))
+    with summary.stage("sample"):
+        companies_df = data_loader.sample_companies(
+            f"{settings['input_base_path']}{input_filename}",
+            sampler,
+            settings["chunk_size"] or 50000,
+        )
+
+    with summary.stage("classify"):
+        results_df = classifier.classify(classification_engine, companies_df)
+
+    report_df = pass_rates(results_df, confidence, sampler.seen_rows)
+    filename = output_filename(input_filename, prefix="sample")
+    report_df.to_csv(f"{settings['output_base_path']}{filename}", index=False)
+
+    summary.set(
+        rows=sampler.seen_rows,
+        sampled_rows=len(results_df),
+        confidence=confidence,
+        pass_rates={
+            rule["rule_id"]: [
+                rule["ci_lower"],
+                rule["pass_rate"],
+                rule["ci_upper"],
+            ]
+            for rule in report_df.to_dict("records")
+        },
+        output=filename,
+    )
+
+
+def merge(args: argparse.Namespace, summary: RunSummary) -> None:
+    settings = load_settings()
+    output_base_path = settings["output_base_path"]
+    input_filename = settings["input_filename"]
+    sink = output_sink(output_base_path, output_filename(input_filename))
+
+    logger.debug("Merging the shards of %s...", input_filename)
+    with summary.stage("merge"):
+        total_rows = merge_shards(output_base_path, input_filename, sink)
+
+    summary.set(
+        input=input_filename, rows=total_rows, output=Path(sink.path).name
+    )
+
+
+def classify_batch_input(
+    settings: dict,
+    classifier: ClassificationEngine,
+    data_loader: DataLoader,
+    input_path: Path,
+) -> dict:
+    """
+    Classify one dataset of a batch into its own output.
+    Failures are reported in the summary instead of stopping the batch.
+
+    :param settings: The settings returned by `load_settings`.
+    :param classifier: The classifier shared by the batch.
+    :param data_loader: The data loader shared by the batch.
+    :param input_path: The dataset path.
+    :return: The summary of the dataset.
+    """
+    file_summary = RunSummary("batch")
+    name = batch_output_name(input_path, settings["input_base_path"])
+    sink = output_sink(settings["output_base_path"], output_filename(name))
+    file_summary.set(input=str(input_path), output=Path(sink.path).name)
+    rule_cache = classifier.rule_cache
+    if rule_cache is not None:
+        hits, misses = rule_cache.hits, rule_cache.misses
+    try:
+        total_rows = run_classification(
+            settings,
+            classifier,
+            data_loader,
+            sink,
+            file_summary,
+            input_path=str(input_path),
+        )
+        file_summary.set(status="completed", rows=total_rows)
+    except Exception as e:
+        logger.exception("Failed to classify %s", input_path)
+        file_summary.set(status="failed", error=str(e))
+    if rule_cache is not None:
+        # The engine outlives the dataset, only count its own lookups
+        file_summary.set(
+            rule_cache={
+                "hits": rule_cache.hits - hits,
+                "misses": rule_cache.misses - misses,
+            }
+        )
+    return file_summary.emit(logger)
+
+
+# The engines of a batch worker process, created by `init_batch_worker`
+_batch_worker = {}
+
+
+def init_batch_worker(settings: dict) -> None:
+    """
+    Create the engines of a batch worker process, which stay warm for every
+    dataset classified by the process.
+
+    :param settings: The settings returned by `load_settings`.
+    :return: None
+    """
+    classifier, data_loader = create_engines(settings, RunSummary("batch"))
+    _batch_worker.update(
+        settings=settings, classifier=classifier, data_loader=data_loader
+    )
+
+
+def classify_in_batch_worker(input_path: Path) -> dict:
+    """
+    Classify one dataset of a batch with the engines of the worker process.
+
+    :param input_path: The dataset path.
+    :return: The summary of the dataset.
+    """
+    return classify_batch_input(
+        _batch_worker["settings"],
+        _batch_worker["classifier"],
+        _batch_worker["data_loader"],
+        input_path,
+    )
+
+
+def batch(args: argparse.Namespace, summary: RunSummary) -> None:
+    settings = load_settings()
+    inputs = resolve_inputs(
+        args.inputs, settings["input_base_path"], args.manifest
+    )
+    workers = args.workers or config.get("batch.workers", 4)
+    if not isinstance(workers, int) or workers < 1:
+        raise ImproperlyConfiguredException(
+            message="The batch workers must be a positive number.",
+            parameter_name="batch.workers",
+        )
+    # Every worker process loads the engine once, idle workers are not
+    # worth their setup
+    workers = max(1, min(workers, len(inputs)))
+    summary.set(
+        engine=settings["classification_engine"],
+        inputs=len(inputs),
+        workers=workers,
+    )
+
+    logger.debug("Classifying %d datasets...", len(inputs))
+    with summary.stage("batch"):
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_batch_worker,
+            initargs=(settings,),
+        ) as executor:
+            file_summaries = list(
+                executor.map(classify_in_batch_worker, inputs)
+            )
+
+    summary_filename = output_filename("summary.json", prefix="batch")
+    summary.set(
+        rows=sum(file.get("rows", 0) for file in file_summaries),
+        failed=[
+            file["input"]
+            for file in file_summaries
+            if file["status"] == "failed"
+        ],
+        output=summary_filename,
+    )
+    rule_caches = [
+        file["rule_cache"] for file in file_summaries if "rule_cache" in file
+    ]
+    if rule_caches:
+        summary.set(
+            rule_cache={
+                key: sum(rule_cache[key] for rule_cache in rule_caches)
+                for key in ("hits", "misses")
+            }
+        )
+    with open(
+        f"{settings['output_base_path']}{summary_filename}", "w"
+    ) as file:
+        json.dump(
+            {**summary.as_dict(), "files": file_summaries},
+            file,
+            indent=2,
+            default=str,
+        )
+
+
+def watch(args: argparse.Namespace, summary: RunSummary) -> None:
+    settings = load_settings()
+    output_base_path = settings["output_base_path"]
+    interval = args.interval or config.get("watch.poll_interval", 5)
+    summary.set(
+        input=settings["input_base_path"],
+        engine=settings["classification_engine"],
+    )
+
+    # The engine is created once and stays warm between datasets
+    classifier, data_loader = create_engines(settings, summary)
+
+    ledger = FileLedger(
+        output_base_path
+        + config.get("watch.ledger_filename", ".watch_ledger.json")
+    )
+    for filename in ledger.recover(output_base_path):
+        logger.warning("Classifying %s again, it was interrupted", filename)
+    watcher = DirectoryWatcher(
+        settings["input_base_path"],
+        ledger,
+        pattern=config.get("watch.pattern", "*.csv"),
+    )
+
+    processed_files = 0
+    logger.info("Watching %s...", settings["input_base_path"])
+    try:
+        while True:
+            # Without waiting, the files are ready on the first poll
+            for input_path in watcher.poll(require_stable=not args.once):
+                file_summary = RunSummary("watch")
+                sink = output_sink(
+                    output_base_path, output_filename(input_path.name)
+                )
+                ledger.start(
+                    input_path.name,
+                    watcher.fingerprint(input_path),
+                    Path(sink.path).name,
+                )
+                file_summary.set(
+                    input=input_path.name, output=Path(sink.path).name
+                )
+                try:
+                    total_rows = run_classification(
+                        settings,
+                        classifier,
+                        data_loader,
+                        sink,
+                        file_summary,
+                        input_path=str(input_path),
+                    )
+                except Exception as e:
+                    logger.exception("Failed to classify %s", input_path)
+                    ledger.fail(input_path.name, str(e))
+                    continue
+                ledger.complete(input_path.name, total_rows)
+                file_summary.set(rows=total_rows)
+                file_summary.emit(logger)
+                processed_files += 1
+            if args.once:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        logger.info("Stopped watching %s", settings["input_base_path"])
+
+    summary.set(files=processed_files)
+
+
+def stream(args: argparse.Namespace, summary: RunSummary) -> None:
+    settings = load_settings()
+    batch_size = args.batch_size or config.get("streaming.batch_size", 1000)
+    summary.set(
+        input="<stdin>" if args.input == "-" else args.input,
+        engine=settings["classification_engine"],
+        batch_size=batch_size,
+    )
+
+    classifier, data_loader = create_engines(settings, summary)
+    pipeline = create_pipeline(settings, classifier, summary)
+    # The results go to stdout, while the logs go to stderr
+    sink = JsonLinesResultSink("<stdout>", stream=sys.stdout)
+
+    logger.debug("Streaming records in batches of %d...", batch_size)
+    with ExitStack() as stack:
+        records = sys.stdin
+        if args.input != "-":
+            records = stack.enter_context(open(args.input))
+        with summary.stage("pipeline"):
+            try:
+                total_rows = pipeline.run(
+                    data_loader.iter_json_lines_companies(records, batch_size),
+                    sink,
+                    limit=args.limit,
+                )
+            except BrokenPipeError:
+                # The consumer of the results exited, e.g.: `head`
+                logger.info("The output was closed, stopping")
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+                total_rows = None
+    summary.set(rows=total_rows)
+    set_limit_summary(pipeline, total_rows, args.limit, summary)
+    set_rule_cache_summary(classifier, summary)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Collect the run metrics, logged as a single record at the end
+    profiler = None
+    if args.profile:
+        profiler = StageProfiler(config.get("profiling.top_functions", 20))
+    summary = RunSummary(args.command, profiler=profiler)
+    commands = {
+        "classify": classify if args.sample is None else sample,
+        "merge": merge,
+        "batch": batch,
+        "watch": watch,
+        "stream": stream,
+    }
+    commands[args.command](args, summary)
+
+    if profiler:
+        report_path = profiler.write(
+            load_settings()["output_base_path"],
+            output_filename(args.command, prefix="profile"),
+            raw=config.get("profiling.raw_files", False),
+        )
+        summary.set(profile=report_path.name)
+    summary.emit(logger)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+"""
+Multi-input runs: resolving the datasets of a batch from globs and manifest
+files.
+"""
+
+from __future__ import annotations
+
+import glob
+import logging
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from src.exceptions import ImproperlyConfiguredException
+
+logger = logging.getLogger(__name__)
+
+
+def read_manifest(manifest_path: str) -> List[str]:
+    """
+    Read the inputs listed by a manifest file: one path or glob per line,
+    ignoring blank lines and `#` comments.
+
+    :param manifest_path: The manifest file path.
+    :return: A list of paths and globs.
+    """
+    with open(manifest_path) as file:
+        lines = (line.split("#", 1)[0].strip() for line in file)
+        return [line for line in lines if line]
+
+
+def resolve_inputs(
+    patterns: Iterable[str],
+    input_base_path: str,
+    manifest_path: Optional[str] = None,
+) -> List[Path]:
+    """
+    Expand the paths and globs of a batch into the list of its datasets.
+    Relative paths are relative to the input directory, and every dataset
+    is only listed once.
+
+    :param patterns: The paths and globs given on the command line.
+    :param input_base_path: The input directory.
+    :param manifest_path: An optional manifest file listing more inputs.
+    :return: A sorted list of dataset paths.
+    """
+    patterns = list(patterns)
+    if manifest_path:
+        patterns += read_manifest(manifest_path)
+    if not patterns:
+        raise ImproperlyConfiguredException(
+            message="A batch requires input paths, globs or a manifest.",
+            parameter_name="inputs",
+        )
+
+    inputs = set()
+    for pattern in patterns:
+        full_pattern = str(Path(input_base_path) / pattern)
+        matches = [Path(path) for path in glob.glob(full_pattern)]
+        if not matches:
+            logger.warning("No dataset matches %s", pattern)
+        inputs.update(path.resolve() for path in matches if path.is_file())
+    return sorted(inputs)
+
+
+def batch_output_name(input_path: Path, input_base_path: str) -> str:
+    """
+    Name the output of a batch input after its path in the input directory,
+    so that datasets with the same name in different directories do not
+    share an output.
+
+    :param input_path: The dataset path.
+    :param input_base_path: The input directory.
+    :return: The input name used by the output file.
+    """
+    try:
+        relative_path = input_path.relative_to(Path(input_base_path).resolve())
+    except ValueError:
+        relative_path = Path(input_path.name)
+    return "_".join(relative_path.parts)
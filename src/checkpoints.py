@@ -0,0 +1,157 @@
+"""
+Checkpoints of the classified chunks, so that an interrupted run can be
+resumed without classifying the finished chunks again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+from pandas import DataFrame
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINTS_DIRECTORY = ".checkpoints"
+
+
+def run_fingerprint(**parts) -> str:
+    """
+    Hash everything determining the results of a run: the input, the rules
+    and the settings splitting and classifying the chunks.
+
+    :param parts: JSON serializable descriptions of the run.
+    :return: A hexadecimal digest.
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CheckpointStore:
+    """This class stores each classified chunk of a run, with a manifest
+    listing the completed chunks.
+
+    The checkpoints of a run live in a directory named after its
+    fingerprint, so that a run never resumes from the checkpoints of a
+    different input or ruleset. Files are written atomically, and the
+    manifest is only updated once its chunk is on disk.
+    """
+
+    def __init__(self, output_base_path: str, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.directory = (
+            Path(output_base_path) / CHECKPOINTS_DIRECTORY / fingerprint[:16]
+        )
+        self.manifest_path = self.directory / "checkpoint.json"
+        self.manifest: dict = {}
+
+    @property
+    def completed_chunks(self) -> int:
+        return self.manifest.get("completed_chunks", 0)
+
+    @property
+    def output(self) -> Optional[str]:
+        return self.manifest.get("output")
+
+    def _chunk_path(self, chunk_number: int) -> Path:
+        return self.directory / f"chunk-{chunk_number:06d}.pkl"
+
+    def _save_manifest(self) -> None:
+        self.manifest["updated_at"] = datetime.now().isoformat()
+        temporary_path = self.manifest_path.with_suffix(".tmp")
+        with open(temporary_path, "w") as file:
+            json.dump(self.manifest, file, indent=2)
+        os.replace(temporary_path, self.manifest_path)
+
+    def start(self, output: str, resume: bool) -> None:
+        """
+        Start a run, resuming from the existing checkpoints when asked to.
+        Resumed runs keep the output file name of the interrupted run.
+
+        :param output: The output file name of a new run.
+        :param resume: Whether to resume from the existing checkpoints.
+        :return: None
+        """
+        if resume and self.manifest_path.exists():
+            with open(self.manifest_path) as file:
+                manifest = json.load(file)
+            if manifest.get("fingerprint") == self.fingerprint:
+                self.manifest = manifest
+                logger.info(
+                    "Resuming after %d checkpointed chunks",
+                    self.completed_chunks,
+                )
+                return
+        if resume:
+            logger.warning("No checkpoint to resume from, starting over")
+
+        self.clear()
+        self.directory.mkdir(parents=True)
+        self.manifest = {
+            "fingerprint": self.fingerprint,
+            "output": output,
+            "completed_chunks": 0,
+            "rows": 0,
+        }
+        self._save_manifest()
+
+    def save(self, results_df: DataFrame) -> None:
+        """
+        Checkpoint the next classified chunk.
+
+        :param results_df: A Pandas DataFrame returned by the classifier.
+        :return: None
+        """
+        chunk_path = self._chunk_path(self.completed_chunks)
+        temporary_path = chunk_path.with_suffix(".tmp")
+        results_df.to_pickle(temporary_path)
+        os.replace(temporary_path, chunk_path)
+
+        self.manifest["completed_chunks"] += 1
+        self.manifest["rows"] += len(results_df)
+        self._save_manifest()
+
+    def replay(self, sink) -> int:
+        """
+        Write the checkpointed chunks to a sink, in order.
+
+        :param sink: The output sink.
+        :return: The number of replayed rows.
+        """
+        rows = 0
+        for chunk_number in range(self.completed_chunks):
+            results_df = pd.read_pickle(self._chunk_path(chunk_number))
+            sink.write(results_df)
+            rows += len(results_df)
+        return rows
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class CheckpointingSink:
+    """This sink checkpoints every classified chunk before writing it to
+    the wrapped sink.
+    """
+
+    def __init__(self, sink, store: CheckpointStore):
+        self.sink = sink
+        self.store = store
+
+    @property
+    def path(self) -> str:
+        return self.sink.path
+
+    def write(self, results_df: DataFrame) -> None:
+        self.store.save(results_df)
+        self.sink.write(results_df)
+
+    def close(self) -> None:
+        self.sink.close()
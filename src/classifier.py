@@ -5,78 +5,204 @@ the classification rules to the dataset.
 
 from __future__ import annotations
 
-import json
 import logging
+import time
+from typing import Optional
 
-import pandas as pd
+import numpy as np
 from pandas import DataFrame
 
 from src.exceptions import InvalidClassificationEngineException
-from src.rules_engine import DynamicRulesEngine, StaticRulesEngine
+from src.numeric_kernels import resolve_backend
+from src.rule_cache import RuleResultCache
+from src.rules_engine import (
+    SAAS_REJECTION_PATTERNS,
+    SAAS_SEARCH_PATTERNS,
+    DynamicRulesEngine,
+    StaticRulesEngine,
+)
+from src.text_index import TextIndexes
+from src.utils.data_utils import (
+    factorized_apply,
+    factorized_batch_apply,
+    row_apply,
+)
+from src.utils.profiling import StageProfiler
 
 logger = logging.getLogger(__name__)
 
+EVALUATION_STRATEGIES = {
+    "row": row_apply,
+    "factorized": factorized_apply,
+}
+
 
 class ClassificationEngine:
     """This class is responsible for handling different classification
     engines and being the interface with the orchestrator script.
     """
 
-    def __init__(self):
-        logger.info("Creating Dynamic Rules Engine...")
+    def __init__(
+        self,
+        evaluation_strategy: str = "factorized",
+        numeric_backend: str = "numpy",
+    ):
+        if evaluation_strategy not in EVALUATION_STRATEGIES:
+            raise InvalidClassificationEngineException(
+                message=f"Unknown evaluation strategy: {evaluation_strategy}"
+            )
+        self.evaluation_strategy = evaluation_strategy
+        self.numeric_backend = resolve_backend(numeric_backend)
+        logger.debug("Creating Dynamic Rules Engine...")
         self.rule_processor = DynamicRulesEngine()
-        logger.info("Creating Static Rules Engine...")
+        logger.debug("Creating Static Rules Engine...")
         self.rules_engine = StaticRulesEngine()
+        # Records the duration of each rule, with `--profile`
+        self.profiler: Optional[StageProfiler] = None
+        # Caches the results of the dynamic rules, when enabled
+        self.rule_cache: Optional[RuleResultCache] = None
+
+    @property
+    def factorize(self) -> bool:
+        return self.evaluation_strategy == "factorized"
+
+    def _evaluate_batch(self, column, batch_func) -> np.ndarray:
+        """
+        Apply a batch rule to a whole column at once, only on its distinct
+        values with the "factorized" evaluation strategy.
+
+        :param column: A pandas Series with the values of a single field.
+        :param batch_func: A callable receiving an array of values.
+        :return: A boolean numpy array with one result per row.
+        """
+        if self.factorize:
+            return factorized_batch_apply(column, batch_func)
+        return np.asarray(batch_func(column), dtype=bool)
+
+    def _timed(self, rule_id: str, evaluate, *args, **kwargs):
+        """
+        Evaluate a rule, recording its duration when profiling.
+
+        :param rule_id: The rule id.
+        :param evaluate: The callable evaluating the rule.
+        :return: The rule results.
+        """
+        if self.profiler is None:
+            return evaluate(*args, **kwargs)
+        start = time.perf_counter()
+        results = evaluate(*args, **kwargs)
+        self.profiler.record_rule(rule_id, time.perf_counter() - start)
+        return results
+
+    def _cached(
+        self,
+        definition: dict,
+        fields: list,
+        companies_df: DataFrame,
+        fingerprints: dict,
+        evaluate,
+    ) -> np.ndarray:
+        """
+        Evaluate a rule, or load its results from the rule cache.
+
+        :param definition: The rule definition.
+        :param fields: The fields read by the rule.
+        :param companies_df: A pandas DataFrame with the companies' information.
+        :param fingerprints: The dataset fingerprints shared by the rules.
+        :param evaluate: A callable evaluating the rule.
+        :return: The rule results.
+        """
+        if self.rule_cache is None:
+            return evaluate()
+        return self.rule_cache.evaluate(
+            definition, fields, companies_df, evaluate, fingerprints
+        )
 
-    def _static_classification(self, company_data: pd.Series) -> dict:
+    def _static_classification(self, companies_df: DataFrame) -> dict:
         """
-        Apply all static classification rules.
+        Apply all static classification rules, column-at-a-time.
 
-        :param company_data: A pandas Series with the company information.
-        :return: A dictionary with the classification results.
+        :param companies_df: A pandas DataFrame with the companies' information.
+        :return: A dictionary with the results of each rule.
         """
-        company_description = company_data["Description"]
-        founded_year = company_data["Founded Year"]
-        headquarters = company_data["Headquarters"]
-        total_employees = company_data["Total Employees"]
-        employee_locations = json.loads(company_data["Employee Locations"])
-
-        results = {
-            "is_recent": self.rules_engine.is_founded_in_last_5_years(
-                founded_year
+        static_rules = {
+            "is_recent": (
+                "Founded Year",
+                self.rules_engine.is_founded_in_last_5_years_batch,
+            ),
+            "is_saas": (
+                "Description",
+                self.rules_engine.is_saas_company_batch,
             ),
-            "is_saas": self.rules_engine.is_saas_company(company_description),
-            "is_us_based": self.rules_engine.is_us_based(headquarters),
-            "most_employees_are_us_based": self.rules_engine.most_of_employees_are_us_based(
-                employee_locations
+            "is_us_based": (
+                "Headquarters",
+                self.rules_engine.is_us_based_batch,
             ),
-            "has_20_to_60_employees": self.rules_engine.has_20_to_60_employees(
-                total_employees
+            "most_employees_are_us_based": (
+                "Employee Locations",
+                self.rules_engine.most_of_employees_are_us_based_batch,
+            ),
+            "has_20_to_60_employees": (
+                "Total Employees",
+                self.rules_engine.has_20_to_60_employees_batch,
             ),
         }
+        return {
+            rule_id: self._timed(
+                rule_id, self._evaluate_batch, companies_df[field], batch_func
+            )
+            for rule_id, (field, batch_func) in static_rules.items()
+        }
 
-        is_interesting = all(results.values())
-        return {"is_interesting": is_interesting, "rule_results": results}
-
-    def _dynamic_classification(self, company_data: pd.Series) -> dict:
+    def _dynamic_classification(self, companies_df: DataFrame) -> dict:
         """
         Apply all dynamic classification rules.
 
-        :param company_data: A pandas Series with the company information.
-        :return: A dictionary with the classification results.
+        :param companies_df: A pandas DataFrame with the companies' information.
+        :return: A dictionary with the results of each rule.
         """
         rules_set = self.rule_processor.parse_rules()
+        text_indexes = TextIndexes(companies_df)
+        fingerprints = {}
         results = {}
         for rule in rules_set:
-            evaluation = rule.apply_rule(company_data)
-            results[rule.rule_id] = evaluation
+            results[rule.rule_id] = self._cached(
+                rule.definition,
+                rule.fields,
+                companies_df,
+                fingerprints,
+                lambda: self._timed(
+                    rule.rule_id,
+                    rule.evaluate,
+                    companies_df,
+                    factorize=self.factorize,
+                    numeric_backend=self.numeric_backend,
+                    text_indexes=text_indexes,
+                ),
+            )
 
-        results["is_saas"] = StaticRulesEngine.is_saas_company(
-            company_data["Description"]
+        # A text rule with `replaces: is_saas` replaces the built-in check
+        if self.rule_processor.replaces_saas_check:
+            return results
+
+        results["is_saas"] = self._cached(
+            {
+                "type": "static",
+                "rule": "is_saas_company",
+                "rejection_patterns": SAAS_REJECTION_PATTERNS,
+                "search_patterns": SAAS_SEARCH_PATTERNS,
+            },
+            ["Description"],
+            companies_df,
+            fingerprints,
+            lambda: self._timed(
+                "is_saas",
+                self._evaluate_batch,
+                companies_df["Description"],
+                StaticRulesEngine.is_saas_company_batch,
+            ),
         )
-
-        is_interesting = all(results.values())
-        return {"is_interesting": is_interesting, "rule_results": results}
+        return results
 
     def classify(self, classification_engine, companies_df) -> DataFrame:
         """
@@ -89,8 +215,6 @@ class ClassificationEngine:
                 evaluation based on the set of rules,
                 and columns indicating the individual rule application result.
         """
-        company_data: pd.Series
-        results = []
         available_classifiers = {
             "static": self._static_classification,
             "dynamic": self._dynamic_classification,
@@ -100,13 +224,25 @@ class ClassificationEngine:
             raise InvalidClassificationEngineException(
                 message=f"Unknown classification engine: {classification_engine}"
             )
-        for _, company_data in companies_df.iterrows():
-            classification = engine(company_data)
-            results.append(
-                {
-                    **company_data.to_dict(),
-                    "is_interesting": classification["is_interesting"],
-                    **classification["rule_results"],
-                }
-            )
-        return pd.DataFrame(results)
+        return self.build_results(companies_df, engine(companies_df))
+
+    @staticmethod
+    def build_results(
+        companies_df: DataFrame, rule_results: dict
+    ) -> DataFrame:
+        """
+        Add `is_interesting` and the results of each rule to the companies.
+
+        :param companies_df: A pandas DataFrame with the companies' information.
+        :param rule_results: A dictionary with the results of each rule.
+        :return: The classified pandas DataFrame.
+        """
+        is_interesting = np.ones(len(companies_df), dtype=bool)
+        for evaluation in rule_results.values():
+            is_interesting &= evaluation.astype(bool)
+
+        results_df = companies_df.reset_index(drop=True)
+        results_df["is_interesting"] = is_interesting
+        for rule_id, evaluation in rule_results.items():
+            results_df[rule_id] = evaluation
+        return results_df
@@ -2,19 +2,25 @@
 Project's configuration parser for the Investment Company Classifier.
 """
 
+import atexit
 import logging
 import os
+import queue
+from logging.handlers import QueueListener
 from pathlib import Path
 
 import yaml
 
 from src.exceptions import ImproperlyConfiguredException
+from src.utils.logging_utils import DeferredQueueHandler
 
 
 class ConfigManager:
     _instance = None
     _config = None
     _logger = None
+    _log_handler = None
+    _log_listener = None
 
     def __new__(cls):
         if not cls._instance:
@@ -63,6 +69,8 @@ class ConfigManager:
     def _setup_logging(self):
         """
         Configure logging based on config settings
+        Records are put into a queue by the logging thread, and formatted and
+        written to the file and the terminal by a background listener.
 
         :return: None
         """
@@ -73,14 +81,44 @@ class ConfigManager:
         # Ensure log directory exists
         os.makedirs(os.path.dirname(log_file), exist_ok=True)
 
+        # Replace the handlers of a previous setup, flushing their records
+        root_logger = logging.getLogger()
+        if self._log_listener is not None:
+            root_logger.removeHandler(self._log_handler)
+            self._log_listener.stop()
+            for handler in self._log_listener.handlers:
+                handler.close()
+        else:
+            atexit.register(self._stop_logging)
+
         # Configure logging
-        logging.basicConfig(
-            level=log_level,
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            handlers=[logging.FileHandler(log_file), logging.StreamHandler()],
+        formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        )
+        handlers = [logging.FileHandler(log_file), logging.StreamHandler()]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        self._log_handler = DeferredQueueHandler(log_queue)
+        self._log_listener = QueueListener(
+            log_queue, *handlers, respect_handler_level=True
         )
+        self._log_listener.start()
+
+        root_logger.setLevel(log_level)
+        root_logger.addHandler(self._log_handler)
         self._logger = logging.getLogger(__name__)
 
+    def _stop_logging(self):
+        """
+        Flush the queued log records and stop the background listener
+
+        :return: None
+        """
+        if self._log_listener is not None:
+            self._log_listener.stop()
+
     def _validate_config(self):
         """
         Perform critical configuration validation
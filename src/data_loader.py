@@ -1,46 +1,217 @@
 import logging
 import time
+from typing import Callable, Dict, Iterator, Optional, TextIO
 
 import pandas as pd
 
 from src.exceptions import EmptyDatasetException
+from src.json_lines import read_json_lines
 from src.utils.data_utils import sanitize_dataframe
 
 logger = logging.getLogger(__name__)
 
+# Selects the rows of a freshly read DataFrame to keep
+RowFilter = Callable[[pd.DataFrame], pd.DataFrame]
+
+
+def infer_dtypes(file_path, chunk_size: int) -> Dict[str, str]:
+    """
+    Infer the dtypes that reading the whole dataset at once gives to its
+    columns, scanning it in chunks of `chunk_size` rows. A column that is
+    empty within a chunk does not decide its dtype.
+    Booleans with missing values are left out: pandas reads them as objects
+    holding booleans, which no dtype reproduces.
+
+    :param file_path: The file path for the dataset.
+    :param chunk_size: The number of rows read at once.
+    :return: A dictionary with the dtype of each column.
+    """
+    found_dtypes = {}
+    nullable = set()
+    with pd.read_csv(file_path, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            for column, dtype in chunk.dtypes.items():
+                missing = chunk[column].isna()
+                if missing.any():
+                    nullable.add(column)
+                column_dtypes = found_dtypes.setdefault(column, set())
+                if not missing.all():
+                    column_dtypes.add(str(dtype))
+
+    dtypes = {}
+    for column, column_dtypes in found_dtypes.items():
+        if len(column_dtypes) == 1 and column not in nullable:
+            dtypes[column] = column_dtypes.pop()
+        elif column_dtypes <= {"int64", "float64"}:
+            # Also the dtype of the columns without any value
+            dtypes[column] = "float64"
+        elif column_dtypes != {"bool"}:
+            dtypes[column] = "object"
+    return dtypes
+
 
 class DataLoader:
-    def __init__(self, sanitizing_strategy: int):
+    def __init__(self, sanitizing_strategy: int, enricher=None):
         self.sanitizing_strategy = sanitizing_strategy
+        # Joins the enrichment sources of `rules.yaml` after sanitizing
+        self.enricher = enricher
+
+    def _sanitize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Sanitize a DataFrame with the loader's sanitizing strategy, and
+        join the enrichment sources.
+
+        :param df: A Pandas DataFrame read from the dataset.
+        :return: A sanitized Pandas DataFrame
+        """
+        start_time = time.time()
+        logger.debug(
+            "Sanitizing %d rows with strategy %s...",
+            len(df),
+            self.sanitizing_strategy,
+        )
+        sanitized_df = sanitize_dataframe(df, self.sanitizing_strategy)
+        # Get final timer and calculate duration
+        ending_time = time.time()
+        duration = ending_time - start_time
+        logger.debug("Sanitizing process duration: %.2f", duration)
+        if self.enricher is not None:
+            sanitized_df = self.enricher.enrich(sanitized_df)
+        return sanitized_df
 
-    def load_companies(self, file_path):
+    def load_companies(
+        self, file_path, row_filter: Optional[RowFilter] = None
+    ):
         """
         Load company data from CSV
             - Validate data integrity
             - Handle missing values
 
         :param file_path: The file path for the dataset.
+        :param row_filter: An optional callable selecting the rows to keep
+                before sanitizing.
         :return: A Pandas DataFrame
         """
         try:
-            logger.info(f"Loading companies from {file_path}...")
+            logger.debug("Loading companies from %s...", file_path)
             df = pd.read_csv(file_path)
             if len(df) == 0:
                 raise EmptyDatasetException(
                     message="Cannot load empty dataset"
                 )
-            # Sanitize the DF
-            start_time = time.time()
-            logger.info("Sanitizing the DataFrame...")
-            logger.info(f"Sanitizing strategy {self.sanitizing_strategy}...")
-            sanitized_df = sanitize_dataframe(df, self.sanitizing_strategy)
-            # Get final timer and calculate duration
-            ending_time = time.time()
-            duration = ending_time - start_time
-            logger.info("Sanitizing process concluded!")
-            logger.info(f"Sanitizing process duration: {duration:.2f}")
-
-            return sanitized_df
+            if row_filter is not None:
+                df = row_filter(df)
+            return self._sanitize(df)
         except Exception as e:
             print(f"Error loading data: {e}")
             return None
+
+    def iter_companies(
+        self,
+        file_path,
+        chunk_size: int,
+        row_filter: Optional[RowFilter] = None,
+        skip_chunks: int = 0,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Load company data from CSV in chunks of `chunk_size` rows.
+        Each chunk is sanitized independently, the dtypes being inferred
+        from the whole dataset beforehand so that every chunk is read and
+        sanitized as in a whole-file run.
+
+        :param file_path: The file path for the dataset.
+        :param chunk_size: The number of rows per chunk.
+        :param row_filter: An optional callable selecting the rows to keep
+                before sanitizing.
+        :param skip_chunks: The number of leading chunks already classified,
+                read but neither sanitized nor yielded.
+        :return: An iterator of sanitized Pandas DataFrames
+        """
+        logger.debug("Streaming companies from %s...", file_path)
+        total_rows = 0
+        dtypes = infer_dtypes(file_path, chunk_size)
+        with pd.read_csv(
+            file_path, chunksize=chunk_size, dtype=dtypes
+        ) as reader:
+            for chunk_number, chunk in enumerate(reader):
+                for column in chunk.columns.difference(list(dtypes)):
+                    chunk[column] = chunk[column].astype(object)
+                total_rows += len(chunk)
+                if row_filter is not None:
+                    # Skipped rows still count in the row filter's stats
+                    chunk = row_filter(chunk)
+                if chunk_number < skip_chunks:
+                    continue
+                yield self._sanitize(chunk)
+
+        if total_rows == 0:
+            raise EmptyDatasetException(message="Cannot load empty dataset")
+
+    def iter_json_lines_companies(
+        self, stream: TextIO, batch_size: int
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Load company records from a JSON Lines stream in batches of
+        `batch_size` records. Each batch is sanitized independently.
+
+        :param stream: A text stream, e.g.: a file or `sys.stdin`.
+        :param batch_size: The number of records per batch.
+        :return: An iterator of sanitized Pandas DataFrames
+        """
+        for batch in read_json_lines(stream, batch_size):
+            yield self._sanitize(batch)
+
+    def sample_companies(
+        self, file_path, sampler, chunk_size: int
+    ) -> pd.DataFrame:
+        """
+        Stream the dataset through a reservoir sampler, and sanitize only
+        the sampled rows.
+
+        :param file_path: The file path for the dataset.
+        :param sampler: The reservoir sampler keeping the sample.
+        :param chunk_size: The number of rows read at once.
+        :return: A sanitized Pandas DataFrame with the sampled rows.
+        """
+        logger.debug("Sampling companies from %s...", file_path)
+        with pd.read_csv(file_path, chunksize=chunk_size) as reader:
+            for chunk in reader:
+                sampler.add(chunk)
+
+        if sampler.seen_rows == 0:
+            raise EmptyDatasetException(message="Cannot load empty dataset")
+        return self._sanitize(sampler.sample())
+
+    def load_sqlite_companies(self, source) -> pd.DataFrame:
+        """
+        Load the candidate companies from a SQLite source.
+
+        :param source: The SQLite source, with the rules pushed into its
+                query.
+        :return: A sanitized Pandas DataFrame
+        """
+        logger.debug("Loading companies from %s...", source.db_path)
+        if source.count_rows() == 0:
+            raise EmptyDatasetException(message="Cannot load empty dataset")
+        return self._sanitize(source.read())
+
+    def iter_sqlite_companies(
+        self, source, chunk_size: int, skip_chunks: int = 0
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Load the candidate companies from a SQLite source in chunks of
+        `chunk_size` rows. Each chunk is sanitized independently.
+
+        :param source: The SQLite source, with the rules pushed into its
+                query.
+        :param chunk_size: The number of rows per chunk.
+        :param skip_chunks: The number of leading chunks already classified,
+                fetched but neither sanitized nor yielded.
+        :return: An iterator of sanitized Pandas DataFrames
+        """
+        logger.debug("Streaming companies from %s...", source.db_path)
+        if source.count_rows() == 0:
+            raise EmptyDatasetException(message="Cannot load empty dataset")
+        for chunk_number, chunk in enumerate(source.iter_chunks(chunk_size)):
+            if chunk_number >= skip_chunks:
+                yield self._sanitize(chunk)
@@ -0,0 +1,208 @@
+"""
+Enrichment of the companies with fields from secondary datasets, joined
+through a hash index on their key before the rules are evaluated.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import pandas as pd
+from pandas import DataFrame
+
+from src.exceptions import ImproperlyConfiguredException
+from src.sharding import input_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+def enrichment_fingerprints(enrichments: List[dict]) -> List[dict]:
+    """
+    Describe the enrichment sources declared in `rules.yaml` with the
+    fingerprint of their files, so that runs joined against a modified
+    source are told apart.
+
+    :param enrichments: The `enrichments` section of `rules.yaml`.
+    :return: A list with the definition and file fingerprint of each source.
+    """
+    return [
+        {**enrichment, "file": input_fingerprint(enrichment["path"])}
+        for enrichment in enrichments
+    ]
+
+
+class EnrichmentSource:
+    """This class indexes a secondary dataset by its key, holding only the
+    fields referenced by the rules.
+
+    The indexed fields are cached on disk, keyed by the source file's
+    fingerprint and the selected fields, so that later runs skip parsing
+    the source again.
+    """
+
+    def __init__(
+        self,
+        source_id: str,
+        path: str,
+        key: str,
+        source_key: Optional[str] = None,
+        cache_path: Optional[str] = None,
+    ):
+        self.source_id = source_id
+        self.path = path
+        self.key = key
+        self.source_key = source_key or key
+        self.cache_path = cache_path
+        self.fields: List[str] = []
+        self._index: Optional[pd.Index] = None
+        self._columns: Optional[DataFrame] = None
+
+    def _cache_file(self, fields: List[str]) -> Optional[Path]:
+        if not self.cache_path:
+            return None
+        description = {
+            "path": str(Path(self.path).resolve()),
+            "file": input_fingerprint(self.path),
+            "source_key": self.source_key,
+            "fields": fields,
+        }
+        digest = hashlib.sha256(
+            json.dumps(description, sort_keys=True).encode()
+        ).hexdigest()
+        return Path(self.cache_path) / f"{self.source_id}-{digest[:16]}.pkl"
+
+    def _read(self, fields: List[str]) -> DataFrame:
+        """Read the key and the fields of the source, deduplicating keys."""
+        columns = pd.read_csv(
+            self.path, usecols=[self.source_key, *fields]
+        ).set_index(self.source_key)[fields]
+        duplicated = columns.index.duplicated(keep="first")
+        if duplicated.any():
+            logger.warning(
+                "Enrichment %s has %d duplicated keys, keeping the first",
+                self.source_id,
+                duplicated.sum(),
+            )
+            columns = columns[~duplicated]
+        return columns
+
+    def load(self, referenced_fields: Iterable[str]) -> List[str]:
+        """
+        Index the fields of the source referenced by the rules, from the
+        cache when the source is unchanged.
+
+        :param referenced_fields: The fields referenced by the rules.
+        :return: The fields provided by this source.
+        """
+        available = pd.read_csv(self.path, nrows=0).columns
+        if self.source_key not in available:
+            raise ImproperlyConfiguredException(
+                message=(
+                    f"Enrichment {self.source_id} has no key column "
+                    f"{self.source_key}."
+                ),
+                parameter_name="enrichments",
+            )
+        self.fields = sorted(
+            field
+            for field in set(referenced_fields)
+            if field in available and field != self.source_key
+        )
+
+        cache_file = self._cache_file(self.fields)
+        if cache_file is not None and cache_file.exists():
+            logger.debug("Loading enrichment %s from cache", self.source_id)
+            self._columns = pd.read_pickle(cache_file)
+        else:
+            logger.debug("Indexing enrichment %s...", self.source_id)
+            self._columns = self._read(self.fields)
+            if cache_file is not None:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                self._columns.to_pickle(cache_file)
+        # Hash index mapping each key to its row
+        self._index = self._columns.index
+        return self.fields
+
+    def table(self, fields: List[str]) -> DataFrame:
+        """
+        List the indexed fields of the source, with its keys.
+
+        :param fields: The fields to list.
+        :return: A Pandas DataFrame with the key column, named after the
+                companies' join key, and the fields.
+        """
+        return self._columns[fields].rename_axis(self.key).reset_index()
+
+    def join(self, companies_df: DataFrame) -> DataFrame:
+        """
+        Add the source's fields to the companies, left joined on the key.
+        Fields already present in the companies are kept as they are.
+
+        :param companies_df: A Pandas DataFrame with the companies.
+        :return: The enriched Pandas DataFrame.
+        """
+        fields = [field for field in self.fields if field not in companies_df]
+        if not fields:
+            return companies_df
+        if self.key not in companies_df:
+            raise ImproperlyConfiguredException(
+                message=f"The dataset has no join key column {self.key}.",
+                parameter_name="enrichments",
+            )
+
+        positions = self._index.get_indexer(companies_df[self.key])
+        joined = {
+            field: self._columns[field].array.take(positions, allow_fill=True)
+            for field in fields
+        }
+        return companies_df.assign(**joined)
+
+
+class Enricher:
+    """This class joins all the enrichment sources declared in
+    `rules.yaml` into the companies, before the rules are evaluated.
+    """
+
+    def __init__(self, sources: List[EnrichmentSource]):
+        self.sources = sources
+
+    @classmethod
+    def from_rules(
+        cls,
+        enrichments: List[dict],
+        referenced_fields: Iterable[str],
+        cache_path: Optional[str] = None,
+    ) -> Optional["Enricher"]:
+        """
+        Build the enricher of the sources declared in `rules.yaml`, keeping
+        only the sources providing fields referenced by the rules.
+
+        :param enrichments: The `enrichments` section of `rules.yaml`.
+        :param referenced_fields: The fields referenced by the rules.
+        :param cache_path: The directory caching the indexed fields.
+        :return: An Enricher, or None when no source is needed.
+        """
+        referenced_fields = set(referenced_fields)
+        sources = []
+        for enrichment in enrichments:
+            source = EnrichmentSource(
+                source_id=enrichment["id"],
+                path=enrichment["path"],
+                key=enrichment["key"],
+                source_key=enrichment.get("source_key"),
+                cache_path=cache_path,
+            )
+            if source.load(referenced_fields):
+                sources.append(source)
+        if not sources:
+            return None
+        return cls(sources)
+
+    def enrich(self, companies_df: DataFrame) -> DataFrame:
+        for source in self.sources:
+            companies_df = source.join(companies_df)
+        return companies_df
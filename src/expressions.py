@@ -0,0 +1,415 @@
+"""
+Arithmetic expressions of the `expression` rules, e.g.:
+"Revenue / Total Employees >= 50000".
+
+Expressions are parsed once, when the rules are loaded, by a small grammar
+only allowing column names, numbers, arithmetic, comparisons and boolean
+operators, so that no Python code is ever evaluated. They are then
+evaluated over whole columns: by `numexpr` when it is installed, otherwise
+by NumPy array operations on chunks of rows spread over a thread pool.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from src.exceptions import InvalidOperationException
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+logger = logging.getLogger(__name__)
+
+NUMEXPR_AVAILABLE = numexpr is not None
+
+# Rows evaluated by each thread of the NumPy evaluator
+CHUNK_SIZE = 65536
+
+_TOKEN_REGEX = re.compile(
+    r"""
+    (?P<space>\s+)
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<column>`[^`]+`)
+    | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+    | (?P<operator>\*\*|==|!=|>=|<=|[-+*/()<>])
+    """,
+    re.VERBOSE,
+)
+
+_KEYWORDS = ("and", "or", "not")
+_FUNCTIONS = {"abs": np.abs, "sqrt": np.sqrt, "log": np.log}
+_COMPARISONS = {
+    "==": np.equal,
+    "!=": np.not_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+}
+_ARITHMETIC = {
+    "+": np.add,
+    "-": np.subtract,
+    "*": np.multiply,
+    "/": np.true_divide,
+    "**": np.power,
+}
+
+Token = Tuple[str, str]
+
+
+def tokenize(expression: str) -> List[Token]:
+    """
+    Split an expression into tokens. Consecutive words form a single column
+    name, e.g.: "Total Employees", and names with other characters are
+    quoted with backticks, e.g.: `Employee Growth 2Y (%)`.
+
+    :param expression: The expression text.
+    :return: A list of (kind, text) tokens.
+    """
+    tokens: List[Token] = []
+    words: List[str] = []
+    position = 0
+    while position < len(expression):
+        match = _TOKEN_REGEX.match(expression, position)
+        if match is None:
+            raise _invalid(expression, f"unexpected character at {position}")
+        position = match.end()
+        kind, text = match.lastgroup, match.group()
+        if kind == "space":
+            continue
+        if kind == "word" and text.lower() not in _KEYWORDS:
+            words.append(text)
+            continue
+        if words:
+            tokens.append(("name", " ".join(words)))
+            words = []
+        if kind == "column":
+            tokens.append(("column", text[1:-1]))
+        elif kind == "word":
+            tokens.append(("operator", text.lower()))
+        else:
+            tokens.append((kind, text))
+    if words:
+        tokens.append(("name", " ".join(words)))
+    return tokens
+
+
+def _invalid(expression: str, reason: str) -> InvalidOperationException:
+    return InvalidOperationException(
+        message=f"Invalid expression {expression!r}: {reason}."
+    )
+
+
+class _Parser:
+    """This class parses the tokens of an expression into a tree of tuples,
+    checking that every operator gets operands of the right type.
+
+    Grammar, from the lowest to the highest precedence:
+        disjunction := conjunction ("or" conjunction)*
+        conjunction := negation ("and" negation)*
+        negation    := "not" negation | comparison
+        comparison  := sum (("==" | "!=" | ">" | ">=" | "<" | "<=") sum)?
+        sum         := product (("+" | "-") product)*
+        product     := unary (("*" | "/") unary)*
+        unary       := "-" unary | power
+        power       := atom ("**" unary)?
+        atom        := number | column | function "(" sum ")" | "(" ... ")"
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tokens = tokenize(expression)
+        self.position = 0
+
+    def _peek(self) -> Token | None:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def _accept(self, *operators: str) -> str | None:
+        token = self._peek()
+        if token and token[0] == "operator" and token[1] in operators:
+            self.position += 1
+            return token[1]
+        return None
+
+    def _expect(self, node: tuple, kind: str) -> tuple:
+        if _kind(node) != kind:
+            raise _invalid(self.expression, f"expected a {kind} operand")
+        return node
+
+    def parse(self) -> tuple:
+        if not self.tokens:
+            raise _invalid(self.expression, "empty expression")
+        tree = self._disjunction()
+        if self._peek() is not None:
+            raise _invalid(self.expression, f"unexpected {self._peek()[1]!r}")
+        return self._expect(tree, "boolean")
+
+    def _boolean(self, operator: str, operand) -> tuple:
+        node = operand()
+        while self._accept(operator):
+            right = self._expect(operand(), "boolean")
+            node = ("boolean", operator, self._expect(node, "boolean"), right)
+        return node
+
+    def _disjunction(self) -> tuple:
+        return self._boolean("or", self._conjunction)
+
+    def _conjunction(self) -> tuple:
+        return self._boolean("and", self._negation)
+
+    def _negation(self) -> tuple:
+        if self._accept("not"):
+            return ("not", self._expect(self._negation(), "boolean"))
+        return self._comparison()
+
+    def _comparison(self) -> tuple:
+        node = self._sum()
+        operator = self._accept(*_COMPARISONS)
+        if operator is None:
+            return node
+        right = self._expect(self._sum(), "number")
+        return ("compare", operator, self._expect(node, "number"), right)
+
+    def _arithmetic(self, operators: Tuple[str, ...], operand) -> tuple:
+        node = operand()
+        while True:
+            operator = self._accept(*operators)
+            if operator is None:
+                return node
+            right = self._expect(operand(), "number")
+            node = (
+                "arithmetic",
+                operator,
+                self._expect(node, "number"),
+                right,
+            )
+
+    def _sum(self) -> tuple:
+        return self._arithmetic(("+", "-"), self._product)
+
+    def _product(self) -> tuple:
+        return self._arithmetic(("*", "/"), self._unary)
+
+    def _unary(self) -> tuple:
+        if self._accept("-"):
+            return ("negative", self._expect(self._unary(), "number"))
+        return self._power()
+
+    def _power(self) -> tuple:
+        node = self._atom()
+        if self._accept("**"):
+            right = self._expect(self._unary(), "number")
+            node = ("arithmetic", "**", self._expect(node, "number"), right)
+        return node
+
+    def _atom(self) -> tuple:
+        token = self._peek()
+        if token is None:
+            raise _invalid(self.expression, "unexpected end")
+        if self._accept("("):
+            node = self._disjunction()
+            if not self._accept(")"):
+                raise _invalid(self.expression, "missing ')'")
+            return node
+
+        kind, text = token
+        self.position += 1
+        if kind == "number":
+            return ("number", float(text))
+        if kind == "column":
+            return ("column", text)
+        if kind == "name":
+            if text.lower() in _FUNCTIONS and self._accept("("):
+                argument = self._expect(self._sum(), "number")
+                if not self._accept(")"):
+                    raise _invalid(self.expression, "missing ')'")
+                return ("call", text.lower(), argument)
+            return ("column", text)
+        raise _invalid(self.expression, f"unexpected {text!r}")
+
+
+def _kind(node: tuple) -> str:
+    if node[0] in ("compare", "boolean", "not"):
+        return "boolean"
+    return "number"
+
+
+def _evaluate_arithmetic(node: tuple, columns: Dict[str, np.ndarray]):
+    """Evaluate an arithmetic expression tree with NumPy array operations."""
+    kind = node[0]
+    if kind == "number":
+        return node[1]
+    if kind == "column":
+        return columns[node[1]]
+    if kind == "negative":
+        return np.negative(_evaluate_arithmetic(node[1], columns))
+    if kind == "call":
+        return _FUNCTIONS[node[1]](_evaluate_arithmetic(node[2], columns))
+    operator, left, right = node[1:]
+    return _ARITHMETIC[operator](
+        _evaluate_arithmetic(left, columns),
+        _evaluate_arithmetic(right, columns),
+    )
+
+
+def _numexpr_source(node: tuple, variables: Dict[str, str]) -> str:
+    """Translate an arithmetic expression tree into a `numexpr` expression."""
+    kind = node[0]
+    if kind == "number":
+        return repr(node[1])
+    if kind == "column":
+        return variables[node[1]]
+    if kind == "negative":
+        return f"(-{_numexpr_source(node[1], variables)})"
+    if kind == "call":
+        return f"{node[1]}({_numexpr_source(node[2], variables)})"
+    operator, left, right = node[1:]
+    return (
+        f"({_numexpr_source(left, variables)} {operator} "
+        f"{_numexpr_source(right, variables)})"
+    )
+
+
+def _evaluate_logic(node: tuple, operand: Callable[[tuple], np.ndarray]):
+    """
+    Evaluate the comparisons and boolean operators of an expression tree,
+    with three-valued logic: the results are 1.0 (true), 0.0 (false) or
+    NaN (unknown), for comparisons with a missing or infinite operand.
+
+    :param node: A boolean expression tree.
+    :param operand: A callable evaluating the arithmetic operands.
+    :return: An array of 1.0, 0.0 and NaN.
+    """
+    kind = node[0]
+    if kind == "not":
+        return 1.0 - _evaluate_logic(node[1], operand)
+
+    operator, left, right = node[1:]
+    if kind == "compare":
+        left, right = operand(left), operand(right)
+        known = np.isfinite(left) & np.isfinite(right)
+        return np.where(known, _COMPARISONS[operator](left, right), np.nan)
+
+    left = _evaluate_logic(left, operand)
+    right = _evaluate_logic(right, operand)
+    if operator == "and":
+        # False when either side is, otherwise unknown when either side is
+        return np.where((left == 0) | (right == 0), 0.0, left * right)
+    return np.where((left == 1) | (right == 1), 1.0, left + right)
+
+
+def _columns_of(node: tuple) -> List[str]:
+    if node[0] == "column":
+        return [node[1]]
+    return [
+        name
+        for child in node[1:]
+        if isinstance(child, tuple)
+        for name in _columns_of(child)
+    ]
+
+
+class Expression:
+    """This class holds a parsed `expression` rule, and evaluates it over
+    the columns of a dataset.
+
+    Missing and non-numeric values are evaluated as NaN. A comparison with
+    a NaN or infinite operand, e.g.: a division by zero, is unknown, as is
+    its negation, and unknown results never pass.
+    """
+
+    def __init__(self, text: str):
+        if not isinstance(text, str):
+            raise _invalid(str(text), "expressions must be strings")
+        self.text = text
+        self.tree = _Parser(text).parse()
+        self.fields = list(dict.fromkeys(_columns_of(self.tree)))
+        self._variables = {
+            field: f"v{index}" for index, field in enumerate(self.fields)
+        }
+
+    def _columns(self, df: DataFrame) -> Dict[str, np.ndarray]:
+        missing = [field for field in self.fields if field not in df.columns]
+        if missing:
+            raise InvalidOperationException(
+                message=(
+                    f"The expression {self.text!r} references missing "
+                    f"columns: {', '.join(missing)}."
+                )
+            )
+        return {
+            field: pd.to_numeric(df[field], errors="coerce").to_numpy(
+                np.float64
+            )
+            for field in self.fields
+        }
+
+    def _evaluate_chunk(
+        self, columns: Dict[str, np.ndarray], start: int, stop: int
+    ) -> np.ndarray:
+        chunk = {
+            field: values[start:stop] for field, values in columns.items()
+        }
+        with np.errstate(all="ignore"):
+            return _evaluate_logic(
+                self.tree, lambda node: _evaluate_arithmetic(node, chunk)
+            )
+
+    def _evaluate_numexpr(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        # Only the arithmetic operands are compiled, keeping them linear
+        local_dict = {
+            self._variables[field]: values for field, values in columns.items()
+        }
+        return _evaluate_logic(
+            self.tree,
+            lambda node: numexpr.evaluate(
+                _numexpr_source(node, self._variables), local_dict=local_dict
+            ),
+        )
+
+    def evaluate(self, df: DataFrame) -> np.ndarray:
+        """
+        Evaluate the expression over every row of the dataset.
+
+        :param df: A Pandas DataFrame with the companies' information.
+        :return: A boolean array with one result per row.
+        """
+        columns = self._columns(df)
+        rows = len(df)
+        if NUMEXPR_AVAILABLE:
+            results = self._evaluate_numexpr(columns)
+            return np.broadcast_to(results == 1, (rows,)).copy()
+
+        starts = range(0, rows, CHUNK_SIZE)
+        if len(starts) <= 1:
+            results = [self._evaluate_chunk(columns, 0, rows)]
+        else:
+            workers = min(os.cpu_count() or 1, len(starts))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(
+                    executor.map(
+                        lambda start: self._evaluate_chunk(
+                            columns, start, start + CHUNK_SIZE
+                        ),
+                        starts,
+                    )
+                )
+        return np.concatenate(
+            [
+                np.broadcast_to(chunk == 1, (min(CHUNK_SIZE, rows - start),))
+                for start, chunk in zip(starts, results)
+            ]
+            or [np.zeros(0, dtype=bool)]
+        )
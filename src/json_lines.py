@@ -0,0 +1,62 @@
+"""
+JSON Lines input: one company record per line, read in batches from a file
+or a pipe.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from typing import Iterator, TextIO
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _flatten(record: dict) -> dict:
+    """Serialize the nested values, as they are stored in the CSV datasets."""
+    return {
+        field: json.dumps(value) if isinstance(value, (dict, list)) else value
+        for field, value in record.items()
+    }
+
+
+def read_json_lines(stream: TextIO, batch_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Read the company records of a JSON Lines stream in batches, yielding
+    each batch as soon as it is complete. Blank lines are ignored, and
+    invalid lines are skipped with a warning.
+
+    Nested values, e.g.: the "Employee Locations" object, are serialized to
+    JSON strings, as they are in the CSV datasets.
+
+    :param stream: A text stream, e.g.: a file or `sys.stdin`.
+    :param batch_size: The number of records per batch.
+    :return: An iterator of Pandas DataFrames.
+    """
+    batch = []
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            logger.warning(
+                "Skipping invalid JSON on line %d: %s", line_number, e
+            )
+            continue
+        if not isinstance(record, dict):
+            logger.warning(
+                "Skipping line %d, records must be JSON objects", line_number
+            )
+            continue
+
+        batch.append(_flatten(record))
+        if len(batch) >= batch_size:
+            yield pd.DataFrame.from_records(batch)
+            batch = []
+
+    if batch:
+        yield pd.DataFrame.from_records(batch)
@@ -0,0 +1,234 @@
+"""
+Column-wise kernels for the `percentage` and `delta` rules.
+
+The "numpy" backend evaluates the rules with array operations, the "numba"
+backend compiles fused kernels making a single pass over the input columns.
+Both backends perform the same floating point operations in the same order,
+producing identical results. The "numba" backend requires the optional
+`numba` package, falling back to "numpy" when it is not installed.
+"""
+
+from __future__ import annotations
+
+import logging
+
+import numpy as np
+
+from src.exceptions import InvalidOperationException
+from src.utils.rules_utils import string_to_operator
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+logger = logging.getLogger(__name__)
+
+NUMBA_AVAILABLE = numba is not None
+
+NUMERIC_BACKENDS = ("numpy", "numba")
+
+# Delta results: the rule passed, failed or is undefined (a single step)
+DELTA_FALSE = 0
+DELTA_TRUE = 1
+DELTA_UNDEFINED = -1
+
+# Operator codes understood by the compiled kernels
+_OPERATOR_CODES = {
+    "==": 0,
+    ">": 1,
+    "<": 2,
+    ">=": 3,
+    "<=": 4,
+    "!=": 5,
+}
+
+
+def operator_code(op_string: str) -> int:
+    """
+    Translate an operator word from the rules into a kernel operator code.
+
+    :param op_string: Operator word, e.g.: "greater_equal".
+    :return: The operator code.
+    """
+    op_symbol = string_to_operator(op_string)
+    if op_symbol is None:
+        raise InvalidOperationException(
+            message=f"Unknown operator: {op_string}"
+        )
+    return _OPERATOR_CODES[op_symbol]
+
+
+def _compare_numpy(a: np.ndarray, op_code: int, b: float) -> np.ndarray:
+    if op_code == 0:
+        return a == b
+    if op_code == 1:
+        return a > b
+    if op_code == 2:
+        return a < b
+    if op_code == 3:
+        return a >= b
+    if op_code == 4:
+        return a <= b
+    return a != b
+
+
+def percentage_numpy(
+    numbers: np.ndarray, totals: np.ndarray, op_code: int, target: float
+) -> np.ndarray:
+    """
+    Compare the percentage that `numbers` represent of `totals`.
+    Undefined percentages, e.g.: of a zero total, fail every comparison.
+
+    :param numbers: A float array with the company numbers.
+    :param totals: A float array with the 100% references.
+    :param op_code: The operator code.
+    :param target: The percentage to compare with.
+    :return: A boolean array.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percents = (100 * numbers) / totals
+    return np.isfinite(percents) & _compare_numpy(percents, op_code, target)
+
+
+def delta_numpy(
+    values: np.ndarray,
+    factors: np.ndarray,
+    op_code: int,
+    target: float,
+    low: float,
+    high: float,
+    is_range: bool,
+) -> np.ndarray:
+    """
+    Compare the variations between the consecutive non-zero steps of a
+    series, after flattening each step to the reference unit.
+    With the "range" operator only the first variation is compared,
+    otherwise all the variations must satisfy the operator.
+
+    :param values: A float matrix with one row per company and one column
+            per step of the series.
+    :param factors: A float array with the flattening factor of each step.
+    :param op_code: The operator code, ignored for ranges.
+    :param target: The value to compare with, ignored for ranges.
+    :param low: The range lower boundary.
+    :param high: The range upper boundary.
+    :param is_range: Whether the operator is "range".
+    :return: An int8 array with DELTA_TRUE, DELTA_FALSE or DELTA_UNDEFINED.
+    """
+    rows, steps = values.shape
+    previous = np.zeros(rows)
+    count = np.zeros(rows, dtype=np.int64)
+    result = np.ones(rows, dtype=bool)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for step in range(steps):
+            present = values[:, step] != 0
+            flattened = values[:, step] * factors[step]
+            has_previous = present & (count > 0)
+            variations = np.round(np.abs(flattened - previous) / previous, 2)
+            if is_range:
+                first = has_previous & (count == 1)
+                in_range = (low <= variations) & (variations <= high)
+                result = np.where(first, in_range, result)
+            else:
+                passed = _compare_numpy(variations, op_code, target)
+                result &= ~has_previous | passed
+            previous = np.where(present, flattened, previous)
+            count += present
+
+    codes = result.astype(np.int8)
+    codes[count == 0] = DELTA_FALSE
+    if is_range:
+        codes[count == 1] = DELTA_UNDEFINED
+    return codes
+
+
+if NUMBA_AVAILABLE:
+
+    @numba.njit(inline="always")
+    def _compare_numba(a, op_code, b):
+        if op_code == 0:
+            return a == b
+        if op_code == 1:
+            return a > b
+        if op_code == 2:
+            return a < b
+        if op_code == 3:
+            return a >= b
+        if op_code == 4:
+            return a <= b
+        return a != b
+
+    @numba.njit(cache=True, nogil=True, error_model="numpy")
+    def percentage_numba(numbers, totals, op_code, target):
+        out = np.empty(numbers.shape[0], dtype=np.bool_)
+        for i in range(numbers.shape[0]):
+            percent = (100 * numbers[i]) / totals[i]
+            out[i] = np.isfinite(percent) and _compare_numba(
+                percent, op_code, target
+            )
+        return out
+
+    @numba.njit(cache=True, nogil=True, error_model="numpy")
+    def delta_numba(values, factors, op_code, target, low, high, is_range):
+        rows, steps = values.shape
+        out = np.empty(rows, dtype=np.int8)
+        for i in range(rows):
+            previous = 0.0
+            count = 0
+            result = True
+            for step in range(steps):
+                value = values[i, step]
+                if value == 0:
+                    continue
+                flattened = value * factors[step]
+                if count > 0:
+                    variation = np.round(
+                        abs(flattened - previous) / previous, 2
+                    )
+                    if is_range:
+                        if count == 1:
+                            result = low <= variation and variation <= high
+                    elif not _compare_numba(variation, op_code, target):
+                        result = False
+                previous = flattened
+                count += 1
+
+            if count == 0:
+                out[i] = DELTA_FALSE
+            elif count == 1 and is_range:
+                out[i] = DELTA_UNDEFINED
+            else:
+                out[i] = DELTA_TRUE if result else DELTA_FALSE
+        return out
+
+
+def resolve_backend(backend: str) -> str:
+    """
+    Validate a numeric backend, falling back to "numpy" when the "numba"
+    backend is requested but not installed.
+
+    :param backend: The backend name, "numpy" or "numba".
+    :return: The backend name to use.
+    """
+    if backend not in NUMERIC_BACKENDS:
+        raise InvalidOperationException(
+            message=f"Unknown numeric backend: {backend}"
+        )
+    if backend == "numba" and not NUMBA_AVAILABLE:
+        logger.warning("Numba is not installed, using the numpy backend")
+        return "numpy"
+    return backend
+
+
+def get_kernels(backend: str):
+    """
+    Select the kernels of a numeric backend.
+
+    :param backend: The backend name, "numpy" or "numba".
+    :return: A tuple with the percentage and delta kernels.
+    """
+    if backend == "numba" and NUMBA_AVAILABLE:
+        return percentage_numba, delta_numba
+    return percentage_numpy, delta_numpy
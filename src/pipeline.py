@@ -0,0 +1,210 @@
+"""
+Producer/consumer pipeline overlapping the dataset reading, the
+classification and the output writing.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from typing import Iterable, Optional
+
+import numpy as np
+from pandas import DataFrame
+
+from src.classifier import ClassificationEngine
+from src.utils.profiling import StageProfiler, maybe_profile
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a queue's stream
+_SENTINEL = object()
+
+# Seconds to wait on a full queue before checking if the pipeline stopped
+_QUEUE_POLL_INTERVAL = 0.1
+
+
+class _Failure:
+    """Wraps an exception raised by the reader thread."""
+
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+class ClassificationPipeline:
+    """This class classifies a stream of chunks with three stages:
+        - A reader thread prefetching chunks into a bounded queue.
+        - The calling thread classifying the current chunk.
+        - A writer thread flushing classified chunks to the output sink.
+
+    The bounded queues provide the backpressure between the stages.
+    """
+
+    def __init__(
+        self,
+        classifier: ClassificationEngine,
+        classification_engine: str,
+        read_queue_size: int = 2,
+        write_queue_size: int = 2,
+        profiler: Optional[StageProfiler] = None,
+    ):
+        self.classifier = classifier
+        self.classification_engine = classification_engine
+        self.read_queue_size = read_queue_size
+        self.write_queue_size = write_queue_size
+        # Profiles the reader and writer threads, with `--profile`
+        self.profiler = profiler
+        # Progress of the runs limited to the first interesting companies
+        self.interesting_rows = 0
+        self.limit_reached = False
+
+    @staticmethod
+    def _put(target: queue.Queue, item, stop_event: threading.Event) -> bool:
+        """
+        Put an item into a bounded queue, giving up if the pipeline stopped.
+
+        :param target: The queue receiving the item.
+        :param item: The item to enqueue.
+        :param stop_event: The event signaling that the pipeline stopped.
+        :return: Whether the item was enqueued.
+        """
+        while not stop_event.is_set():
+            try:
+                target.put(item, timeout=_QUEUE_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read(
+        self,
+        chunks: Iterable[DataFrame],
+        read_queue: queue.Queue,
+        stop_event: threading.Event,
+    ) -> None:
+        """
+        Reader thread: prefetch the chunks into the read queue.
+
+        :return: None
+        """
+        try:
+            with maybe_profile(self.profiler, "read", track_memory=False):
+                for chunk in chunks:
+                    if not self._put(read_queue, chunk, stop_event):
+                        return
+        except BaseException as e:
+            self._put(read_queue, _Failure(e), stop_event)
+        finally:
+            self._put(read_queue, _SENTINEL, stop_event)
+
+    def _write(self, write_queue: queue.Queue, sink, errors: list) -> None:
+        """
+        Writer thread: append the classified chunks to the output sink.
+        After a failure, the remaining chunks are drained and discarded.
+
+        :return: None
+        """
+        with maybe_profile(self.profiler, "write", track_memory=False):
+            while True:
+                results_df = write_queue.get()
+                if results_df is _SENTINEL:
+                    return
+                if errors:
+                    continue
+                try:
+                    sink.write(results_df)
+                except Exception as e:
+                    errors.append(e)
+
+    def _truncate(self, results_df: DataFrame, limit: int) -> DataFrame:
+        """
+        Count the interesting companies of a classified chunk, cutting it
+        after the interesting company reaching the limit.
+
+        :param results_df: A Pandas DataFrame returned by the classifier.
+        :param limit: The number of interesting companies to find.
+        :return: The classified rows up to the limit.
+        """
+        positions = np.flatnonzero(results_df["is_interesting"].to_numpy())
+        remaining = limit - self.interesting_rows
+        if len(positions) >= remaining:
+            self.limit_reached = True
+            results_df = results_df.iloc[: positions[remaining - 1] + 1]
+        self.interesting_rows += min(len(positions), remaining)
+        return results_df
+
+    def run(
+        self, chunks: Iterable[DataFrame], sink, limit: Optional[int] = None
+    ) -> int:
+        """
+        Classify all the chunks and write the results to `sink`.
+        The sink is closed once all the chunks were written.
+
+        With a `limit`, the run stops reading and classifying the chunks as
+        soon as `limit` interesting companies were found: the output holds
+        every row up to the last of them.
+
+        :param chunks: An iterable of Pandas DataFrames to classify.
+        :param sink: The output sink receiving the results.
+        :param limit: An optional number of interesting companies to find.
+        :return: The number of classified rows.
+        """
+        read_queue = queue.Queue(maxsize=self.read_queue_size)
+        write_queue = queue.Queue(maxsize=self.write_queue_size)
+        stop_event = threading.Event()
+        write_errors = []
+
+        reader = threading.Thread(
+            target=self._read,
+            args=(chunks, read_queue, stop_event),
+            name="classifier-reader",
+            daemon=True,
+        )
+        writer = threading.Thread(
+            target=self._write,
+            args=(write_queue, sink, write_errors),
+            name="classifier-writer",
+            daemon=True,
+        )
+        reader.start()
+        writer.start()
+
+        total_rows = 0
+        self.interesting_rows = 0
+        self.limit_reached = False
+        try:
+            while not write_errors:
+                chunk = read_queue.get()
+                if chunk is _SENTINEL:
+                    break
+                if isinstance(chunk, _Failure):
+                    raise chunk.exception
+
+                results_df = self.classifier.classify(
+                    self.classification_engine, chunk
+                )
+                if limit is not None:
+                    results_df = self._truncate(results_df, limit)
+                total_rows += len(results_df)
+                logger.debug("Classified %d companies so far...", total_rows)
+                write_queue.put(results_df)
+                if self.limit_reached:
+                    logger.info(
+                        "Found %d interesting companies in %d rows, stopping",
+                        self.interesting_rows,
+                        total_rows,
+                    )
+                    break
+        finally:
+            stop_event.set()
+            write_queue.put(_SENTINEL)
+            writer.join()
+            if not self.limit_reached:
+                # Once stopped early, the reader may be blocked on the input
+                reader.join()
+
+        if write_errors:
+            raise write_errors[0]
+        sink.close()
+        return total_rows
@@ -0,0 +1,474 @@
+"""
+Polars backend: the dataset is scanned as a Polars lazy frame, sanitized and
+classified by Polars expressions, leaving the query optimiser to project the
+columns read by the rules and to evaluate the rules on all cores.
+
+The `numeric`, `date`, `percentage`, `delta` and `expression` rules and the
+SaaS check are translated into Polars expressions performing the same
+operations as the pandas engines. The `text` rules, the static engine and
+the rules on missing or non-numeric columns are evaluated by the pandas
+engines on the classified frame, so that both backends produce the same
+results row for row. The backend requires the optional `polars` package.
+"""
+
+from __future__ import annotations
+
+import logging
+import operator
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.exceptions import ImproperlyConfiguredException
+from src.rules_engine import (
+    SAAS_REJECTION_PATTERNS,
+    SAAS_SEARCH_PATTERNS,
+    Rule,
+)
+from src.text_index import TextIndexes
+from src.utils.rules_utils import string_to_operator
+
+try:
+    import polars as pl
+    import polars.selectors as cs
+except ImportError:
+    pl = None
+
+logger = logging.getLogger(__name__)
+
+POLARS_AVAILABLE = pl is not None
+
+DATAFRAME_BACKENDS = ("pandas", "polars")
+
+
+def resolve_dataframe_backend(backend: str) -> str:
+    """
+    Validate a dataframe backend, failing when the "polars" backend is
+    requested but not installed.
+
+    :param backend: The backend name, "pandas" or "polars".
+    :return: The backend name.
+    """
+    if backend not in DATAFRAME_BACKENDS:
+        raise ImproperlyConfiguredException(
+            message=f"Unknown dataframe backend: {backend}",
+            parameter_name="application.dataframe_backend",
+        )
+    if backend == "polars" and not POLARS_AVAILABLE:
+        raise ImproperlyConfiguredException(
+            message="The polars backend requires `pip install polars`.",
+            parameter_name="application.dataframe_backend",
+        )
+    return backend
+
+
+def _compare(left, op_symbol: str, right):
+    """
+    Compare with Python's semantics: NaN fails every comparison but "!=",
+    while Polars orders NaN above every number.
+    """
+    comparisons = {
+        "==": left == right,
+        "!=": left != right,
+        ">": left > right,
+        "<": left < right,
+        ">=": left >= right,
+        "<=": left <= right,
+    }
+    is_nan = left.is_nan()
+    if isinstance(right, pl.Expr):
+        is_nan = is_nan | right.is_nan()
+    return (
+        pl.when(is_nan)
+        .then(pl.lit(op_symbol == "!="))
+        .otherwise(comparisons[op_symbol])
+    )
+
+
+def _in_range(expr, low, high):
+    return _compare(expr, ">=", low) & _compare(expr, "<=", high)
+
+
+def _numbers(field: str):
+    """Read a column as floats, missing values being NaN as in pandas."""
+    return pl.col(field).cast(pl.Float64).fill_null(float("nan"))
+
+
+def _round(expr, decimals: int):
+    """Round as `np.round`: scale, round half to even and scale back."""
+    scale = 10.0**decimals
+    return (expr * scale).round(0, mode="half_to_even") / scale
+
+
+def _operator(rule: Rule) -> str:
+    return string_to_operator(rule.parameters["operator"])
+
+
+def _numeric_expression(rule: Rule):
+    value = _numbers(rule.parameters["field"])
+    if rule.parameters["operator"] == "range":
+        return _in_range(value, rule.parameters["min"], rule.parameters["max"])
+    return _compare(value, _operator(rule), rule.parameters["value"])
+
+
+def _date_expression(rule: Rule):
+    value = _numbers(rule.parameters["field"])
+    operator = rule.parameters["operator"]
+    if operator == "range":
+        return _in_range(value, rule.parameters["min"], rule.parameters["max"])
+    if rule.parameters.get("year", None):
+        # The year is compared with the field, not the opposite
+        reversed_operators = {">": "<", "<": ">", ">=": "<=", "<=": ">="}
+        op_symbol = _operator(rule)
+        return _compare(
+            value,
+            reversed_operators.get(op_symbol, op_symbol),
+            rule.parameters["year"],
+        )
+
+    date_options = {
+        "current_year": datetime.now().year,
+        "last_year": datetime.now().year - 1,
+    }
+    reference = rule.parameters["reference_date"]
+    delta = date_options.get(reference, reference) - value
+    return _compare(delta, _operator(rule), rule.parameters["value"])
+
+
+def _percentage_expression(rule: Rule):
+    field = rule.parameters["field"]
+    locator = rule.parameters["locator"]
+    if locator:
+        located = pl.col(field).str.json_path_match(f"$['{locator}']")
+        numbers = located.cast(pl.Float64, strict=False).fill_null(
+            float("nan")
+        )
+    else:
+        numbers = _numbers(field)
+    percents = (100 * numbers) / _numbers(rule.parameters["reference"])
+    # Undefined percentages, e.g.: of a zero total, never pass
+    return percents.is_finite() & _compare(
+        percents, _operator(rule), rule.parameters["value"]
+    )
+
+
+def _delta_expression(rule: Rule):
+    """Polars counterpart of the numpy delta kernel, step by step."""
+    is_range = rule.parameters["operator"] == "range"
+    previous = pl.lit(0.0)
+    count = pl.lit(0)
+    result = pl.lit(True)
+    for step in rule.parameters["series"]:
+        value = _numbers(step["field"])
+        factor = rule.parameters["ref_unit"] / step["unit_span"]
+        present = value != 0
+        flattened = value * factor
+        has_previous = present & (count > 0)
+        variations = _round((flattened - previous).abs() / previous, 2)
+        if is_range:
+            first = has_previous & (count == 1)
+            in_range = _in_range(
+                variations, rule.parameters["min"], rule.parameters["max"]
+            )
+            result = pl.when(first).then(in_range).otherwise(result)
+        else:
+            passed = _compare(
+                variations, _operator(rule), rule.parameters["value"]
+            )
+            result = result & (~has_previous | passed)
+        previous = pl.when(present).then(flattened).otherwise(previous)
+        count = count + present.cast(pl.Int64)
+
+    result = pl.when(count == 0).then(pl.lit(False)).otherwise(result)
+    if is_range:
+        # A single non-zero step has no variation to compare
+        result = (
+            pl.when(count == 1)
+            .then(pl.lit(None, pl.Boolean))
+            .otherwise(result)
+        )
+    return result
+
+
+def _known_compare(left, op_symbol: str, right):
+    """
+    Compare with the three-valued logic of the expression rules: null, i.e.
+    unknown, when an operand is NaN or infinite.
+    """
+    comparisons = {
+        "==": operator.eq,
+        "!=": operator.ne,
+        ">": operator.gt,
+        ">=": operator.ge,
+        "<": operator.lt,
+        "<=": operator.le,
+    }
+    return pl.when(left.is_finite() & right.is_finite()).then(
+        comparisons[op_symbol](left, right)
+    )
+
+
+def _expression_tree(node: tuple):
+    """
+    Polars counterpart of the NumPy evaluator of the expression rules, the
+    unknown results being nulls, which follow the same three-valued logic.
+    """
+    kind = node[0]
+    if kind == "number":
+        return pl.lit(node[1], dtype=pl.Float64)
+    if kind == "column":
+        return _numbers(node[1])
+    if kind == "negative":
+        return -_expression_tree(node[1])
+    if kind == "not":
+        return ~_expression_tree(node[1])
+    if kind == "call":
+        argument = _expression_tree(node[2])
+        return {
+            "abs": argument.abs,
+            "sqrt": argument.sqrt,
+            "log": argument.log,
+        }[node[1]]()
+
+    op_symbol, left, right = node[1:]
+    left, right = _expression_tree(left), _expression_tree(right)
+    if kind == "compare":
+        return _known_compare(left, op_symbol, right)
+    if kind == "boolean":
+        return left & right if op_symbol == "and" else left | right
+    arithmetic = {
+        "+": left.add,
+        "-": left.sub,
+        "*": left.mul,
+        "/": left.truediv,
+        "**": left.pow,
+    }
+    return arithmetic[op_symbol](right)
+
+
+_TRANSLATIONS = {
+    "numeric": _numeric_expression,
+    "date": _date_expression,
+    "percentage": _percentage_expression,
+    "delta": _delta_expression,
+    # Unknown results never pass
+    "expression": lambda rule: _expression_tree(
+        rule.expression.tree
+    ).fill_null(False),
+}
+
+
+def rule_expression(rule: Rule, schema) -> Optional["pl.Expr"]:
+    """
+    Translate a rule into a Polars expression.
+
+    :param rule: The rule.
+    :param schema: The schema of the classified frame.
+    :return: A boolean expression, or None when the rule is evaluated by the
+            pandas engine.
+    """
+    if rule.rule_type not in _TRANSLATIONS:
+        return None
+    if (
+        rule.rule_type == "percentage"
+        and rule.parameters["operator"] == "range"
+    ):
+        return None
+
+    numeric_fields = rule.fields
+    if rule.rule_type == "percentage" and rule.parameters["locator"]:
+        field = rule.parameters["field"]
+        if schema.get(field) != pl.String:
+            return None
+        numeric_fields = [rule.parameters["reference"]]
+    if rule.rule_type == "delta":
+        # Missing steps are zeros, which are skipped
+        numeric_fields = [field for field in rule.fields if field in schema]
+    if not all(
+        field in schema and schema[field].is_numeric()
+        for field in numeric_fields
+    ):
+        return None
+    return _TRANSLATIONS[rule.rule_type](rule).alias(rule.rule_id)
+
+
+def saas_expression(field: str = "Description"):
+    """Polars counterpart of `StaticRulesEngine.is_saas_company_batch`."""
+    texts = pl.col(field).cast(pl.String).fill_null("")
+    rejected = texts.str.contains("(?i)" + "|".join(SAAS_REJECTION_PATTERNS))
+    found = texts.str.contains("(?i)" + "|".join(SAAS_SEARCH_PATTERNS))
+    return (~rejected & found).alias("is_saas")
+
+
+def sanitize_lazy(lf, sanitizing_strategy: int, nullable_integers: List[str]):
+    """
+    Polars counterpart of `sanitize_dataframe`: with a strategy, missing
+    values get the empty value of their column type.
+
+    Integer columns with missing values are read as floats, as pandas does.
+
+    :param lf: A Polars LazyFrame with the companies.
+    :param sanitizing_strategy: The data sanitizing strategy.
+    :param nullable_integers: The integer columns with missing values.
+    :return: The sanitized LazyFrame.
+    """
+    lf = lf.with_columns(
+        [pl.col(field).cast(pl.Float64) for field in nullable_integers]
+    )
+    if not sanitizing_strategy:
+        return lf
+    return lf.with_columns(
+        cs.string().fill_null(""),
+        cs.boolean().fill_null(False),
+        cs.numeric().fill_null(0),
+    )
+
+
+def to_pandas(df, input_columns: List[str]) -> pd.DataFrame:
+    """
+    Convert a classified Polars DataFrame, with the pandas representation of
+    the input columns: missing values are NaN.
+
+    :param df: A Polars DataFrame.
+    :param input_columns: The input columns of the frame.
+    :return: A Pandas DataFrame.
+    """
+    columns = {}
+    for series in df.get_columns():
+        values = series.to_numpy()
+        if series.name in input_columns and values.dtype == object:
+            values = np.where(pd.isna(values), np.nan, values)
+        columns[series.name] = values
+    return pd.DataFrame(columns)
+
+
+def _enrich_lazy(lf, enricher):
+    """Left join the enrichment sources, keeping the order of the rows."""
+    if enricher is None:
+        return lf
+    for source in enricher.sources:
+        schema = lf.collect_schema()
+        fields = [field for field in source.fields if field not in schema]
+        if not fields:
+            continue
+        table = source.table(fields)
+        columns = {column: table[column].to_numpy() for column in table}
+        lf = lf.join(
+            pl.DataFrame(columns, strict=False).lazy(),
+            on=source.key,
+            how="left",
+            maintain_order="left",
+        )
+    return lf
+
+
+class PolarsClassificationEngine:
+    """This class classifies Polars frames with the rules of a pandas
+    `ClassificationEngine`, translating them into Polars expressions.
+
+    It has the interface of the `ClassificationEngine` expected by the
+    pipeline: `classify` returns a pandas DataFrame, written by the same
+    result sinks as the pandas backend.
+    """
+
+    def __init__(self, classifier, sanitizing_strategy: int, enricher=None):
+        self.classifier = classifier
+        self.sanitizing_strategy = sanitizing_strategy
+        self.enricher = enricher
+
+    @staticmethod
+    def scan(file_path: str):
+        """
+        Scan a CSV dataset, inferring the column types from all its rows as
+        pandas does.
+
+        :param file_path: The file path for the dataset.
+        :return: A Polars LazyFrame.
+        """
+        return pl.scan_csv(file_path, infer_schema_length=None)
+
+    def iter_companies(
+        self, file_path: str, chunk_size: int, skip_chunks: int = 0
+    ) -> Iterator:
+        """
+        Read a CSV dataset in chunks of `chunk_size` rows.
+
+        :param file_path: The file path for the dataset.
+        :param chunk_size: The number of rows per chunk.
+        :param skip_chunks: The number of leading chunks already classified.
+        :return: An iterator of Polars DataFrames.
+        """
+        batches = self.scan(file_path).collect_batches(chunk_size=chunk_size)
+        for chunk_number, chunk in enumerate(batches):
+            if chunk_number >= skip_chunks:
+                yield chunk
+
+    def _nullable_integers(self, lf) -> List[str]:
+        schema = lf.collect_schema()
+        integers = [
+            field for field, dtype in schema.items() if dtype.is_integer()
+        ]
+        if not integers:
+            return []
+        null_counts = lf.select(pl.col(integers).null_count()).collect()
+        return [field for field in integers if null_counts[field][0] > 0]
+
+    def classify(self, classification_engine: str, companies) -> pd.DataFrame:
+        """
+        Sanitize and classify the companies.
+
+        :param classification_engine: "static" or "dynamic".
+        :param companies: A Polars DataFrame or LazyFrame.
+        :return: A pandas DataFrame, as returned by `ClassificationEngine`.
+        """
+        lf = companies.lazy()
+        lf = sanitize_lazy(
+            lf, self.sanitizing_strategy, self._nullable_integers(lf)
+        )
+        lf = _enrich_lazy(lf, self.enricher)
+        schema = lf.collect_schema()
+        input_columns = list(schema)
+
+        if classification_engine != "dynamic":
+            companies_df = to_pandas(lf.collect(), input_columns)
+            return self.classifier.classify(
+                classification_engine, companies_df
+            )
+
+        rules = self.classifier.rule_processor.parse_rules()
+        if not isinstance(rules, list):
+            rules = [rules]
+        expressions = {}
+        for rule in rules:
+            expression = rule_expression(rule, schema)
+            if expression is not None:
+                expressions[rule.rule_id] = expression
+        saas_check = not self.classifier.rule_processor.replaces_saas_check
+        if saas_check:
+            expressions["is_saas"] = saas_expression()
+
+        classified_df = to_pandas(
+            lf.with_columns(expressions.values()).collect(), input_columns
+        )
+        companies_df = classified_df[input_columns]
+
+        # The rules without translation are evaluated by the pandas engine
+        text_indexes = TextIndexes(companies_df)
+        rule_results = {}
+        for rule in rules:
+            if rule.rule_id in expressions:
+                rule_results[rule.rule_id] = classified_df[
+                    rule.rule_id
+                ].to_numpy()
+            else:
+                rule_results[rule.rule_id] = rule.evaluate(
+                    companies_df,
+                    factorize=self.classifier.factorize,
+                    numeric_backend=self.classifier.numeric_backend,
+                    text_indexes=text_indexes,
+                )
+        if saas_check:
+            rule_results["is_saas"] = classified_df["is_saas"].to_numpy()
+        return self.classifier.build_results(companies_df, rule_results)
@@ -0,0 +1,326 @@
+"""
+Output sinks receiving the classification results, chunk by chunk.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+from src.exceptions import ImproperlyConfiguredException
+
+# Rows are packed 8 per byte, chunks are packed on multiples of 8 rows
+_BITS_PER_BYTE = 8
+
+# SQLite column type of each pandas dtype kind, the others are stored as text
+_SQLITE_TYPES = {"b": "INTEGER", "i": "INTEGER", "u": "INTEGER", "f": "REAL"}
+
+
+def rule_result_columns(results_df: DataFrame) -> List[str]:
+    """
+    List the result columns of a classified DataFrame: `is_interesting`
+    followed by the individual rule results.
+
+    :param results_df: A Pandas DataFrame returned by the classifier.
+    :return: A list of column names.
+    """
+    columns = list(results_df.columns)
+    return columns[columns.index("is_interesting") :]
+
+
+class CsvResultSink:
+    """This sink writes the full classified DataFrames to a CSV file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._write_header = True
+
+    def write(self, results_df: DataFrame) -> None:
+        results_df.to_csv(
+            self.path,
+            mode="w" if self._write_header else "a",
+            header=self._write_header,
+            index=False,
+        )
+        self._write_header = False
+
+    def close(self) -> None:
+        pass
+
+
+class JsonLinesResultSink:
+    """This sink writes the classified DataFrames as JSON Lines, one record
+    per company. Every chunk is flushed once written, so that its records
+    can be consumed as soon as they are classified.
+    """
+
+    def __init__(self, path: str, stream: Optional[TextIO] = None):
+        self.path = path
+        self._stream = stream
+        # Streams given by the caller, e.g.: `sys.stdout`, are left open
+        self._owns_stream = stream is None
+
+    def write(self, results_df: DataFrame) -> None:
+        if self._stream is None:
+            self._stream = open(self.path, "w")
+        if len(results_df):
+            self._stream.write(
+                results_df.to_json(
+                    orient="records", lines=True, force_ascii=False
+                )
+            )
+        self._stream.flush()
+
+    def close(self) -> None:
+        if self._stream is None:
+            return
+        if self._owns_stream:
+            self._stream.close()
+        else:
+            self._stream.flush()
+
+
+class BitPackedResultSink:
+    """This sink writes a compact results file: the company ids and a
+    bit-packed row x rule matrix, with the rule ids as header.
+
+    The file is a numpy `.npz` archive with the following arrays:
+        - `rule_ids`: The rule id of each matrix column.
+        - `company_ids`: The company id of each matrix row.
+        - `bits`: The matrix packed along the rows, 8 rows per byte.
+        - `rows`: The number of rows of the unpacked matrix.
+    """
+
+    def __init__(self, path: str, id_column: Optional[str] = None):
+        self.path = path
+        self.id_column = id_column
+        self.rule_ids = None
+        self._company_ids = []
+        self._packed = []
+        self._pending = None
+        self._rows = 0
+
+    def _company_ids_of(self, results_df: DataFrame) -> np.ndarray:
+        if self.id_column and self.id_column in results_df.columns:
+            return results_df[self.id_column].to_numpy(dtype=str)
+        # Without an id column, fall back to the row position
+        positions = np.arange(self._rows, self._rows + len(results_df))
+        return positions.astype(str)
+
+    def write(self, results_df: DataFrame) -> None:
+        if self.rule_ids is None:
+            self.rule_ids = rule_result_columns(results_df)
+
+        matrix = results_df[self.rule_ids].to_numpy().astype(bool)
+        if self._pending is not None:
+            matrix = np.concatenate([self._pending, matrix])
+
+        # Pack the rows aligned on whole bytes, keep the others for later
+        aligned_rows = len(matrix) - len(matrix) % _BITS_PER_BYTE
+        self._packed.append(np.packbits(matrix[:aligned_rows], axis=0))
+        self._pending = matrix[aligned_rows:]
+
+        self._company_ids.append(self._company_ids_of(results_df))
+        self._rows += len(results_df)
+
+    def close(self) -> None:
+        rule_ids = self.rule_ids or []
+        packed = self._packed
+        if self._pending is not None and len(self._pending):
+            packed = packed + [np.packbits(self._pending, axis=0)]
+        if packed:
+            bits = np.concatenate(packed)
+        else:
+            bits = np.zeros((0, len(rule_ids)), dtype=np.uint8)
+
+        company_ids = (
+            np.concatenate(self._company_ids)
+            if self._company_ids
+            else np.zeros(0, dtype=str)
+        )
+        with open(self.path, "wb") as file:
+            np.savez_compressed(
+                file,
+                rule_ids=np.asarray(rule_ids, dtype=str),
+                company_ids=company_ids,
+                bits=bits,
+                rows=np.int64(self._rows),
+            )
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class SqliteResultSink:
+    """This sink inserts the classified DataFrames into a table of a SQLite
+    database, one table per run.
+
+    The rows are inserted in batches, one transaction per chunk, into a
+    staging table. On close, the staging table is renamed after the run,
+    indexed on `is_interesting` and each rule column, and registered in the
+    `runs` table; the `latest_results` view then selects the latest run.
+    An interrupted run leaves its staging table, which is replaced when the
+    run is classified again.
+    """
+
+    def __init__(
+        self, database_path: str, table: str, batch_size: int = 10000
+    ):
+        self.database_path = database_path
+        self.table = table
+        self.batch_size = batch_size
+        # Locates the table, the database itself is shared by the runs
+        self.path = f"{database_path}#{table}"
+        self.rule_ids = None
+        self._staging_table = f"{table}__staging"
+        self._connection = None
+        self._insert = None
+        self._rows = 0
+
+    def _open(self, results_df: DataFrame) -> None:
+        Path(self.database_path).parent.mkdir(parents=True, exist_ok=True)
+        # Concurrent runs, e.g.: `batch` workers, wait for each other's
+        # writes. The pipeline writes from its writer thread and closes the
+        # sink once that thread is joined.
+        self._connection = sqlite3.connect(
+            self.database_path, timeout=60, check_same_thread=False
+        )
+        # Readers, e.g.: dashboards, are not blocked by the inserts
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+
+        self.rule_ids = rule_result_columns(results_df)
+        columns = []
+        for column, dtype in results_df.dtypes.items():
+            if column in self.rule_ids:
+                column_type = "INTEGER"
+            else:
+                column_type = _SQLITE_TYPES.get(dtype.kind, "TEXT")
+            columns.append(f"{_quote(column)} {column_type}")
+
+        staging_table = _quote(self._staging_table)
+        with self._connection:
+            self._connection.execute(f"DROP TABLE IF EXISTS {staging_table}")
+            self._connection.execute(
+                f"CREATE TABLE {staging_table} ({', '.join(columns)})"
+            )
+        placeholders = ", ".join("?" * len(results_df.columns))
+        self._insert = f"INSERT INTO {staging_table} VALUES ({placeholders})"
+
+    def write(self, results_df: DataFrame) -> None:
+        if self._connection is None:
+            self._open(results_df)
+
+        # Python values, missing ones being NULL
+        rows = list(
+            results_df.astype(object)
+            .where(results_df.notna(), None)
+            .itertuples(index=False, name=None)
+        )
+        with self._connection:
+            for start in range(0, len(rows), self.batch_size):
+                self._connection.executemany(
+                    self._insert, rows[start : start + self.batch_size]
+                )
+        self._rows += len(rows)
+
+    def close(self) -> None:
+        if self._connection is None:
+            return
+        table = _quote(self.table)
+        with self._connection:
+            # The run is published at once, DDL statements included
+            self._connection.execute("BEGIN")
+            # Indexing once the rows are inserted is faster than on insert
+            self._connection.execute(f"DROP TABLE IF EXISTS {table}")
+            self._connection.execute(
+                f"ALTER TABLE {_quote(self._staging_table)} RENAME TO {table}"
+            )
+            for rule_id in self.rule_ids:
+                index = _quote(f"{self.table}__{rule_id}")
+                self._connection.execute(
+                    f"CREATE INDEX {index} ON {table} ({_quote(rule_id)})"
+                )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS runs "
+                "(table_name TEXT PRIMARY KEY, rows INTEGER, "
+                "completed_at TEXT)"
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?)",
+                (self.table, self._rows, datetime.now().isoformat()),
+            )
+            self._connection.execute("DROP VIEW IF EXISTS latest_results")
+            self._connection.execute(
+                f"CREATE VIEW latest_results AS SELECT * FROM {table}"
+            )
+        self._connection.close()
+        self._connection = None
+
+
+def load_bitpacked_results(
+    path: str,
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Load a bit-packed results file.
+
+    :param path: The results file path.
+    :return: A tuple with the company ids and a dictionary with the boolean
+            mask of each rule id, `is_interesting` included.
+    """
+    with np.load(path) as archive:
+        rows = int(archive["rows"])
+        rule_ids = archive["rule_ids"].tolist()
+        matrix = np.unpackbits(archive["bits"], axis=0, count=rows)
+        company_ids = archive["company_ids"]
+
+    masks = {
+        rule_id: matrix[:, index].astype(bool)
+        for index, rule_id in enumerate(rule_ids)
+    }
+    return company_ids, masks
+
+
+def create_result_sink(
+    output_format: str,
+    path: str,
+    id_column: Optional[str] = None,
+    sqlite_path: Optional[str] = None,
+):
+    """
+    Create the output sink of the requested format.
+    For the "bitpacked" and "jsonl" formats, the extension of `path` becomes
+    `.npz` and `.jsonl`. For the "sqlite" format, the results are written to
+    the `sqlite_path` database, in a table named after `path`.
+
+    :param output_format: The output format, "csv", "jsonl", "bitpacked"
+            or "sqlite".
+    :param path: The output file path.
+    :param id_column: The column identifying the companies.
+    :param sqlite_path: The database of the "sqlite" format, defaults to
+            `results.db` in the output directory.
+    :return: A result sink.
+    """
+    if output_format == "csv":
+        return CsvResultSink(path)
+    if output_format == "jsonl":
+        return JsonLinesResultSink(str(Path(path).with_suffix(".jsonl")))
+    if output_format == "bitpacked":
+        return BitPackedResultSink(
+            str(Path(path).with_suffix(".npz")), id_column=id_column
+        )
+    if output_format == "sqlite":
+        return SqliteResultSink(
+            sqlite_path or str(Path(path).with_name("results.db")),
+            Path(path).stem,
+        )
+    raise ImproperlyConfiguredException(
+        message=f"Unknown output format: {output_format}",
+        parameter_name="output.format",
+    )
@@ -0,0 +1,141 @@
+"""
+On-disk cache of the results of each rule, so that editing a ruleset only
+evaluates the new and changed rules again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+logger = logging.getLogger(__name__)
+
+# Bump when the evaluation of the rules changes, to discard every result
+CACHE_VERSION = 4
+
+
+def _normalize(value):
+    """Normalize a rule definition, so that equivalent YAML values match."""
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def definition_hash(definition: dict) -> str:
+    """
+    Hash the normalized definition of a rule: its type and parameters, but
+    not its id or name.
+
+    :param definition: The rule definition.
+    :return: A hexadecimal digest.
+    """
+    payload = json.dumps(
+        {"version": CACHE_VERSION, "rule": _normalize(definition)},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def dataset_fingerprint(df: DataFrame, fields: Iterable[str]) -> str:
+    """
+    Hash the values of the fields of a dataset read by a rule, in order.
+
+    :param df: A Pandas DataFrame with the companies' information.
+    :param fields: The fields read by the rule.
+    :return: A hexadecimal digest.
+    """
+    digest = hashlib.sha256(str(len(df)).encode())
+    for field in sorted(set(fields)):
+        digest.update(field.encode())
+        if field in df.columns:
+            hashes = pd.util.hash_pandas_object(df[field], index=False)
+            digest.update(hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class RuleResultCache:
+    """This class stores the results of each rule on disk, keyed by the
+    fingerprint of the dataset fields it reads and the hash of its
+    normalized definition.
+
+    Renaming a rule, or changing a rule that it does not depend on, keeps
+    its results, while changing its parameters or the values of its fields
+    evaluates it again. Files are written atomically, so that the cache can
+    be shared by concurrent classifications.
+    """
+
+    def __init__(self, cache_path: str):
+        self.directory = Path(cache_path)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, rule_hash: str, data_hash: str) -> Path:
+        return self.directory / f"{rule_hash[:16]}-{data_hash[:16]}.npy"
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def evaluate(
+        self,
+        definition: dict,
+        fields: Iterable[str],
+        df: DataFrame,
+        evaluate: Callable[[], np.ndarray],
+        fingerprints: Dict[Tuple[str, ...], str] | None = None,
+    ) -> np.ndarray:
+        """
+        Return the cached results of a rule, or evaluate and cache them.
+
+        :param definition: The rule definition.
+        :param fields: The fields read by the rule.
+        :param df: A Pandas DataFrame with the companies' information.
+        :param evaluate: A callable evaluating the rule.
+        :param fingerprints: Fingerprints already computed for the dataset,
+                shared by the rules reading the same fields.
+        :return: A numpy array with one result per row.
+        """
+        key = tuple(sorted(set(fields)))
+        if fingerprints is None:
+            fingerprints = {}
+        if key not in fingerprints:
+            fingerprints[key] = dataset_fingerprint(df, key)
+        path = self._path(definition_hash(definition), fingerprints[key])
+
+        if path.exists():
+            try:
+                results = np.load(path, allow_pickle=True)
+            except (OSError, ValueError, EOFError):
+                logger.warning("Discarding the corrupted cache file %s", path)
+            else:
+                if len(results) == len(df):
+                    self._count(hit=True)
+                    return results
+
+        self._count(hit=False)
+        results = np.asarray(evaluate())
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(temporary_path, "wb") as file:
+            np.save(file, results, allow_pickle=True)
+        os.replace(temporary_path, path)
+        return results
@@ -11,14 +11,32 @@ from math import floor
 from typing import List
 
 import numpy as np
+from pandas import DataFrame, Series
 
 from src.exceptions import (
     InsufficientRulesException,
     InvalidOperationException,
 )
+from src.expressions import Expression
+from src.numeric_kernels import (
+    DELTA_TRUE,
+    DELTA_UNDEFINED,
+    get_kernels,
+    operator_code,
+)
 from src.rules_file_parser import InvestorRulesManager
+from src.text_index import TextIndexes, TokenIndex
+from src.utils.data_utils import factorized_apply, row_apply
 from src.utils.rules_utils import apply_operation
 
+# Rule types that only depend on the value of a single column
+SCALAR_RULE_TYPES = ("numeric", "date")
+
+# Built-in checks that a text rule can replace with `replaces`
+REPLACEABLE_CHECKS = ("is_saas",)
+
+TEXT_MATCH_MODES = ("any", "all")
+
 
 class Rule:
     def __init__(
@@ -37,7 +55,12 @@ class Rule:
             "percentage": self._percentage_comparator,
             "delta": self._delta_comparator,
             "date": self._date_comparator,
+            "text": self._text_comparator,
+            "expression": self._expression_comparator,
         }
+        self.expression = None
+        if rule_type == "expression":
+            self.expression = Expression(parameters["expression"])
 
     def _numeric_comparator(self, data) -> bool:
         """
@@ -97,7 +120,11 @@ class Rule:
                 return apply_operation(final_percent, operator, target_percent)
             else:
                 total = data.get(self.parameters["reference"])
-                final_percent = (100 * company_number) / total
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    final_percent = np.true_divide(100 * company_number, total)
+                # Undefined percentages, e.g.: of a zero total, never pass
+                if not np.isfinite(final_percent):
+                    return False
                 target_percent = self.parameters["value"]
                 return apply_operation(final_percent, operator, target_percent)
         except Exception:
@@ -206,9 +233,199 @@ class Rule:
                 )
             )
 
+    def _text_comparator(self, data) -> bool:
+        """
+        A comparator class to search keywords, phrases and terms in texts.
+
+        :param data: A Pandas Series with the company information.
+        :return: A boolean to represent the application of the rule.
+        """
+        text = data.get(self.parameters["field"], None)
+        return bool(TokenIndex([text]).match(self.parameters)[0])
+
+    def _expression_comparator(self, data) -> bool:
+        """
+        A comparator class to evaluate arithmetic expressions over fields.
+
+        :param data: A Pandas Series with the company information.
+        :return: A boolean to represent the application of the rule.
+        """
+        row = DataFrame(
+            {field: [data.get(field)] for field in self.expression.fields}
+        )
+        return bool(self.expression.evaluate(row)[0])
+
+    @property
+    def fields(self) -> List[str]:
+        """
+        List the dataset columns referenced by this rule.
+
+        :return: A list of column names.
+        """
+        if self.rule_type == "expression":
+            return list(self.expression.fields)
+        if self.rule_type == "delta":
+            return [step["field"] for step in self.parameters["series"]]
+
+        fields = [self.parameters["field"]]
+        reference = self.parameters.get("reference")
+        if self.rule_type == "percentage" and isinstance(reference, str):
+            fields.append(reference)
+        return fields
+
+    @property
+    def definition(self) -> dict:
+        """
+        Describe everything determining the results of this rule, but not
+        its id or name.
+
+        :return: A dict with the rule type and parameters.
+        """
+        parameters = dict(self.parameters)
+        if self.expression is not None:
+            parameters["expression"] = repr(self.expression.tree)
+        if self.rule_type == "date" and parameters.get("reference_date") in (
+            "current_year",
+            "last_year",
+        ):
+            # Relative dates change results every year
+            parameters["current_year"] = datetime.now().year
+        return {"type": self.rule_type, "parameters": parameters}
+
     def apply_rule(self, data) -> bool:
         return self.rules_map[self.rule_type](data)
 
+    def _percentage_columns(
+        self, df: DataFrame, numeric_backend: str
+    ) -> np.ndarray:
+        """
+        Column-wise counterpart of `_percentage_comparator`.
+
+        :param df: A Pandas DataFrame with the companies' information.
+        :param numeric_backend: The numeric kernels' backend.
+        :return: A boolean array with one result per row.
+        """
+        field = self.parameters["field"]
+        locator = self.parameters["locator"]
+        reference = self.parameters["reference"]
+        if field not in df.columns or reference not in df.columns:
+            raise InvalidOperationException(
+                message=(
+                    "There was an error while performing the operation. "
+                    "Please check your rules.yaml and project documentation."
+                )
+            )
+
+        if locator:
+            numbers = factorized_apply(
+                df[field], lambda raw: json.loads(raw)[locator]
+            )
+        else:
+            numbers = df[field].to_numpy()
+
+        percentage_kernel, _ = get_kernels(numeric_backend)
+        return percentage_kernel(
+            np.asarray(numbers, dtype=np.float64),
+            df[reference].to_numpy(dtype=np.float64),
+            operator_code(self.parameters["operator"]),
+            float(self.parameters["value"]),
+        )
+
+    def _delta_columns(self, df: DataFrame, numeric_backend: str):
+        """
+        Column-wise counterpart of `_delta_comparator`.
+
+        :param df: A Pandas DataFrame with the companies' information.
+        :param numeric_backend: The numeric kernels' backend.
+        :return: An array with one result per row, holding None where a
+                range rule has a single non-zero step.
+        """
+        series = self.parameters["series"]
+        values = np.zeros((len(df), len(series)))
+        for index, step in enumerate(series):
+            if step["field"] in df.columns:
+                values[:, index] = df[step["field"]].to_numpy(np.float64)
+        factors = np.array(
+            [
+                self.parameters["ref_unit"] / step["unit_span"]
+                for step in series
+            ],
+            dtype=np.float64,
+        )
+
+        is_range = self.parameters["operator"] == "range"
+        if is_range:
+            op_code, target = 0, 0.0
+            low = float(self.parameters["min"])
+            high = float(self.parameters["max"])
+        else:
+            op_code = operator_code(self.parameters["operator"])
+            target = float(self.parameters["value"])
+            low, high = 0.0, 0.0
+
+        _, delta_kernel = get_kernels(numeric_backend)
+        codes = delta_kernel(
+            values, factors, op_code, target, low, high, is_range
+        )
+        results = codes == DELTA_TRUE
+        undefined = codes == DELTA_UNDEFINED
+        if undefined.any():
+            results = results.astype(object)
+            results[undefined] = None
+        return results
+
+    def evaluate(
+        self,
+        df: DataFrame,
+        factorize: bool = True,
+        numeric_backend: str = "numpy",
+        text_indexes: TextIndexes | None = None,
+    ) -> np.ndarray:
+        """
+        Apply the rule to every row of the dataset.
+        Rules depending on a single column are evaluated once per distinct
+        value when `factorize` is set, percentage and delta rules are
+        evaluated column-wise by the numeric kernels, and text rules through
+        the token index of their column. Otherwise, rules are evaluated row
+        by row, except expression rules, always evaluated column-wise.
+
+        :param df: A Pandas DataFrame with the companies' information.
+        :param factorize: Whether to evaluate scalar rules on unique values.
+        :param numeric_backend: The numeric kernels' backend, "numpy" or
+                "numba".
+        :param text_indexes: The token indexes of the dataset, shared by the
+                text rules.
+        :return: A numpy array with one result per row.
+        """
+        if self.rule_type in SCALAR_RULE_TYPES:
+            field = self.parameters["field"]
+            column = df[field] if field in df.columns else [None] * len(df)
+            evaluator = factorized_apply if factorize else row_apply
+            return evaluator(
+                column, lambda value: self.apply_rule({field: value})
+            )
+
+        if self.rule_type == "expression":
+            return self.expression.evaluate(df)
+        if factorize and self.rule_type == "text":
+            if text_indexes is None:
+                text_indexes = TextIndexes(df)
+            token_index = text_indexes.get(self.parameters["field"])
+            return token_index.match(self.parameters)
+        if factorize and self.rule_type == "delta":
+            return self._delta_columns(df, numeric_backend)
+        if (
+            factorize
+            and self.rule_type == "percentage"
+            and self.parameters["operator"] != "range"
+        ):
+            return self._percentage_columns(df, numeric_backend)
+
+        return row_apply(
+            (company_data for _, company_data in df.iterrows()),
+            self.apply_rule,
+        )
+
 
 class DynamicRulesEngine:
     """This class implements dynamic business rules.
@@ -219,6 +436,63 @@ class DynamicRulesEngine:
         self.rules_manager = InvestorRulesManager()
         if not self.rules_manager.rules:
             raise InsufficientRulesException()
+        self._validate_expressions()
+        self._validate_text_rules()
+
+    def _validate_expressions(self) -> None:
+        """
+        Parse the expression rules when loading the rules, so that invalid
+        expressions are reported before classifying any company.
+
+        :return: None
+        """
+        for rule_data in self.rules_manager.rules.values():
+            parameters = rule_data.get("parameters", {})
+            if parameters.get("type") == "expression":
+                Expression(parameters.get("expression"))
+
+    def _validate_text_rules(self) -> None:
+        """
+        Check the match mode of the text rules, and the built-in checks
+        that they replace, when loading the rules.
+
+        :return: None
+        """
+        for rule_id, rule_data in self.rules_manager.rules.items():
+            parameters = rule_data.get("parameters", {})
+            replaces = rule_data.get("replaces")
+            if replaces is not None and (
+                replaces not in REPLACEABLE_CHECKS
+                or parameters.get("type") != "text"
+            ):
+                raise InvalidOperationException(
+                    message=(
+                        f"The rule {rule_id} cannot replace {replaces!r}, "
+                        f"only text rules can replace one of "
+                        f"{REPLACEABLE_CHECKS}."
+                    )
+                )
+            if parameters.get("type") != "text":
+                continue
+            match = parameters.get("match", "any")
+            if match not in TEXT_MATCH_MODES:
+                raise InvalidOperationException(
+                    message=(
+                        f"Unknown match mode {match!r} of the text rule "
+                        f"{rule_id}, expected one of {TEXT_MATCH_MODES}."
+                    )
+                )
+
+    @property
+    def replaces_saas_check(self) -> bool:
+        """
+        Whether a text rule replaces the built-in SaaS check, with
+        `replaces: is_saas`.
+        """
+        return any(
+            rule_data.get("replaces") == "is_saas"
+            for rule_data in self.rules_manager.rules.values()
+        )
 
     @staticmethod
     def _parse_rule(rule_data: dict) -> List[Rule] | Rule:
@@ -252,11 +526,73 @@ class DynamicRulesEngine:
             )
 
 
+# Descriptions matching any rejection pattern are not SaaS companies
+SAAS_REJECTION_PATTERNS = [
+    "hardware",
+    r"(hardware|equipment).{0,30}(purchase|sold)",
+    r"(one-time|single).{0,30}(purchase)",
+]
+
+SAAS_SEARCH_PATTERNS = [
+    "cloud-based",
+    "software solution",
+    "platform as a service",
+    "subscription-based",
+    "subscription based",
+    "subscription model",
+    "annual subscription model",
+    "scalable solution",
+    r"(streamline).{0,30}(workflow|operation|operations)",
+    r"(scalable|scale).{0,30}(solution|software|operation|operations)",
+    r"(monthly|annual).{0,30}(subscription|software|operation|operations|fee|fees|pricing|billing)",
+    r"(recurring|platform).{0,30}(subscription|subscriptions|fees|cost|billing)",
+    r"(agent-based|user-based|usage-based|node-based).{0,30}(pricing)",
+]
+
+
+def _any_pattern(patterns: List[str]) -> re.Pattern:
+    """Combine patterns into a single one, matching when any of them does."""
+    return re.compile(
+        "|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE
+    )
+
+
+_SAAS_REJECTION_REGEX = _any_pattern(SAAS_REJECTION_PATTERNS)
+_SAAS_SEARCH_REGEX = _any_pattern(SAAS_SEARCH_PATTERNS)
+_US_REGEX = re.compile(r"(?:usa|united states)", re.IGNORECASE)
+
+
+def _search(regex: re.Pattern, texts) -> np.ndarray:
+    """Check which texts match a regex, missing texts never match."""
+    texts = Series(texts, dtype=object).fillna("").astype(str)
+    return np.fromiter(
+        (regex.search(text) is not None for text in texts),
+        dtype=bool,
+        count=len(texts),
+    )
+
+
 class StaticRulesEngine:
     """
     This class implements basic/static business rules.
+
+    Each rule has a batch method, receiving a NumPy array or a Pandas Series
+    and returning a boolean array, used to classify a whole column at once.
+    The scalar methods are thin wrappers over the batch methods.
     """
 
+    @staticmethod
+    def has_20_to_60_employees_batch(total_employees) -> np.ndarray:
+        """
+        Check if the number of employees is within the range, for each
+        company.
+
+        :param total_employees: Array with the total number of employees.
+        :return: A boolean array with the application of the rule.
+        """
+        employees = np.asarray(total_employees, dtype=float)
+        return (20 <= employees) & (employees <= 60)
+
     @staticmethod
     def has_20_to_60_employees(total_employees: int) -> bool:
         """
@@ -265,7 +601,36 @@ class StaticRulesEngine:
         :param total_employees: Total number of employees.
         :return: A boolean to represent the application of the rule.
         """
-        return 20 <= total_employees <= 60
+        results = StaticRulesEngine.has_20_to_60_employees_batch(
+            [total_employees]
+        )
+        return bool(results[0])
+
+    @staticmethod
+    def most_of_employees_are_us_based_batch(employee_locations) -> np.ndarray:
+        """
+        Check if the number of employees that are US-based is enough, for
+        each company.
+
+        :param employee_locations: Array with the dictionaries of employee
+                locations, or their JSON representation.
+        :return: A boolean array with the application of the rule.
+        """
+        parsed_locations = {}
+        us_based_employees, employees_totals = [], []
+        for locations in employee_locations:
+            if isinstance(locations, str):
+                if locations not in parsed_locations:
+                    parsed_locations[locations] = json.loads(locations)
+                locations = parsed_locations[locations]
+            us_based_employees.append(locations.get("USA", 0))
+            employees_totals.append(sum(locations.values()))
+
+        us_based = np.array(us_based_employees, dtype=float)
+        required_employees_in_us = np.floor(
+            np.array(employees_totals, dtype=float) * 0.7
+        )
+        return (us_based != 0) & (us_based >= required_employees_in_us)
 
     @staticmethod
     def most_of_employees_are_us_based(employee_locations: dict) -> bool:
@@ -275,14 +640,20 @@ class StaticRulesEngine:
         :param employee_locations: Dictionary of employee locations
         :return: A boolean to represent the application of the rule.
         """
-        list_of_employees = [value for value in employee_locations.values()]
-        us_based_employees = employee_locations.get("USA", 0)
-        if us_based_employees == 0:
-            return False
-        else:
-            employees_total = sum(list_of_employees)
-            required_employees_in_us = employees_total * 0.7
-            return us_based_employees >= floor(required_employees_in_us)
+        results = StaticRulesEngine.most_of_employees_are_us_based_batch(
+            [employee_locations]
+        )
+        return bool(results[0])
+
+    @staticmethod
+    def is_us_based_batch(headquarters) -> np.ndarray:
+        """
+        Check if the company's headquarters is the USA, for each company.
+
+        :param headquarters: Array with the country codes.
+        :return: A boolean array with the application of the rule.
+        """
+        return _search(_US_REGEX, headquarters)
 
     @staticmethod
     def is_us_based(headquarters):
@@ -292,13 +663,21 @@ class StaticRulesEngine:
         :param headquarters: The country code.
         :return: A boolean to represent the application of the rule.
         """
-        """"""
-        term = r"(usa|united states)"
-        match = re.search(term, headquarters.lower(), re.IGNORECASE)
-        if match:
-            return True
-        else:
-            return False
+        results = StaticRulesEngine.is_us_based_batch([headquarters])
+        return bool(results[0])
+
+    @staticmethod
+    def is_founded_in_last_5_years_batch(founding_years) -> np.ndarray:
+        """
+        Check if companies were founded in last 5 years
+
+        :param founding_years: Array with the years the companies were
+                founded.
+        :return: A boolean array with the application of the rule.
+        """
+        years = np.asarray(founding_years, dtype=float)
+        today = datetime.now().year
+        return (years > 0) & (today - years <= 5)
 
     @staticmethod
     def is_founded_in_last_5_years(founding_year: int) -> bool:
@@ -308,12 +687,24 @@ class StaticRulesEngine:
         :param founding_year: The year that the company was founded
         :return: A boolean to represent the application of the rule.
         """
-        if founding_year is None or founding_year <= 0:
-            return False
-        else:
-            today = datetime.now().year
-            delta = today - founding_year
-            return True if delta <= 5 else False
+        results = StaticRulesEngine.is_founded_in_last_5_years_batch(
+            [founding_year]
+        )
+        return bool(results[0])
+
+    @staticmethod
+    def is_saas_company_batch(business_descriptions) -> np.ndarray:
+        """
+        Determine if companies are SaaS companies, rejecting the
+        descriptions that match any rejection pattern, and accepting the
+        ones matching any SaaS pattern.
+
+        :param business_descriptions: Array with the business descriptions.
+        :return: A boolean array with the application of the rule.
+        """
+        rejected = _search(_SAAS_REJECTION_REGEX, business_descriptions)
+        matched = _search(_SAAS_SEARCH_REGEX, business_descriptions)
+        return matched & ~rejected
 
     @staticmethod
     def is_saas_company(business_description: str) -> bool:
@@ -326,44 +717,7 @@ class StaticRulesEngine:
         :param business_description: A string describing the business.
         :return: A boolean to represent the application of the rule.
         """
-        rejection_patterns = [
-            "hardware",
-            r"(hardware|equipment).{0,30}(purchase|sold)",
-            r"(one-time|single).{0,30}(purchase)",
-        ]
-
-        saas_search_patterns = [
-            "cloud-based",
-            "software solution",
-            "platform as a service",
-            "subscription-based",
-            "subscription based",
-            "subscription model",
-            "annual subscription model",
-            "scalable solution",
-            r"(streamline).{0,30}(workflow|operation|operations)",
-            r"(scalable|scale).{0,30}(solution|software|operation|operations)",
-            r"(monthly|annual).{0,30}(subscription|software|operation|operations|fee|fees|pricing|billing)",
-            r"(recurring|platform).{0,30}(subscription|subscriptions|fees|cost|billing)",
-            r"(agent-based|user-based|usage-based|node-based).{0,30}(pricing)",
-        ]
-        for term in rejection_patterns:
-            text = business_description.lower()
-            try:
-                match = re.search(term, text, re.IGNORECASE)
-                if match:
-                    return False
-            except re.error:
-                if term in text:
-                    return False
-
-        for term in saas_search_patterns:
-            text = business_description.lower()
-            try:
-                match = re.search(term, text, re.IGNORECASE)
-                if match:
-                    return True
-            except re.error:
-                if term in text:
-                    return True
-        return False
+        results = StaticRulesEngine.is_saas_company_batch(
+            [business_description]
+        )
+        return bool(results[0])
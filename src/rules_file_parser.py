@@ -10,6 +10,7 @@ class InvestorRulesManager:
     def __init__(self, rules_file_path="rules.yml"):
         self.rules_file_path = Path(rules_file_path)
         self.rules = {}
+        self.enrichments = []
         self._load_rules()
 
     def _load_rules(self):
@@ -38,6 +39,8 @@ class InvestorRulesManager:
                         rule_id = rule.get("id")
                         if rule_id:
                             self.rules[rule_id] = rule
+                    # Secondary datasets joined before evaluating the rules
+                    self.enrichments = data.get("enrichments", [])
                     return
                 except (IOError, yaml.YAMLError) as e:
                     print(f"Error loading rules from {path}: {e}")
@@ -0,0 +1,131 @@
+"""
+Sampled dry-runs, estimating the pass rate of each rule from a uniform
+random sample of the dataset.
+"""
+
+from __future__ import annotations
+
+import math
+from statistics import NormalDist
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from src.result_sinks import rule_result_columns
+
+# Column holding the random key of each row while sampling
+_SAMPLE_KEY = "_sample_key"
+
+
+def sample_size_for(target_error: float, confidence: float) -> int:
+    """
+    Compute the sample size estimating any pass rate within `target_error`,
+    considering the worst case of a 50% pass rate.
+
+    :param target_error: The maximum half-width of the confidence interval.
+    :param confidence: The confidence level, e.g.: 0.95.
+    :return: The number of rows to sample.
+    """
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    return math.ceil(z**2 * 0.25 / target_error**2)
+
+
+def wilson_interval(
+    passed: int, size: int, confidence: float
+) -> Tuple[float, float]:
+    """
+    Compute the Wilson score interval of a pass rate.
+
+    :param passed: The number of sampled rows passing the rule.
+    :param size: The number of sampled rows.
+    :param confidence: The confidence level, e.g.: 0.95.
+    :return: A tuple with the lower and upper boundaries.
+    """
+    if size == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    rate = passed / size
+    denominator = 1 + z**2 / size
+    center = (rate + z**2 / (2 * size)) / denominator
+    margin = (
+        z
+        * math.sqrt(rate * (1 - rate) / size + z**2 / (4 * size**2))
+        / denominator
+    )
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+class ReservoirSampler:
+    """This class keeps a uniform random sample of fixed size from a stream
+    of chunks: each row gets a random key, and the rows with the smallest
+    keys seen so far are kept.
+    """
+
+    def __init__(self, size: int, seed: Optional[int] = None):
+        self.size = size
+        self.seen_rows = 0
+        self._rng = np.random.default_rng(seed)
+        self._reservoir: Optional[DataFrame] = None
+
+    def add(self, chunk: DataFrame) -> None:
+        """
+        Offer the rows of a chunk to the sample.
+
+        :param chunk: A Pandas DataFrame read from the dataset.
+        :return: None
+        """
+        self.seen_rows += len(chunk)
+        keyed_chunk = chunk.assign(
+            **{_SAMPLE_KEY: self._rng.random(len(chunk))}
+        )
+        if self._reservoir is not None:
+            keyed_chunk = pd.concat([self._reservoir, keyed_chunk])
+        self._reservoir = keyed_chunk.nsmallest(self.size, _SAMPLE_KEY)
+
+    def sample(self) -> DataFrame:
+        """
+        Get the sampled rows, in the order of the dataset.
+
+        :return: A Pandas DataFrame.
+        """
+        if self._reservoir is None:
+            return DataFrame()
+        return self._reservoir.sort_index().drop(columns=_SAMPLE_KEY)
+
+
+def pass_rates(
+    results_df: DataFrame, confidence: float, total_rows: int
+) -> DataFrame:
+    """
+    Estimate the pass rate of each rule, and of `is_interesting`, from the
+    classification of a sample.
+    When the whole dataset was sampled, the rates are exact.
+
+    :param results_df: A Pandas DataFrame returned by the classifier.
+    :param confidence: The confidence level of the intervals.
+    :param total_rows: The number of rows of the dataset.
+    :return: A Pandas DataFrame with one row per rule.
+    """
+    size = len(results_df)
+    report = []
+    for rule_id in rule_result_columns(results_df):
+        passed = int(results_df[rule_id].fillna(False).astype(bool).sum())
+        rate = passed / size if size else 0.0
+        if size >= total_rows:
+            lower, upper = rate, rate
+        else:
+            lower, upper = wilson_interval(passed, size, confidence)
+        report.append(
+            {
+                "rule_id": rule_id,
+                "passed": passed,
+                "sample_size": size,
+                "pass_rate": round(rate, 4),
+                "ci_lower": round(lower, 4),
+                "ci_upper": round(upper, 4),
+                "estimated_passing_rows": round(rate * total_rows),
+            }
+        )
+    return DataFrame(report)
@@ -0,0 +1,212 @@
+"""
+Deterministic sharding of a dataset, to split one classification run
+across several processes or machines, and merging of the partial outputs.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple
+
+import pandas as pd
+from pandas import DataFrame
+
+from src.exceptions import InvalidOperationException
+
+logger = logging.getLogger(__name__)
+
+# Column carrying the position of each row in the input file
+SOURCE_ROW_COLUMN = "_source_row"
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Parse a shard specification with the `i/N` format.
+
+    :param spec: The shard specification, e.g.: "0/4".
+    :return: A tuple with the shard index and the number of shards.
+    """
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard specification: {spec}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index out of bounds: {spec}")
+    return index, count
+
+
+class ShardSelector:
+    """This class keeps the rows of a shard, selected by their position in
+    the input file, so that every process reading the same input agrees on
+    the rows of each shard, whatever the dtypes it inferred.
+    """
+
+    def __init__(self, index: int, count: int):
+        self.index = index
+        self.count = count
+        self.scanned_rows = 0
+
+    def select(self, df: DataFrame) -> DataFrame:
+        """
+        Keep the rows of the shard.
+        The DataFrame index must hold the row position in the input file,
+        which is kept in the `_source_row` column to restore the order when
+        merging.
+
+        :param df: A Pandas DataFrame with the companies' information.
+        :return: A Pandas DataFrame with the rows of the shard.
+        """
+        self.scanned_rows += len(df)
+        shard_df = df[df.index.to_numpy() % self.count == self.index]
+        return shard_df.assign(**{SOURCE_ROW_COLUMN: shard_df.index})
+
+
+def _shard_prefix(index: int, count: int) -> str:
+    return f"shard-{index}-of-{count}_"
+
+
+def shard_output_filename(input_filename: str, index: int, count: int) -> str:
+    """
+    Build the name of a shard's partial output.
+
+    :param input_filename: The dataset file name.
+    :param index: The index of the shard.
+    :param count: The total number of shards.
+    :return: The partial output file name.
+    """
+    return _shard_prefix(index, count) + input_filename
+
+
+def _manifest_path(output_base_path: str, partial_filename: str) -> Path:
+    return Path(output_base_path) / (partial_filename + ".manifest.json")
+
+
+def input_fingerprint(file_path: str) -> dict:
+    """
+    Describe the input file, to ensure all shards processed the same data.
+
+    :param file_path: The dataset file path.
+    :return: A dictionary with the file size and modification time.
+    """
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def write_manifest(
+    output_base_path: str,
+    input_path: str,
+    partial_filename: str,
+    selector: ShardSelector,
+    total_rows: int,
+    classification_engine: str,
+) -> Path:
+    """
+    Write the manifest describing a shard's partial output.
+
+    :return: The manifest file path.
+    """
+    manifest = {
+        "input_filename": Path(input_path).name,
+        "input": input_fingerprint(input_path),
+        "input_rows": selector.scanned_rows,
+        "shard_index": selector.index,
+        "shard_count": selector.count,
+        "partial_filename": partial_filename,
+        "rows": total_rows,
+        "classification_engine": classification_engine,
+        "created_at": datetime.now().isoformat(),
+    }
+    manifest_path = _manifest_path(output_base_path, partial_filename)
+    with open(manifest_path, "w") as file:
+        json.dump(manifest, file, indent=2)
+    return manifest_path
+
+
+def load_manifests(output_base_path: str, input_filename: str) -> List[dict]:
+    """
+    Load and validate the manifests of all shards of an input file.
+
+    :param output_base_path: The directory with the partial outputs.
+    :param input_filename: The dataset file name.
+    :return: A list of manifests, sorted by shard index.
+    """
+    manifests = []
+    pattern = f"shard-*-of-*_{input_filename}.manifest.json"
+    for manifest_path in Path(output_base_path).glob(pattern):
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+        # The pattern also matches inputs ending with the same name
+        if manifest["input_filename"] == input_filename:
+            manifests.append(manifest)
+
+    if not manifests:
+        raise InvalidOperationException(
+            message=f"No shard manifests found for {input_filename}"
+        )
+
+    counts = sorted({manifest["shard_count"] for manifest in manifests})
+    if len(counts) > 1:
+        raise InvalidOperationException(
+            message=(
+                f"Shards of {input_filename} were produced with different "
+                f"shard counts: {counts}"
+            )
+        )
+
+    manifests.sort(key=lambda manifest: manifest["shard_index"])
+    count = counts[0]
+    indexes = [manifest["shard_index"] for manifest in manifests]
+    if indexes != list(range(count)):
+        raise InvalidOperationException(
+            message=(
+                f"Incomplete set of shards for {input_filename}: "
+                f"found {indexes} out of {count}"
+            )
+        )
+    if any(
+        manifest["input"] != manifests[0]["input"] for manifest in manifests
+    ):
+        raise InvalidOperationException(
+            message="Shards were produced from different input files"
+        )
+    covered_rows = sum(manifest["rows"] for manifest in manifests)
+    if covered_rows != manifests[0]["input_rows"]:
+        raise InvalidOperationException(
+            message=(
+                "Shards do not cover the input exactly once, make sure they "
+                "were produced with the same pipeline.chunk_size"
+            )
+        )
+    return manifests
+
+
+def merge_shards(output_base_path: str, input_filename: str, sink) -> int:
+    """
+    Combine the partial outputs of all shards into the final output,
+    restoring the input's row order.
+
+    :param output_base_path: The directory with the partial outputs.
+    :param input_filename: The dataset file name.
+    :param sink: The output sink receiving the merged results.
+    :return: The number of merged rows.
+    """
+    manifests = load_manifests(output_base_path, input_filename)
+    partial_dfs = []
+    for manifest in manifests:
+        logger.debug("Merging %s...", manifest["partial_filename"])
+        partial_dfs.append(
+            pd.read_csv(Path(output_base_path) / manifest["partial_filename"])
+        )
+
+    merged_df = (
+        pd.concat(partial_dfs, ignore_index=True)
+        .sort_values(SOURCE_ROW_COLUMN, kind="stable")
+        .drop(columns=SOURCE_ROW_COLUMN)
+    )
+    sink.write(merged_df)
+    sink.close()
+    return len(merged_df)
@@ -0,0 +1,199 @@
+"""
+SQLite data source, pushing the simple `numeric` and `date` rules into the
+query so that only the candidate rows are fetched.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
+from pandas import DataFrame
+
+from src.rules_engine import SCALAR_RULE_TYPES, Rule
+from src.utils.rules_utils import string_to_operator
+
+logger = logging.getLogger(__name__)
+
+
+def quote_identifier(name: str) -> str:
+    """
+    Quote a table or column name for SQLite.
+
+    :param name: The table or column name.
+    :return: The quoted identifier.
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+
+def rule_predicate(
+    rule: Rule, sanitizing_strategy: int = 1
+) -> Optional[Tuple[str, list]]:
+    """
+    Translate a `numeric` or `date` rule into an SQL predicate, following
+    the semantics of its comparator on the sanitized rows.
+    With a sanitizing strategy, NULL values are compared as 0, the value
+    they are sanitized to. Otherwise, rows with NULL values are excluded,
+    as their rules evaluate to False.
+
+    :param rule: The rule to translate.
+    :param sanitizing_strategy: The data sanitizing strategy.
+    :return: A tuple with the predicate and its parameters, or None when
+            the rule cannot be pushed into the query.
+    """
+    if rule.rule_type not in SCALAR_RULE_TYPES:
+        return None
+
+    parameters = rule.parameters
+    field = quote_identifier(parameters["field"])
+    if sanitizing_strategy:
+        field = f"COALESCE({field}, 0)"
+    operator = parameters["operator"]
+    if operator == "range":
+        return f"{field} BETWEEN ? AND ?", [
+            parameters["min"],
+            parameters["max"],
+        ]
+
+    symbol = string_to_operator(operator)
+    if symbol is None:
+        return None
+    if rule.rule_type == "numeric":
+        return f"{field} {symbol} ?", [parameters["value"]]
+
+    # Date rules compare a year with the field, or the field's age
+    if parameters.get("year", None):
+        return f"? {symbol} {field}", [parameters["year"]]
+    date_options = {
+        "current_year": datetime.now().year,
+        "last_year": datetime.now().year - 1,
+    }
+    reference_date = parameters["reference_date"]
+    date_ref = date_options.get(reference_date, reference_date)
+    return f"(? - {field}) {symbol} ?", [date_ref, parameters["value"]]
+
+
+def build_where_clause(
+    rules: List[Rule],
+    columns: Optional[List[str]] = None,
+    sanitizing_strategy: int = 1,
+) -> Tuple[str, list, List[str]]:
+    """
+    Combine the predicates of all the rules that can be pushed into the
+    query. All rules must pass for a company to be interesting, so any row
+    failing one of them can be skipped.
+
+    :param rules: The rules of the dynamic engine.
+    :param columns: The columns of the table, rules on other fields, e.g.:
+            joined from enrichment sources, are not pushed.
+    :param sanitizing_strategy: The data sanitizing strategy.
+    :return: A tuple with the WHERE clause, empty if no rule was pushed,
+            its parameters and the ids of the pushed rules.
+    """
+    predicates, params, pushed_rule_ids = [], [], []
+    for rule in rules:
+        if columns is not None and not set(rule.fields) <= set(columns):
+            continue
+        predicate = rule_predicate(rule, sanitizing_strategy)
+        if predicate is None:
+            continue
+        predicates.append(f"({predicate[0]})")
+        params.extend(predicate[1])
+        pushed_rule_ids.append(rule.rule_id)
+
+    where_clause = ""
+    if predicates:
+        where_clause = "WHERE " + " AND ".join(predicates)
+    return where_clause, params, pushed_rule_ids
+
+
+class SQLiteCompanySource:
+    """This class reads the companies from a SQLite table, fetching only
+    the rows that can pass the rules pushed into the query.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        table: str,
+        rules: List[Rule] = (),
+        sanitizing_strategy: int = 1,
+    ):
+        self.db_path = db_path
+        self.table = table
+        # The rows are sanitized once fetched, the rules see the filled NULLs
+        self.where_clause, self.params, self.pushed_rule_ids = (
+            build_where_clause(
+                list(rules), self.columns(), sanitizing_strategy
+            )
+        )
+        self.fetched_rows = 0
+        self._total_rows: Optional[int] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Open read-only, the source is never modified
+        return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+
+    def columns(self) -> List[str]:
+        """
+        List the columns of the table.
+
+        :return: A list of column names.
+        """
+        with closing(self._connect()) as connection:
+            query = f"PRAGMA table_info({quote_identifier(self.table)})"
+            return [row[1] for row in connection.execute(query)]
+
+    def count_rows(self) -> int:
+        """
+        Count all the rows of the table, once.
+
+        :return: The number of rows.
+        """
+        if self._total_rows is None:
+            with closing(self._connect()) as connection:
+                query = f"SELECT COUNT(*) FROM {quote_identifier(self.table)}"
+                self._total_rows = connection.execute(query).fetchone()[0]
+        return self._total_rows
+
+    @property
+    def query(self) -> str:
+        return (
+            f"SELECT * FROM {quote_identifier(self.table)} {self.where_clause}"
+        ).strip()
+
+    def iter_chunks(self, chunk_size: int) -> Iterator[DataFrame]:
+        """
+        Fetch the candidate rows in chunks of `chunk_size` rows.
+        Chunks are numbered continuously, like the chunks of a CSV file.
+
+        :param chunk_size: The number of rows per chunk.
+        :return: An iterator of Pandas DataFrames.
+        """
+        logger.debug("Querying %s: %s", self.db_path, self.query)
+        with closing(self._connect()) as connection:
+            for chunk in pd.read_sql_query(
+                self.query,
+                connection,
+                params=self.params,
+                chunksize=chunk_size,
+            ):
+                chunk.index = chunk.index + self.fetched_rows
+                self.fetched_rows += len(chunk)
+                yield chunk
+
+    def read(self) -> DataFrame:
+        """
+        Fetch all the candidate rows at once.
+
+        :return: A Pandas DataFrame.
+        """
+        logger.debug("Querying %s: %s", self.db_path, self.query)
+        with closing(self._connect()) as connection:
+            df = pd.read_sql_query(self.query, connection, params=self.params)
+        self.fetched_rows = len(df)
+        return df
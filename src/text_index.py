@@ -0,0 +1,211 @@
+"""
+Inverted token index over a text column, to resolve keyword, phrase and
+proximity criteria through posting lists instead of scanning every text.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from src.exceptions import InvalidOperationException
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+
+
+def tokenize(text) -> List[str]:
+    """
+    Split a text into lowercase tokens, keeping hyphenated words together.
+
+    :param text: The text to tokenize, missing values have no tokens.
+    :return: A list of tokens.
+    """
+    if not isinstance(text, str):
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class TokenIndex:
+    """This class maps each token to the rows containing it, with the
+    token positions within each row.
+
+    Identical texts are indexed once: the index is built over the distinct
+    texts, and the matches are mapped back to the rows at the end.
+    """
+
+    def __init__(self, texts):
+        self._codes, uniques = pd.factorize(
+            pd.Series(texts, dtype=object), use_na_sentinel=False
+        )
+        self.documents = len(uniques)
+        self._positions: Dict[str, Dict[int, List[int]]] = {}
+        self._postings: Dict[str, np.ndarray] = {}
+
+        for doc_id, text in enumerate(uniques):
+            for position, token in enumerate(tokenize(text)):
+                token_positions = self._positions.setdefault(token, {})
+                token_positions.setdefault(doc_id, []).append(position)
+
+    def postings(self, token: str) -> np.ndarray:
+        """
+        Get the sorted ids of the distinct texts containing a token.
+
+        :param token: The token to look up.
+        :return: A numpy array of document ids.
+        """
+        if token not in self._postings:
+            documents = self._positions.get(token, {})
+            self._postings[token] = np.fromiter(
+                sorted(documents), dtype=np.int64, count=len(documents)
+            )
+        return self._postings[token]
+
+    def _candidates(self, tokens: List[str]) -> np.ndarray:
+        """Intersect the posting lists, from the shortest to the longest."""
+        posting_lists = sorted(
+            (self.postings(token) for token in tokens), key=len
+        )
+        candidates = posting_lists[0]
+        for posting_list in posting_lists[1:]:
+            if len(candidates) == 0:
+                break
+            candidates = np.intersect1d(
+                candidates, posting_list, assume_unique=True
+            )
+        return candidates
+
+    def keyword(self, keyword: str) -> np.ndarray:
+        """
+        Find the texts containing a keyword.
+        Keywords made of several tokens are matched as phrases.
+
+        :param keyword: The keyword to search.
+        :return: A numpy array of document ids.
+        """
+        tokens = tokenize(keyword)
+        if len(tokens) == 1:
+            return self.postings(tokens[0])
+        return self.phrase(keyword)
+
+    def phrase(self, phrase: str) -> np.ndarray:
+        """
+        Find the texts containing the tokens of a phrase, consecutively.
+
+        :param phrase: The phrase to search.
+        :return: A numpy array of document ids.
+        """
+        tokens = tokenize(phrase)
+        if not tokens:
+            return np.zeros(0, dtype=np.int64)
+
+        matches = []
+        for doc_id in self._candidates(tokens):
+            following = [
+                set(self._positions[token][doc_id]) for token in tokens[1:]
+            ]
+            if any(
+                all(
+                    start + offset in positions
+                    for offset, positions in enumerate(following, start=1)
+                )
+                for start in self._positions[tokens[0]][doc_id]
+            ):
+                matches.append(doc_id)
+        return np.array(matches, dtype=np.int64)
+
+    def proximity(self, terms: List[str], distance: int) -> np.ndarray:
+        """
+        Find the texts where all the terms are at most `distance` tokens
+        away from an occurrence of the first term, in any order.
+
+        :param terms: The terms to search, one token each.
+        :param distance: The maximum number of tokens between the terms.
+        :return: A numpy array of document ids.
+        """
+        tokens = [token for term in terms for token in tokenize(term)]
+        if not tokens:
+            return np.zeros(0, dtype=np.int64)
+
+        matches = []
+        for doc_id in self._candidates(tokens):
+            others = [self._positions[token][doc_id] for token in tokens[1:]]
+            if any(
+                all(
+                    any(abs(anchor - position) <= distance for position in ps)
+                    for ps in others
+                )
+                for anchor in self._positions[tokens[0]][doc_id]
+            ):
+                matches.append(doc_id)
+        return np.array(matches, dtype=np.int64)
+
+    def _criteria_matches(self, criteria: dict) -> List[np.ndarray]:
+        """Resolve each criterion of a criteria block into document ids."""
+        matches = [
+            self.keyword(keyword) for keyword in criteria.get("keywords", [])
+        ]
+        matches += [
+            self.phrase(phrase) for phrase in criteria.get("phrases", [])
+        ]
+        matches += [
+            self.proximity(proximity["terms"], proximity["distance"])
+            for proximity in criteria.get("proximity", [])
+        ]
+        return matches
+
+    def match(self, criteria: dict) -> np.ndarray:
+        """
+        Evaluate the criteria of a `text` rule on every row.
+
+        :param criteria: A dictionary with `keywords`, `phrases` and
+                `proximity` criteria, a `match` mode ("any" or "all") and an
+                optional `exclude` block with criteria rejecting the rows.
+        :return: A boolean array with one result per row.
+        """
+        matches = self._criteria_matches(criteria)
+        if not matches:
+            raise InvalidOperationException(
+                message=(
+                    "Text rules require at least one keyword, phrase or "
+                    "proximity criterion."
+                )
+            )
+
+        documents = np.zeros(self.documents, dtype=bool)
+        if criteria.get("match", "any") == "all":
+            documents[:] = True
+            for doc_ids in matches:
+                matched = np.zeros(self.documents, dtype=bool)
+                matched[doc_ids] = True
+                documents &= matched
+        else:
+            for doc_ids in matches:
+                documents[doc_ids] = True
+
+        for doc_ids in self._criteria_matches(criteria.get("exclude", {})):
+            documents[doc_ids] = False
+
+        return documents[self._codes]
+
+
+class TextIndexes:
+    """This class lazily builds the token index of each text column of a
+    dataset, so that all the rules on a column share the same index.
+    """
+
+    def __init__(self, df: DataFrame):
+        self.df = df
+        self._indexes: Dict[str, TokenIndex] = {}
+
+    def get(self, field: str) -> TokenIndex:
+        if field not in self._indexes:
+            if field in self.df.columns:
+                column = self.df[field]
+            else:
+                column = [None] * len(self.df)
+            self._indexes[field] = TokenIndex(column)
+        return self._indexes[field]
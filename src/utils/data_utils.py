@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 
@@ -56,3 +57,56 @@ def sanitize_dataframe(
                         validated_df.drop(index=idx)
 
     return validated_df
+
+
+def _to_result_array(results: list) -> np.ndarray:
+    """
+    Build the result array of a rule evaluation, keeping booleans as `bool`.
+
+    :param results: A list with the rule results.
+    :return: A numpy array with the rule results.
+    """
+    if len(results) == 0:
+        return np.zeros(0, dtype=bool)
+    return np.array(results)
+
+
+def row_apply(values, func) -> np.ndarray:
+    """
+    Evaluate `func` once per row.
+
+    :param values: A pandas Series (or any iterable) with the column values.
+    :param func: A callable receiving a single value.
+    :return: A numpy array with one result per row.
+    """
+    return _to_result_array([func(value) for value in values])
+
+
+def factorized_apply(values, func) -> np.ndarray:
+    """
+    Evaluate `func` once per distinct value and map the results back to
+    every row through the inverse index of the factorization.
+
+    :param values: A pandas Series (or any 1-D array) with the column values.
+    :param func: A callable receiving a single value.
+    :return: A numpy array with one result per row.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    unique_results = _to_result_array([func(value) for value in uniques])
+    if len(unique_results) == 0:
+        return np.zeros(len(codes), dtype=bool)
+    return unique_results[codes]
+
+
+def factorized_batch_apply(values, batch_func) -> np.ndarray:
+    """
+    Evaluate a batch rule on the distinct values only, and map the results
+    back to every row through the inverse index of the factorization.
+
+    :param values: A pandas Series (or any 1-D array) with the column values.
+    :param batch_func: A callable receiving an array of values and returning
+            a boolean array.
+    :return: A numpy array with one result per row.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return np.asarray(batch_func(uniques), dtype=bool)[codes]
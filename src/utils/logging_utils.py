@@ -0,0 +1,85 @@
+import copy
+import json
+import logging
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler
+from typing import Optional
+
+from src.utils.profiling import StageProfiler, maybe_profile
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler leaving the formatting to the listener's thread.
+    Only the message arguments are interpolated by the logging thread, so
+    that later changes to mutable arguments do not leak into the record.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class RunSummary:
+    """
+    Collects the metrics of a run, to log them as a single structured
+    record once the run is completed.
+    """
+
+    def __init__(self, command: str, profiler: Optional[StageProfiler] = None):
+        self.start_time = time.perf_counter()
+        self.fields = {"command": command}
+        self.stages = {}
+        self.profiler = profiler
+
+    def set(self, **fields) -> None:
+        """
+        Add fields to the summary.
+
+        :param fields: The fields to add.
+        :return: None
+        """
+        self.fields.update(fields)
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Measure the duration of a stage of the run, and profile it when
+        the summary has a profiler.
+
+        :param name: The stage name.
+        """
+        stage_start = time.perf_counter()
+        try:
+            with maybe_profile(self.profiler, name):
+                yield
+        finally:
+            duration = time.perf_counter() - stage_start
+            self.stages[name] = round(duration, 3)
+
+    def as_dict(self) -> dict:
+        return {
+            **self.fields,
+            "stages": self.stages,
+            "duration": round(time.perf_counter() - self.start_time, 3),
+        }
+
+    def emit(self, logger: logging.Logger) -> dict:
+        """
+        Log the summary as a single record.
+        The summary is also attached to the record as `run_summary`.
+
+        :param logger: The logger to write the record.
+        :return: The summary as a dictionary.
+        """
+        summary = self.as_dict()
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Run summary: %s",
+                json.dumps(summary, default=str),
+                extra={"run_summary": summary},
+            )
+        return summary
@@ -0,0 +1,164 @@
+"""
+Stage profiler, recording the CPU profile and the peak memory of each stage
+of a run.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class StageProfiler:
+    """This class profiles the stages of a run with `cProfile`, and tracks
+    their peak memory with `tracemalloc`.
+
+    It is only created with the `--profile` option: without it, the stages
+    are not instrumented at all.
+
+    `cProfile` only follows the thread enabling it, so the stages running
+    in their own threads are profiled separately. As `tracemalloc` tracks
+    the whole process, the peak memory of those stages is not tracked on
+    its own, and is included in the peak of the stage running them.
+    """
+
+    def __init__(self, top_functions: int = 20):
+        self.top_functions = top_functions
+        self.stages: Dict[str, dict] = {}
+        self.profiles: Dict[str, cProfile.Profile] = {}
+        self.rules: Dict[str, float] = {}
+
+    @contextmanager
+    def profile(self, name: str, track_memory: bool = True):
+        """
+        Profile a stage of the run.
+
+        :param name: The stage name.
+        :param track_memory: Whether to track the peak memory of the stage,
+                disable it for the stages running concurrently.
+        """
+        if track_memory:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            memory_start = tracemalloc.get_traced_memory()[0]
+
+        profile = self.profiles.setdefault(name, cProfile.Profile())
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            profile.enable()
+        except ValueError:
+            # Since Python 3.12, a single profiler can be active at once
+            profile = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            stage = self.stages.setdefault(
+                name, {"wall_time": 0.0, "cpu_time": 0.0}
+            )
+            stage["wall_time"] += time.perf_counter() - wall_start
+            stage["cpu_time"] += time.thread_time() - cpu_start
+            if track_memory:
+                peak = tracemalloc.get_traced_memory()[1] - memory_start
+                stage["peak_memory"] = max(stage.get("peak_memory", 0), peak)
+                if started_tracing:
+                    tracemalloc.stop()
+
+    def record_rule(self, rule_id: str, duration: float) -> None:
+        """
+        Add the duration of a rule evaluation.
+
+        :param rule_id: The rule id.
+        :param duration: The evaluation duration, in seconds.
+        :return: None
+        """
+        self.rules[rule_id] = self.rules.get(rule_id, 0.0) + duration
+
+    def _top_functions(self, name: str) -> str:
+        stream = io.StringIO()
+        try:
+            stats = pstats.Stats(self.profiles[name], stream=stream)
+        except TypeError:
+            return "No profile data.\n"
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(
+            self.top_functions
+        )
+        return stream.getvalue()
+
+    def report(self) -> str:
+        """
+        Build the text report: the time and peak memory of each stage, the
+        time of each rule, and the most expensive functions of each stage.
+
+        :return: The report.
+        """
+        lines: List[str] = [
+            f"{'Stage':<20}{'Wall (s)':>12}{'CPU (s)':>12}{'Peak (MB)':>12}"
+        ]
+        for name, stage in self.stages.items():
+            peak = stage.get("peak_memory")
+            peak_text = f"{peak / 2**20:>12.2f}" if peak is not None else ""
+            lines.append(
+                f"{name:<20}{stage['wall_time']:>12.3f}"
+                f"{stage['cpu_time']:>12.3f}{peak_text:>12}"
+            )
+
+        if self.rules:
+            lines += ["", f"{'Rule':<40}{'Time (s)':>12}"]
+            for rule_id, duration in sorted(
+                self.rules.items(), key=lambda item: item[1], reverse=True
+            ):
+                lines.append(f"{rule_id:<40}{duration:>12.3f}")
+
+        for name in self.stages:
+            lines += ["", f"=== Stage: {name} ===", self._top_functions(name)]
+        return "\n".join(lines)
+
+    def write(
+        self, output_base_path: str, prefix: str, raw: bool = False
+    ) -> Path:
+        """
+        Write the report, and optionally the raw profile of each stage,
+        readable with `pstats` or `snakeviz`.
+
+        :param output_base_path: The output directory.
+        :param prefix: The prefix of the written files.
+        :param raw: Whether to write the raw `.prof` files.
+        :return: The report file path.
+        """
+        report_path = Path(output_base_path) / f"{prefix}.txt"
+        report_path.write_text(self.report())
+        if raw:
+            for name, profile in self.profiles.items():
+                profile.dump_stats(
+                    Path(output_base_path) / f"{prefix}_{name}.prof"
+                )
+        return report_path
+
+
+@contextmanager
+def maybe_profile(
+    profiler: Optional[StageProfiler], name: str, track_memory: bool = True
+):
+    """
+    Profile a stage when profiling is enabled, or do nothing.
+
+    :param profiler: The stage profiler, None when profiling is disabled.
+    :param name: The stage name.
+    :param track_memory: Whether to track the peak memory of the stage.
+    """
+    if profiler is None:
+        yield
+    else:
+        with profiler.profile(name, track_memory=track_memory):
+            yield
@@ -0,0 +1,159 @@
+"""
+Watch-directory ingestion: new datasets dropped into the input directory are
+classified exactly once, tracked by a ledger surviving restarts.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.sharding import input_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Ledger entry statuses
+STARTED = "started"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class FileLedger:
+    """This class records the input files processed by the watcher, with
+    their fingerprint and output.
+
+    A file is marked as started before its classification, and completed
+    once its output is written. The ledger is rewritten atomically after
+    every change, so that a crash never leaves it half written.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.entries: Dict[str, dict] = {}
+        if self.path.exists():
+            with open(self.path) as file:
+                self.entries = json.load(file)
+
+    def _save(self) -> None:
+        temporary_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temporary_path, "w") as file:
+            json.dump(self.entries, file, indent=2)
+        os.replace(temporary_path, self.path)
+
+    def is_done(self, filename: str, fingerprint: dict) -> bool:
+        """
+        Check whether a version of a file was already processed.
+        Completed and failed files are only processed again once modified.
+
+        :param filename: The input file name.
+        :param fingerprint: The input file fingerprint.
+        :return: True when the file must be skipped.
+        """
+        entry = self.entries.get(filename)
+        return (
+            entry is not None
+            and entry["status"] in (COMPLETED, FAILED)
+            and entry["input"] == fingerprint
+        )
+
+    def start(self, filename: str, fingerprint: dict, output: str) -> None:
+        self.entries[filename] = {
+            "status": STARTED,
+            "input": fingerprint,
+            "output": output,
+            "started_at": datetime.now().isoformat(),
+        }
+        self._save()
+
+    def complete(self, filename: str, rows: int) -> None:
+        self.entries[filename].update(
+            status=COMPLETED,
+            rows=rows,
+            completed_at=datetime.now().isoformat(),
+        )
+        self._save()
+
+    def fail(self, filename: str, error: str) -> None:
+        self.entries[filename].update(
+            status=FAILED,
+            error=error,
+            completed_at=datetime.now().isoformat(),
+        )
+        self._save()
+
+    def recover(self, output_base_path: str) -> List[str]:
+        """
+        Discard the partial outputs of the files interrupted by a previous
+        run, so that they are classified again from scratch.
+
+        :param output_base_path: The output directory.
+        :return: The names of the interrupted files.
+        """
+        interrupted = [
+            filename
+            for filename, entry in self.entries.items()
+            if entry["status"] == STARTED
+        ]
+        for filename in interrupted:
+            output_path = (
+                Path(output_base_path) / self.entries[filename]["output"]
+            )
+            if output_path.exists():
+                logger.warning("Removing partial output %s", output_path)
+                output_path.unlink()
+            del self.entries[filename]
+        if interrupted:
+            self._save()
+        return interrupted
+
+
+class DirectoryWatcher:
+    """This class polls a directory for the input files not processed yet.
+
+    A file is only ready once its fingerprint is unchanged between two
+    polls, so that files still being copied are not read.
+    """
+
+    def __init__(self, directory: str, ledger: FileLedger, pattern="*.csv"):
+        self.directory = Path(directory)
+        self.ledger = ledger
+        self.pattern = pattern
+        self._last_seen: Dict[str, dict] = {}
+
+    def poll(self, require_stable: bool = True) -> List[Path]:
+        """
+        List the files ready to be classified, oldest first.
+
+        :param require_stable: Whether files must be unchanged since the
+                previous poll.
+        :return: A list of file paths.
+        """
+        ready, seen = [], {}
+        for path in self.directory.glob(self.pattern):
+            if not path.is_file():
+                continue
+            fingerprint = self.fingerprint(path)
+            if fingerprint is None:
+                continue
+            seen[path.name] = fingerprint
+            if self.ledger.is_done(path.name, fingerprint):
+                continue
+            if require_stable and self._last_seen.get(path.name) != (
+                fingerprint
+            ):
+                continue
+            ready.append(path)
+        self._last_seen = seen
+        return sorted(ready, key=lambda path: seen[path.name]["mtime"])
+
+    @staticmethod
+    def fingerprint(path: Path) -> Optional[dict]:
+        try:
+            return input_fingerprint(str(path))
+        except FileNotFoundError:
+            # Moved or deleted while polling
+            return None
@@ -0,0 +1,22 @@
+from src.batch import batch_output_name, resolve_inputs
+
+
+class TestBatch:
+    def test_resolve_inputs_from_globs_and_manifest(self, tmp_path):
+        for region in ("eu", "us"):
+            (tmp_path / region).mkdir()
+            (tmp_path / region / "companies.csv").write_text("A\n")
+        (tmp_path / "eu" / "notes.txt").write_text("")
+        manifest = tmp_path / "manifest.txt"
+        manifest.write_text("# Regional files\nus/*.csv\n\neu/companies.csv\n")
+
+        inputs = resolve_inputs(["eu/*.csv"], str(tmp_path), str(manifest))
+
+        assert inputs == [
+            (tmp_path / "eu" / "companies.csv").resolve(),
+            (tmp_path / "us" / "companies.csv").resolve(),
+        ]
+        assert [batch_output_name(path, str(tmp_path)) for path in inputs] == [
+            "eu_companies.csv",
+            "us_companies.csv",
+        ]
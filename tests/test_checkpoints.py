@@ -0,0 +1,53 @@
+import pandas as pd
+
+from src.checkpoints import (
+    CheckpointingSink,
+    CheckpointStore,
+    run_fingerprint,
+)
+from src.result_sinks import CsvResultSink
+
+
+def chunk(start: int, stop: int) -> pd.DataFrame:
+    rows = range(start, stop)
+    return pd.DataFrame(
+        {"Company Name": [f"C{row}" for row in rows], "is_interesting": True}
+    )
+
+
+class TestCheckpoints:
+    def test_resume_completes_the_interrupted_output(self, tmp_path):
+        fingerprint = run_fingerprint(input="a.csv", chunk_size=2)
+        store = CheckpointStore(str(tmp_path), fingerprint)
+        store.start("parsed_a.csv", resume=False)
+        sink = CheckpointingSink(
+            CsvResultSink(str(tmp_path / store.output)), store
+        )
+        sink.write(chunk(0, 2))
+        sink.write(chunk(2, 4))
+        # Interrupted before the last chunk
+
+        resumed = CheckpointStore(str(tmp_path), fingerprint)
+        resumed.start("parsed_later.csv", resume=True)
+        assert resumed.output == "parsed_a.csv"
+        assert resumed.completed_chunks == 2
+
+        resumed_sink = CsvResultSink(str(tmp_path / resumed.output))
+        assert resumed.replay(resumed_sink) == 4
+        CheckpointingSink(resumed_sink, resumed).write(chunk(4, 5))
+
+        expected = pd.concat([chunk(0, 2), chunk(2, 4), chunk(4, 5)])
+        output = pd.read_csv(tmp_path / "parsed_a.csv")
+        assert output.equals(expected.reset_index(drop=True))
+        assert resumed.completed_chunks == 3
+
+    def test_changed_fingerprint_starts_over(self, tmp_path):
+        store = CheckpointStore(str(tmp_path), run_fingerprint(rules=[1]))
+        store.start("parsed_a.csv", resume=False)
+        store.save(chunk(0, 2))
+
+        changed = CheckpointStore(str(tmp_path), run_fingerprint(rules=[2]))
+        changed.start("parsed_b.csv", resume=True)
+
+        assert changed.completed_chunks == 0
+        assert changed.output == "parsed_b.csv"
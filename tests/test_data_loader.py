@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from src.data_loader import DataLoader, infer_dtypes
+
+
+@pytest.fixture
+def dataset_path(tmp_path):
+    # The second chunk of 2 rows has no description and no flag
+    companies_df = pd.DataFrame(
+        {
+            "Description": ["A platform", "Hardware", None, None, "SaaS"],
+            "Total Employees": [10, 20, 30, None, 50],
+            "Founded Year": [2010, 2011, 2012, 2013, 2014],
+            "Flag": [True, False, None, None, True],
+        }
+    )
+    path = tmp_path / "companies.csv"
+    companies_df.to_csv(path, index=False)
+    return path
+
+
+class TestDataLoader:
+    def test_infers_the_dtypes_of_the_whole_dataset(self, dataset_path):
+        assert infer_dtypes(dataset_path, 2) == {
+            "Description": "object",
+            "Total Employees": "float64",
+            "Founded Year": "int64",
+        }
+
+    def test_chunks_match_the_whole_dataset(self, dataset_path):
+        data_loader = DataLoader(sanitizing_strategy=1)
+
+        expected = data_loader.load_companies(dataset_path)
+        chunks = list(data_loader.iter_companies(dataset_path, 2))
+
+        assert chunks[1]["Description"].tolist() == ["", ""]
+        pd.testing.assert_frame_equal(
+            pd.concat(chunks, ignore_index=True), expected
+        )
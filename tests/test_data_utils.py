@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.data_utils import factorized_apply, row_apply
+
+
+class TestFactorizedApply:
+    def test_matches_row_apply(self):
+        values = pd.Series(["USA", "Canada", "USA", "UK", "USA"])
+
+        def predicate(value):
+            return value == "USA"
+
+        assert np.array_equal(
+            factorized_apply(values, predicate), row_apply(values, predicate)
+        )
+
+    def test_evaluates_once_per_distinct_value(self):
+        values = pd.Series([2020, 2021, 2020, 2020, 2021])
+        calls = []
+
+        def predicate(value):
+            calls.append(value)
+            return value > 2020
+
+        results = factorized_apply(values, predicate)
+
+        assert results.tolist() == [False, True, False, False, True]
+        assert sorted(calls) == [2020, 2021]
+
+    def test_keeps_missing_values(self):
+        values = pd.Series([1.0, np.nan, 1.0])
+
+        results = factorized_apply(values, lambda value: pd.isna(value))
+
+        assert results.tolist() == [False, True, False]
+
+    def test_empty_column(self):
+        results = factorized_apply(pd.Series([], dtype=float), bool)
+
+        assert results.dtype == bool
+        assert len(results) == 0
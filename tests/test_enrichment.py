@@ -0,0 +1,77 @@
+import os
+
+import pandas as pd
+
+from src.enrichment import Enricher, enrichment_fingerprints
+
+COMPANIES = pd.DataFrame(
+    {"Company Name": ["A", "B", "C"], "Total Employees": [10, 20, 30]}
+)
+
+
+def write_source(tmp_path):
+    path = tmp_path / "funding.csv"
+    pd.DataFrame(
+        {
+            "company": ["C", "A", "A"],
+            "Total Funding": [300, 100, 999],
+            "Total Employees": [0, 0, 0],
+            "Web Traffic": [1, 2, 3],
+        }
+    ).to_csv(path, index=False)
+    return str(path)
+
+
+class TestEnrichment:
+    def test_joins_only_the_referenced_fields(self, tmp_path):
+        enricher = Enricher.from_rules(
+            [
+                {
+                    "id": "funding",
+                    "path": write_source(tmp_path),
+                    "key": "Company Name",
+                    "source_key": "company",
+                }
+            ],
+            ["Total Funding", "Total Employees", "Founded Year"],
+            cache_path=str(tmp_path / "cache"),
+        )
+
+        enriched = enricher.enrich(COMPANIES)
+
+        # Unmatched keys are missing, duplicated keys keep their first row
+        assert enriched["Total Funding"].tolist()[::2] == [100, 300]
+        assert pd.isna(enriched["Total Funding"][1])
+        # The dataset's own fields are never replaced
+        assert enriched["Total Employees"].tolist() == [10, 20, 30]
+        assert "Web Traffic" not in enriched
+        assert len(list((tmp_path / "cache").iterdir())) == 1
+
+    def test_unreferenced_sources_are_skipped(self, tmp_path):
+        enricher = Enricher.from_rules(
+            [
+                {
+                    "id": "funding",
+                    "path": write_source(tmp_path),
+                    "key": "Company Name",
+                    "source_key": "company",
+                }
+            ],
+            ["Founded Year"],
+        )
+
+        assert enricher is None
+
+    def test_fingerprints_change_with_the_source_file(self, tmp_path):
+        enrichments = [
+            {"id": "funding", "path": write_source(tmp_path), "key": "id"}
+        ]
+        before = enrichment_fingerprints(enrichments)
+
+        with open(enrichments[0]["path"], "a") as file:
+            file.write("D,400,0,4\n")
+        os.utime(enrichments[0]["path"], (0, 0))
+
+        after = enrichment_fingerprints(enrichments)
+        assert before[0]["id"] == after[0]["id"] == "funding"
+        assert before != after
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import expressions
+from src.exceptions import InvalidOperationException
+from src.expressions import Expression
+from src.rules_engine import Rule
+
+COMPANIES = pd.DataFrame(
+    {
+        "Revenue": [1_000_000, 900_000, None, 500_000],
+        "Total Employees": [10, 30, 5, 0],
+        "Employee Growth 1Y (%)": [10.0, 20.0, "n/a", 5.0],
+    }
+)
+
+
+class TestExpressions:
+    def test_multi_word_and_quoted_columns(self):
+        expression = Expression(
+            "Revenue / Total Employees >= 50000 "
+            "and not `Employee Growth 1Y (%)` > 15"
+        )
+
+        assert expression.fields == [
+            "Revenue",
+            "Total Employees",
+            "Employee Growth 1Y (%)",
+        ]
+        # Missing, non-numeric values and divisions by zero never pass
+        assert expression.evaluate(COMPANIES).tolist() == [
+            True,
+            False,
+            False,
+            False,
+        ]
+
+    def test_precedence(self):
+        df = pd.DataFrame({"a": [2.0], "b": [3.0]})
+
+        assert Expression("a + b * 2 ** 2 == 14").evaluate(df).all()
+        assert Expression("-(a - b) == abs(a - b)").evaluate(df).all()
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "",
+            "Revenue",
+            "Revenue > 1 > 0",
+            "Revenue + (Total Employees > 1) > 0",
+            "__import__('os') > 0",
+            "Revenue >= 1 and",
+            "exec(Revenue) > 0",
+        ],
+    )
+    def test_rejects_invalid_expressions(self, text):
+        with pytest.raises(InvalidOperationException):
+            Expression(text)
+
+    def test_infinite_values_never_pass(self):
+        df = pd.DataFrame({"a": [0.0, 2.0, 1.0], "b": [1.0, 1.0, 0.0]})
+
+        # Only the operands of the comparisons must be finite: 1 / (1 / 0)
+        # is 0 while log(0) is -inf
+        assert Expression("1 / (1 / a) > -1").evaluate(df).tolist() == [
+            True,
+            True,
+            True,
+        ]
+        assert Expression("log(b) < 1").evaluate(df).tolist() == [
+            True,
+            True,
+            False,
+        ]
+        assert Expression("not 1 / a < 1").evaluate(df).tolist() == [
+            False,
+            False,
+            True,
+        ]
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "Revenue != 1",
+            "not (Revenue > 1)",
+            "not (Revenue > 1 and Total Employees < 1)",
+            "Revenue > 1 or not (Total Employees < 1)",
+        ],
+    )
+    def test_missing_values_are_unknown(self, text):
+        df = pd.DataFrame({"Revenue": [None], "Total Employees": [0]})
+
+        assert Expression(text).evaluate(df).tolist() == [False]
+
+    def test_unknown_results_are_absorbed(self):
+        df = pd.DataFrame({"Revenue": [None], "Total Employees": [0]})
+
+        assert Expression("Revenue > 1 or Total Employees < 1").evaluate(
+            df
+        ).tolist() == [True]
+        assert Expression(
+            "not (Revenue > 1 and Total Employees > 1)"
+        ).evaluate(df).tolist() == [True]
+
+    def test_numexpr_source_is_linear(self):
+        text = " + ".join(f"c{index}" for index in range(20)) + " > 0"
+        expression = Expression(text)
+        comparison = expression.tree
+
+        source = expressions._numexpr_source(
+            comparison[2], expression._variables
+        )
+
+        assert len(source) < 20 * 20
+
+    @pytest.mark.skipif(
+        not expressions.NUMEXPR_AVAILABLE, reason="numexpr is not installed"
+    )
+    def test_numexpr_matches_numpy(self, monkeypatch):
+        df = pd.DataFrame(
+            {"a": [0.0, 2.0, None, -1.0], "b": [1.0, 0.0, 3.0, 4.0]}
+        )
+        expression = Expression(
+            "not (a / b > 1) or sqrt(a) + log(b) <= 2 and a != b"
+        )
+        expected = expression.evaluate(df)
+
+        monkeypatch.setattr(expressions, "NUMEXPR_AVAILABLE", False)
+
+        assert np.array_equal(expression.evaluate(df), expected)
+
+    def test_chunked_evaluation_matches(self, monkeypatch):
+        df = pd.DataFrame({"a": np.arange(1000.0), "b": np.arange(1000.0)})
+        expression = Expression("a * 2 - b > 500 or b < 10")
+        expected = expression.evaluate(df)
+
+        monkeypatch.setattr(expressions, "NUMEXPR_AVAILABLE", False)
+        monkeypatch.setattr(expressions, "CHUNK_SIZE", 64)
+
+        assert np.array_equal(expression.evaluate(df), expected)
+
+    def test_rule_rows_match_columns(self):
+        rule = Rule(
+            name="Revenue per employee",
+            rule_id="revenue_per_employee",
+            rule_type="expression",
+            parameters={
+                "type": "expression",
+                "expression": "Revenue / Total Employees >= 50000",
+            },
+        )
+
+        rows = [rule.apply_rule(row) for _, row in COMPANIES.iterrows()]
+        assert rule.evaluate(COMPANIES, factorize=False).tolist() == rows
@@ -0,0 +1,48 @@
+import io
+import json
+
+import pandas as pd
+
+from src.json_lines import read_json_lines
+from src.result_sinks import JsonLinesResultSink
+
+
+class TestJsonLines:
+    def test_reads_records_in_batches(self):
+        lines = [
+            json.dumps(
+                {
+                    "Company Name": f"C{number}",
+                    "Employee Locations": {"USA": number},
+                }
+            )
+            for number in range(5)
+        ]
+        stream = io.StringIO(
+            "\n".join(lines[:2] + ["", "{not json", "[1, 2]"] + lines[2:])
+        )
+
+        batches = list(read_json_lines(stream, batch_size=2))
+
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        # Nested objects are serialized, as in the CSV datasets
+        assert batches[0]["Employee Locations"].tolist() == [
+            '{"USA": 0}',
+            '{"USA": 1}',
+        ]
+
+    def test_sink_writes_every_chunk(self):
+        stream = io.StringIO()
+        sink = JsonLinesResultSink("<stdout>", stream=stream)
+
+        sink.write(
+            pd.DataFrame({"Company Name": ["A"], "is_interesting": [True]})
+        )
+        assert (
+            stream.getvalue() == '{"Company Name":"A","is_interesting":true}\n'
+        )
+        sink.write(pd.DataFrame({"Company Name": [], "is_interesting": []}))
+        sink.close()
+
+        assert not stream.closed
+        assert len(stream.getvalue().splitlines()) == 1
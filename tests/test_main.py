@@ -0,0 +1,61 @@
+import importlib
+
+import pytest
+import yaml
+
+from src.exceptions import ImproperlyConfiguredException
+
+
+@pytest.fixture
+def main(tmp_path, monkeypatch):
+    # Keep the log file of the configuration out of the project directory
+    with open("config.yaml") as file:
+        settings = yaml.safe_load(file)
+    settings["logging"]["file_path"] = str(tmp_path / "logs" / "app.log")
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump(settings))
+    monkeypatch.setenv("CLASSIFIER_CONFIG_FILE", str(config_path))
+    return importlib.import_module("main")
+
+
+class TestMain:
+    def test_classifies_without_a_command(self, main, monkeypatch):
+        calls = []
+        monkeypatch.setattr(
+            main, "classify", lambda args, summary: calls.append(args)
+        )
+
+        main.main([])
+
+        assert main.parse_args([]).command == "classify"
+        assert len(calls) == 1
+        assert calls[0].command == "classify"
+        assert calls[0].shard is None
+
+    @pytest.mark.parametrize("workers", ["0", "-2"])
+    def test_rejects_invalid_batch_workers(self, main, workers):
+        with pytest.raises(SystemExit):
+            main.parse_args(["batch", "a.csv", "--workers", workers])
+
+    @pytest.mark.parametrize(
+        "argv",
+        [
+            ["classify", "--sample", "--shard", "0/2"],
+            ["classify", "--sample", "100", "--limit", "5"],
+            ["classify", "--sample", "--resume"],
+        ],
+    )
+    def test_rejects_options_ignored_by_samples(self, main, argv):
+        with pytest.raises(ImproperlyConfiguredException, match="--sample"):
+            main.main(argv)
+
+    @pytest.mark.parametrize("size", ["0", "-5"])
+    def test_rejects_invalid_sample_sizes(self, main, size):
+        with pytest.raises(SystemExit):
+            main.parse_args(["classify", "--sample", size])
+
+    def test_output_filename_prefix(self, main):
+        assert main.output_filename("companies.csv").startswith("parsed_")
+        filename = main.output_filename("companies.csv", prefix="sample")
+        assert filename.startswith("sample_")
+        assert filename.endswith("_companies.csv")
@@ -0,0 +1,114 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import numeric_kernels
+from src.numeric_kernels import delta_numpy, percentage_numpy
+from src.rules_engine import Rule
+
+
+def build_companies(size=500, seed=0):
+    rng = np.random.default_rng(seed)
+    growth = [0, 0, 0.05, 0.1, -0.1, 0.2, np.nan]
+    # Zero totals have no percentage
+    totals = rng.integers(0, 100, size)
+    return pd.DataFrame(
+        {
+            "Total Employees": totals,
+            "Employee Locations": [
+                json.dumps({"USA": int(rng.integers(0, total + 1))})
+                for total in totals
+            ],
+            "Employee Growth 2Y (%)": rng.choice(growth, size),
+            "Employee Growth 1Y (%)": rng.choice(growth, size),
+            "Employee Growth 6M (%)": rng.choice(growth, size),
+        }
+    )
+
+
+def delta_rule(**parameters):
+    return Rule(
+        name="Employee growth stability",
+        rule_id="employee_growth_stability",
+        rule_type="delta",
+        parameters={
+            "type": "delta",
+            "ref_unit": 1,
+            "series": [
+                {"field": "Employee Growth 2Y (%)", "unit_span": 2},
+                {"field": "Employee Growth 1Y (%)", "unit_span": 1},
+                {"field": "Employee Growth 6M (%)", "unit_span": 0.5},
+            ],
+            **parameters,
+        },
+    )
+
+
+def percentage_rule(**parameters):
+    return Rule(
+        name="Minimum of employees in USA",
+        rule_id="min_usa_employees",
+        rule_type="percentage",
+        parameters={
+            "type": "percentage",
+            "reference": "Total Employees",
+            "field": "Employee Locations",
+            "locator": "USA",
+            **parameters,
+        },
+    )
+
+
+class TestNumericKernels:
+    @pytest.mark.parametrize(
+        "rule",
+        [
+            delta_rule(operator="range", min=0.0, max=0.1),
+            delta_rule(operator="less_equal", value=0.05),
+            percentage_rule(operator="greater_equal", value=70),
+            percentage_rule(operator="less", value=0.75),
+            percentage_rule(operator="not_equal", value=50),
+        ],
+    )
+    def test_column_wise_matches_row_wise(self, rule):
+        companies_df = build_companies()
+
+        column_wise = rule.evaluate(companies_df, factorize=True)
+        row_wise = rule.evaluate(companies_df, factorize=False)
+
+        assert column_wise.tolist() == row_wise.tolist()
+
+    def test_undefined_percentages_never_pass(self):
+        numbers = np.array([0.0, 5.0, 5.0, np.nan])
+        totals = np.array([0.0, 0.0, 10.0, 10.0])
+
+        assert percentage_numpy(numbers, totals, 5, 70.0).tolist() == [
+            False,
+            False,
+            True,
+            False,
+        ]
+
+    @pytest.mark.skipif(
+        not numeric_kernels.NUMBA_AVAILABLE, reason="numba is not installed"
+    )
+    def test_numba_backend_is_identical(self):
+        rng = np.random.default_rng(1)
+        values = rng.choice([0, 0.05, 0.1, -0.2, np.nan], size=(1000, 3))
+        factors = np.array([0.5, 1.0, 2.0])
+        numbers = rng.integers(0, 50, 1000).astype(np.float64)
+        totals = rng.integers(0, 50, 1000).astype(np.float64)
+
+        for is_range in (True, False):
+            assert np.array_equal(
+                delta_numpy(values, factors, 4, 0.05, 0.0, 0.1, is_range),
+                numeric_kernels.delta_numba(
+                    values, factors, 4, 0.05, 0.0, 0.1, is_range
+                ),
+            )
+        assert np.array_equal(
+            percentage_numpy(numbers, totals, 3, 70.0),
+            numeric_kernels.percentage_numba(numbers, totals, 3, 70.0),
+        )
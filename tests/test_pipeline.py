@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from src.pipeline import ClassificationPipeline
+from src.result_sinks import CsvResultSink
+
+
+class FakeClassifier:
+    def classify(self, classification_engine, companies_df):
+        results_df = companies_df.reset_index(drop=True)
+        results_df["is_interesting"] = results_df["value"] % 2 == 0
+        return results_df
+
+
+class TestClassificationPipeline:
+    def test_writes_chunks_in_order(self, tmp_path):
+        chunks = [pd.DataFrame({"value": range(i, i + 3)}) for i in (0, 3, 6)]
+        output_path = tmp_path / "output.csv"
+        pipeline = ClassificationPipeline(
+            FakeClassifier(), "static", read_queue_size=1, write_queue_size=1
+        )
+
+        total_rows = pipeline.run(
+            iter(chunks), CsvResultSink(str(output_path))
+        )
+
+        results_df = pd.read_csv(output_path)
+        assert total_rows == 9
+        assert results_df["value"].tolist() == list(range(9))
+        assert results_df["is_interesting"].sum() == 5
+
+    def test_propagates_reader_errors(self, tmp_path):
+        def failing_chunks():
+            yield pd.DataFrame({"value": [1]})
+            raise ValueError("broken input")
+
+        pipeline = ClassificationPipeline(FakeClassifier(), "static")
+
+        with pytest.raises(ValueError, match="broken input"):
+            pipeline.run(
+                failing_chunks(), CsvResultSink(str(tmp_path / "output.csv"))
+            )
+
+    def test_stops_after_the_limit(self, tmp_path):
+        read_chunks = []
+
+        def chunks():
+            for start in range(0, 30, 3):
+                read_chunks.append(start)
+                yield pd.DataFrame({"value": range(start, start + 3)})
+
+        output_path = tmp_path / "output.csv"
+        pipeline = ClassificationPipeline(
+            FakeClassifier(), "static", read_queue_size=1, write_queue_size=1
+        )
+
+        total_rows = pipeline.run(
+            chunks(), CsvResultSink(str(output_path)), limit=4
+        )
+
+        results_df = pd.read_csv(output_path)
+        # Cut right after the 4th interesting row: 0, 2, 4 and 6
+        assert total_rows == 7
+        assert results_df["value"].tolist() == list(range(7))
+        assert pipeline.limit_reached
+        assert pipeline.interesting_rows == 4
+        assert len(read_chunks) < 10
@@ -0,0 +1,155 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.exceptions import ImproperlyConfiguredException
+from src.polars_backend import (
+    resolve_dataframe_backend,
+    rule_expression,
+    saas_expression,
+    sanitize_lazy,
+)
+from src.rules_engine import Rule, StaticRulesEngine
+
+pl = pytest.importorskip("polars")
+
+COMPANIES = {
+    "Description": [
+        "A cloud-based platform",
+        "Hardware manufacturer",
+        "Subscription-based SaaS",
+        None,
+        "Software as a service company",
+    ],
+    "Founded Year": [2010.0, 2021.0, None, 2019.0, 2000.0],
+    "Total Employees": [10.0, 20.0, 45.0, 60.0, None],
+    "Employee Locations": [
+        json.dumps({"USA": 9}),
+        json.dumps({"USA": 5, "Canada": 15}),
+        json.dumps({"USA": 0, "Canada": 45}),
+        json.dumps({"USA": 60}),
+        json.dumps({"USA": 1}),
+    ],
+    "Employee Growth 2Y (%)": [0.2, 0.0, 0.1, 0.3, 0.2],
+    "Employee Growth 1Y (%)": [0.1, 0.0, 0.05, None, 0.1],
+    "Employee Growth 6M (%)": [0.05, 0.1, 0.0, 0.1, 0.05],
+}
+
+SERIES = [
+    {"field": "Employee Growth 2Y (%)", "unit_span": 2},
+    {"field": "Employee Growth 1Y (%)", "unit_span": 1},
+    {"field": "Employee Growth 6M (%)", "unit_span": 0.5},
+]
+
+
+def rule(rule_type, **parameters):
+    return Rule(
+        name=rule_type,
+        rule_id=rule_type,
+        rule_type=rule_type,
+        parameters={"type": rule_type, **parameters},
+    )
+
+
+RULES = [
+    rule(
+        "numeric",
+        operator="range",
+        min=20,
+        max=60,
+        field="Total Employees",
+    ),
+    rule(
+        "date",
+        operator="less_equal",
+        value=5,
+        reference_date="current_year",
+        field="Founded Year",
+    ),
+    rule(
+        "percentage",
+        operator="greater_equal",
+        value=75,
+        reference="Total Employees",
+        field="Employee Locations",
+        locator="USA",
+    ),
+    rule(
+        "percentage",
+        operator="not_equal",
+        value=50,
+        reference="Total Employees",
+        field="Employee Locations",
+        locator="USA",
+    ),
+    rule(
+        "delta",
+        operator="range",
+        min=0.0,
+        max=0.1,
+        ref_unit=1,
+        series=SERIES,
+    ),
+    rule(
+        "expression",
+        expression="Total Employees * 2 > 50 and not (`Founded Year` < 2005)",
+    ),
+    rule(
+        "expression",
+        expression="1 / (1 / `Employee Growth 2Y (%)`) > -1",
+    ),
+    rule(
+        "expression",
+        expression="not (`Total Employees` > 30) or `Founded Year` != 2010",
+    ),
+]
+
+
+class TestPolarsBackend:
+    @pytest.mark.parametrize("rule", RULES)
+    def test_rules_match_the_pandas_engine(self, rule):
+        companies_df = pd.DataFrame(COMPANIES)
+        expected = rule.evaluate(companies_df)
+
+        expression = rule_expression(rule, pl.DataFrame(COMPANIES).schema)
+        results = (
+            pl.DataFrame(COMPANIES).select(expression).to_series().to_numpy()
+        )
+
+        assert results.tolist() == expected.tolist()
+
+    def test_text_rules_are_left_to_pandas(self):
+        text_rule = rule("text", field="Description", keywords=["saas"])
+
+        assert (
+            rule_expression(text_rule, pl.DataFrame(COMPANIES).schema) is None
+        )
+
+    def test_saas_matches_the_static_engine(self):
+        descriptions = pd.Series(COMPANIES["Description"]).fillna("")
+        expected = StaticRulesEngine.is_saas_company_batch(descriptions)
+
+        results = pl.DataFrame(COMPANIES).select(saas_expression())
+
+        assert results.to_series().to_list() == list(expected)
+
+    def test_sanitize_fills_missing_values(self):
+        lf = pl.DataFrame(
+            {"name": ["A", None], "count": [1, None], "flag": [None, True]}
+        ).lazy()
+
+        sanitized = sanitize_lazy(lf, 1, ["count"]).collect()
+
+        assert sanitized["name"].to_list() == ["A", ""]
+        assert sanitized["count"].dtype == pl.Float64
+        assert sanitized["count"].to_list() == [1.0, 0.0]
+        assert sanitized["flag"].to_list() == [False, True]
+        assert np.isnan(
+            sanitize_lazy(lf, 0, ["count"]).collect()["count"].to_numpy()[1]
+        )
+
+    def test_unknown_backend(self):
+        with pytest.raises(ImproperlyConfiguredException):
+            resolve_dataframe_backend("spark")
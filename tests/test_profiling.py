@@ -0,0 +1,21 @@
+from src.utils.logging_utils import RunSummary
+from src.utils.profiling import StageProfiler
+
+
+class TestStageProfiler:
+    def test_summary_stages_are_profiled(self, tmp_path):
+        profiler = StageProfiler(top_functions=5)
+        summary = RunSummary("classify", profiler=profiler)
+
+        with summary.stage("load"):
+            data = [list(range(1000)) for _ in range(10)]
+        profiler.record_rule("founding_age", 0.5)
+        report_path = profiler.write(str(tmp_path), "profile", raw=True)
+
+        assert len(data) == 10
+        assert set(summary.stages) == {"load"}
+        assert profiler.stages["load"]["peak_memory"] > 0
+        report = report_path.read_text()
+        assert "founding_age" in report
+        assert "=== Stage: load ===" in report
+        assert (tmp_path / "profile_load.prof").exists()
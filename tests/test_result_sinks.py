@@ -0,0 +1,94 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.result_sinks import (
+    BitPackedResultSink,
+    SqliteResultSink,
+    load_bitpacked_results,
+)
+
+
+class TestBitPackedResultSink:
+    def test_round_trip_across_unaligned_chunks(self, tmp_path):
+        rng = np.random.default_rng(0)
+        results_df = pd.DataFrame(
+            {
+                "Company Name": [f"Company {i}" for i in range(29)],
+                "is_interesting": rng.random(29) > 0.5,
+                "founding_age": rng.random(29) > 0.5,
+                "is_saas": rng.random(29) > 0.5,
+            }
+        )
+        path = tmp_path / "results.npz"
+        sink = BitPackedResultSink(str(path), id_column="Company Name")
+
+        for start, stop in ((0, 5), (5, 18), (18, 29)):
+            sink.write(results_df.iloc[start:stop])
+        sink.close()
+
+        company_ids, masks = load_bitpacked_results(str(path))
+        assert company_ids.tolist() == results_df["Company Name"].tolist()
+        assert list(masks) == ["is_interesting", "founding_age", "is_saas"]
+        for rule_id, mask in masks.items():
+            assert mask.dtype == bool
+            assert np.array_equal(mask, results_df[rule_id].to_numpy())
+
+    def test_falls_back_to_row_position(self, tmp_path):
+        path = tmp_path / "results.npz"
+        sink = BitPackedResultSink(str(path), id_column="Company Name")
+
+        sink.write(pd.DataFrame({"is_interesting": [True, False, None]}))
+        sink.close()
+
+        company_ids, masks = load_bitpacked_results(str(path))
+        assert company_ids.tolist() == ["0", "1", "2"]
+        assert masks["is_interesting"].tolist() == [True, False, False]
+
+
+class TestSqliteResultSink:
+    def test_writes_an_indexed_table_per_run(self, tmp_path):
+        results_df = pd.DataFrame(
+            {
+                "Company Name": ["A", "B", "C", "D", "E"],
+                "Total Employees": [10.0, None, 30.0, 40.0, 50.0],
+                "is_interesting": [True, False, True, False, False],
+                "growth": np.array([True, None, True, False, True]),
+            }
+        )
+        db_path = str(tmp_path / "results.db")
+
+        for table in ("first_run", "second_run"):
+            sink = SqliteResultSink(db_path, table, batch_size=2)
+            for start in (0, 3):
+                sink.write(results_df.iloc[start : start + 3])
+            sink.close()
+
+        with sqlite3.connect(db_path) as connection:
+            rows = connection.execute(
+                "SELECT * FROM latest_results WHERE is_interesting = 1"
+            ).fetchall()
+            runs = connection.execute(
+                "SELECT table_name, rows FROM runs ORDER BY completed_at"
+            ).fetchall()
+            indexes = connection.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'index' AND tbl_name = 'second_run'"
+            ).fetchall()
+            plan = connection.execute(
+                "EXPLAIN QUERY PLAN "
+                "SELECT * FROM second_run WHERE is_interesting = 1"
+            ).fetchall()
+            tables = connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).fetchall()
+
+        assert rows == [("A", 10.0, 1, 1), ("C", 30.0, 1, 1)]
+        assert runs == [("first_run", 5), ("second_run", 5)]
+        assert sorted(name for (name,) in indexes) == [
+            "second_run__growth",
+            "second_run__is_interesting",
+        ]
+        assert "second_run__is_interesting" in plan[0][-1]
+        assert not any("staging" in name for (name,) in tables)
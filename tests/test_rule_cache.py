@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from src.rule_cache import RuleResultCache, definition_hash
+
+COMPANIES = pd.DataFrame(
+    {"Total Employees": [10, 30, 50], "Founded Year": [2020, 2010, 2000]}
+)
+
+RULE = {
+    "type": "numeric",
+    "parameters": {"field": "Total Employees", "operator": ">=", "value": 20},
+}
+
+
+class CountingRule:
+    def __init__(self, results):
+        self.results = np.asarray(results)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.results
+
+
+class TestRuleCache:
+    def test_reuses_the_results_of_unchanged_rules(self, tmp_path):
+        cache = RuleResultCache(str(tmp_path))
+        rule = CountingRule([False, True, True])
+        fields = ["Total Employees"]
+
+        first = cache.evaluate(RULE, fields, COMPANIES, rule)
+        second = cache.evaluate(RULE, fields, COMPANIES, rule)
+        # Unrelated fields do not invalidate the results
+        other = COMPANIES.assign(**{"Founded Year": 1990})
+        third = cache.evaluate(RULE, fields, other, rule)
+
+        assert rule.calls == 1
+        assert np.array_equal(first, second)
+        assert np.array_equal(first, third)
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    def test_changed_rules_and_data_are_evaluated_again(self, tmp_path):
+        cache = RuleResultCache(str(tmp_path))
+        rule = CountingRule([False, True, True])
+        fields = ["Total Employees"]
+        changed = {
+            **RULE,
+            "parameters": {**RULE["parameters"], "value": 40},
+        }
+
+        cache.evaluate(RULE, fields, COMPANIES, rule)
+        cache.evaluate(changed, fields, COMPANIES, rule)
+        cache.evaluate(
+            RULE, fields, COMPANIES.assign(**{"Total Employees": 1}), rule
+        )
+
+        assert rule.calls == 3
+
+    def test_definitions_are_normalized(self):
+        # Keys in another order, and the same value as a float
+        equivalent = {
+            "parameters": {
+                "value": 20.0,
+                "operator": ">=",
+                "field": "Total Employees",
+            },
+            "type": "numeric",
+        }
+
+        assert definition_hash(RULE) == definition_hash(equivalent)
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from src.sampling import (
+    ReservoirSampler,
+    pass_rates,
+    sample_size_for,
+    wilson_interval,
+)
+
+
+class TestSampling:
+    def test_sample_size_for(self):
+        # The classic 95% confidence, 1% error sample size
+        assert sample_size_for(0.01, 0.95) == 9604
+
+    def test_wilson_interval(self):
+        lower, upper = wilson_interval(50, 100, 0.95)
+
+        assert 0.40 < lower < 0.5 < upper < 0.60
+        assert wilson_interval(0, 100, 0.95)[0] == 0.0
+
+    def test_reservoir_keeps_a_fixed_size_sample_in_order(self):
+        sampler = ReservoirSampler(10, seed=0)
+
+        # Chunks read from a CSV keep numbering the rows
+        for start in range(0, 100, 30):
+            rows = range(start, start + 30)
+            sampler.add(pd.DataFrame({"value": rows}, index=rows))
+
+        sample = sampler.sample()
+        assert sampler.seen_rows == 120
+        assert len(sample) == 10
+        assert list(sample.columns) == ["value"]
+        assert sample["value"].is_monotonic_increasing
+        assert sample["value"].is_unique
+
+    def test_pass_rates_are_exact_on_the_whole_dataset(self):
+        results_df = pd.DataFrame(
+            {
+                "Company": ["A", "B", "C", "D"],
+                "is_interesting": [True, False, False, False],
+                "is_saas": [True, True, False, None],
+            }
+        )
+
+        report = pass_rates(results_df, 0.95, total_rows=4)
+
+        assert report["rule_id"].tolist() == ["is_interesting", "is_saas"]
+        assert report["pass_rate"].tolist() == [0.25, 0.5]
+        assert report["ci_lower"].tolist() == report["pass_rate"].tolist()
+        assert report["ci_upper"].tolist() == report["pass_rate"].tolist()
@@ -0,0 +1,144 @@
+import pandas as pd
+import pytest
+
+from src.exceptions import InvalidOperationException
+from src.result_sinks import CsvResultSink
+from src.sharding import (
+    SOURCE_ROW_COLUMN,
+    ShardSelector,
+    merge_shards,
+    parse_shard,
+    shard_output_filename,
+    write_manifest,
+)
+
+
+def write_shard(tmp_path, input_filename, df, index, count):
+    input_path = tmp_path / input_filename
+    if not input_path.exists():
+        df.to_csv(input_path, index=False)
+    selector = ShardSelector(index, count)
+    shard_df = selector.select(df)
+    filename = shard_output_filename(input_filename, index, count)
+    shard_df.to_csv(tmp_path / filename, index=False)
+    write_manifest(
+        str(tmp_path),
+        str(input_path),
+        filename,
+        selector,
+        len(shard_df),
+        "static",
+    )
+
+
+class TestSharding:
+    def test_parse_shard(self):
+        assert parse_shard("0/4") == (0, 4)
+        assert parse_shard("3/4") == (3, 4)
+
+        with pytest.raises(ValueError):
+            parse_shard("4/4")
+        with pytest.raises(ValueError):
+            parse_shard("1")
+
+    def test_shards_cover_every_row_once(self):
+        df = pd.DataFrame({"Company": [f"Company {i}" for i in range(100)]})
+
+        shards = [ShardSelector(index, 3).select(df) for index in range(3)]
+
+        source_rows = pd.concat(shards)[SOURCE_ROW_COLUMN]
+        assert sorted(source_rows) == list(range(100))
+
+    def test_shards_do_not_depend_on_dtypes(self):
+        # The same rows, parsed with other dtypes, e.g.: from another chunk
+        numbers = pd.DataFrame({"Total Employees": [10, 20, 30, 40]})
+        floats = numbers.astype("float64")
+
+        selections = [
+            ShardSelector(1, 3).select(df)[SOURCE_ROW_COLUMN].tolist()
+            for df in (numbers, floats)
+        ]
+
+        assert selections == [[1], [1]]
+
+    def test_merge_restores_input_order(self, tmp_path):
+        input_path = tmp_path / "companies.csv"
+        df = pd.DataFrame({"Company": [f"Company {i}" for i in range(20)]})
+        df.to_csv(input_path, index=False)
+
+        for index in range(2):
+            selector = ShardSelector(index, 2)
+            shard_df = selector.select(df)
+            filename = shard_output_filename("companies.csv", index, 2)
+            shard_df.to_csv(tmp_path / filename, index=False)
+            write_manifest(
+                str(tmp_path),
+                str(input_path),
+                filename,
+                selector,
+                len(shard_df),
+                "static",
+            )
+
+        total_rows = merge_shards(
+            str(tmp_path),
+            "companies.csv",
+            CsvResultSink(str(tmp_path / "out.csv")),
+        )
+
+        merged_df = pd.read_csv(tmp_path / "out.csv")
+        assert total_rows == 20
+        assert merged_df.equals(df)
+
+    def test_merge_requires_every_shard(self, tmp_path):
+        input_path = tmp_path / "companies.csv"
+        df = pd.DataFrame({"Company": ["A", "B", "C"]})
+        df.to_csv(input_path, index=False)
+        selector = ShardSelector(0, 2)
+        shard_df = selector.select(df)
+        filename = shard_output_filename("companies.csv", 0, 2)
+        shard_df.to_csv(tmp_path / filename, index=False)
+        write_manifest(
+            str(tmp_path),
+            str(input_path),
+            filename,
+            selector,
+            len(shard_df),
+            "static",
+        )
+
+        with pytest.raises(InvalidOperationException):
+            merge_shards(
+                str(tmp_path),
+                "companies.csv",
+                CsvResultSink(str(tmp_path / "out.csv")),
+            )
+
+    def test_merge_ignores_inputs_with_the_same_suffix(self, tmp_path):
+        df = pd.DataFrame({"Company": [f"Company {i}" for i in range(10)]})
+        eu_df = pd.DataFrame({"Company": ["EU 1", "EU 2"]})
+        for index in range(2):
+            write_shard(tmp_path, "companies.csv", df, index, 2)
+            write_shard(tmp_path, "eu_companies.csv", eu_df, index, 2)
+
+        total_rows = merge_shards(
+            str(tmp_path),
+            "companies.csv",
+            CsvResultSink(str(tmp_path / "out.csv")),
+        )
+
+        assert total_rows == 10
+        assert pd.read_csv(tmp_path / "out.csv").equals(df)
+
+    def test_merge_rejects_mixed_shard_counts(self, tmp_path):
+        df = pd.DataFrame({"Company": [f"Company {i}" for i in range(10)]})
+        write_shard(tmp_path, "companies.csv", df, 0, 2)
+        write_shard(tmp_path, "companies.csv", df, 1, 2)
+        write_shard(tmp_path, "companies.csv", df, 2, 3)
+
+        with pytest.raises(InvalidOperationException, match="shard counts"):
+            merge_shards(
+                str(tmp_path),
+                "companies.csv",
+                CsvResultSink(str(tmp_path / "out.csv")),
+            )
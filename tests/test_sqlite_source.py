@@ -0,0 +1,137 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from src.data_loader import DataLoader
+from src.rules_engine import Rule
+from src.sqlite_source import SQLiteCompanySource, build_where_clause
+
+RULES = [
+    Rule(
+        name="Range of employees",
+        rule_id="employees",
+        rule_type="numeric",
+        parameters={
+            "type": "numeric",
+            "operator": "range",
+            "min": 20,
+            "max": 60,
+            "field": "Total Employees",
+        },
+    ),
+    Rule(
+        name="Founded after 2000",
+        rule_id="founded",
+        rule_type="date",
+        parameters={
+            "type": "date",
+            "operator": "less",
+            "year": 2000,
+            "field": "Founded Year",
+        },
+    ),
+    Rule(
+        name="Mostly in the USA",
+        rule_id="usa",
+        rule_type="percentage",
+        parameters={
+            "type": "percentage",
+            "operator": "greater_equal",
+            "value": 0.75,
+            "reference": "Total Employees",
+            "field": "Employee Locations",
+            "locator": "USA",
+        },
+    ),
+]
+
+COMPANIES = pd.DataFrame(
+    {
+        "Company Name": ["A", "B", "C", "D", "E"],
+        "Total Employees": [10, 20, 45, 60, None],
+        "Founded Year": [2010, 1999, 2005, 2020, 2015],
+    }
+)
+
+
+def create_database(tmp_path):
+    db_path = str(tmp_path / "companies.db")
+    with sqlite3.connect(db_path) as connection:
+        COMPANIES.to_sql("companies", connection, index=False)
+    return db_path
+
+
+class TestSQLiteSource:
+    def test_build_where_clause_pushes_scalar_rules(self):
+        where_clause, params, pushed_rule_ids = build_where_clause(
+            RULES, sanitizing_strategy=0
+        )
+
+        assert pushed_rule_ids == ["employees", "founded"]
+        assert where_clause == (
+            'WHERE ("Total Employees" BETWEEN ? AND ?) '
+            'AND (? < "Founded Year")'
+        )
+        assert params == [20, 60, 2000]
+
+    def test_fetches_the_rows_passing_the_pushed_rules(self, tmp_path):
+        source = SQLiteCompanySource(
+            create_database(tmp_path), "companies", RULES
+        )
+
+        df = source.read()
+
+        # The pushed rules agree with the Python comparators
+        expected = COMPANIES[
+            COMPANIES.apply(
+                lambda row: all(rule.apply_rule(row) for rule in RULES[:2]),
+                axis=1,
+            )
+        ]
+        assert list(df["Company Name"]) == list(expected["Company Name"])
+        assert source.fetched_rows == 2
+        assert source.count_rows() == 5
+
+    def test_iter_chunks_numbers_rows_continuously(self, tmp_path):
+        source = SQLiteCompanySource(create_database(tmp_path), "companies")
+
+        chunks = list(source.iter_chunks(2))
+
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+        assert list(pd.concat(chunks).index) == [0, 1, 2, 3, 4]
+        assert source.fetched_rows == 5
+
+    @pytest.mark.parametrize("sanitizing_strategy", [0, 1])
+    def test_null_rows_match_the_csv_path(self, tmp_path, sanitizing_strategy):
+        rule = Rule(
+            name="Small team",
+            rule_id="small",
+            rule_type="numeric",
+            parameters={
+                "type": "numeric",
+                "operator": "less_equal",
+                "value": 25,
+                "field": "Total Employees",
+            },
+        )
+        source = SQLiteCompanySource(
+            create_database(tmp_path),
+            "companies",
+            [rule],
+            sanitizing_strategy=sanitizing_strategy,
+        )
+        loader = DataLoader(sanitizing_strategy)
+
+        fetched_df = loader.load_sqlite_companies(source)
+        # Without pushdown, every row is sanitized and classified
+        companies_df = loader._sanitize(COMPANIES)
+        expected = companies_df[rule.evaluate(companies_df).astype(bool)]
+
+        assert list(fetched_df["Company Name"]) == list(
+            expected["Company Name"]
+        )
+        # "E" has no employees, sanitized to 0 with a strategy
+        assert ("E" in list(fetched_df["Company Name"])) == bool(
+            sanitizing_strategy
+        )
@@ -1,5 +1,9 @@
+from datetime import datetime
 from unittest.mock import patch
 
+import numpy as np
+import pandas as pd
+
 from src.rules_engine import StaticRulesEngine
 
 
@@ -188,3 +192,40 @@ class TestStaticRulesEngine:
 
         # Test with empty string
         assert StaticRulesEngine.is_saas_company("") is False
+
+    def test_batch_rules(self):
+        assert list(
+            StaticRulesEngine.has_20_to_60_employees_batch(
+                pd.Series([19, 20, 60, 61, None])
+            )
+        ) == [False, True, True, False, False]
+
+        assert list(
+            StaticRulesEngine.most_of_employees_are_us_based_batch(
+                ['{"USA": 35, "Canada": 15}', {"Canada": 30}, {"USA": 1}]
+            )
+        ) == [True, False, True]
+
+        assert list(
+            StaticRulesEngine.is_us_based_batch(
+                np.array(["USA", "Canada", None], dtype=object)
+            )
+        ) == [True, False, False]
+
+        this_year = datetime.now().year
+        assert list(
+            StaticRulesEngine.is_founded_in_last_5_years_batch(
+                [this_year - 5, this_year - 6, 0, None]
+            )
+        ) == [True, False, False, False]
+
+        assert list(
+            StaticRulesEngine.is_saas_company_batch(
+                [
+                    "Software solution with annual subscription model",
+                    "Monthly subscription service but hardware is sold",
+                    "We provide consultancy services",
+                    None,
+                ]
+            )
+        ) == [True, False, False, False]
@@ -0,0 +1,206 @@
+import pandas as pd
+import pytest
+import yaml
+
+from src.classifier import ClassificationEngine
+from src.exceptions import InvalidOperationException
+from src.rules_engine import DynamicRulesEngine, Rule
+from src.text_index import TokenIndex, tokenize
+
+DESCRIPTIONS = [
+    "A cloud-based platform with a monthly subscription",
+    "We sell hardware on a monthly subscription",
+    "Software as a service for accountants",
+    "Subscription boxes shipped every month, monthly fees apply",
+    None,
+    "A cloud-based platform with a monthly subscription",
+]
+
+
+def write_rules(tmp_path, monkeypatch, parameters):
+    rules_path = tmp_path / "rules.yaml"
+    rules = [
+        {"id": "saas_business_model", "name": "SaaS", **parameters},
+        {
+            "id": "subscription",
+            "name": "Subscription",
+            "parameters": {
+                "type": "text",
+                "field": "Description",
+                "keywords": ["service", "subscription"],
+            },
+        },
+    ]
+    rules_path.write_text(yaml.safe_dump({"rules": rules}))
+    monkeypatch.setenv("RULES_CONFIG_FILE", str(rules_path))
+
+
+class TestTokenIndex:
+    def test_tokenize(self):
+        assert tokenize("A Cloud-Based platform!") == [
+            "a",
+            "cloud-based",
+            "platform",
+        ]
+        assert tokenize(None) == []
+
+    def test_keywords(self):
+        index = TokenIndex(DESCRIPTIONS)
+
+        results = index.match({"keywords": ["cloud-based", "hardware"]})
+
+        assert results.tolist() == [True, True, False, False, False, True]
+
+    def test_phrases(self):
+        index = TokenIndex(DESCRIPTIONS)
+
+        results = index.match({"phrases": ["software as a service"]})
+
+        assert results.tolist() == [False, False, True, False, False, False]
+
+    def test_proximity(self):
+        index = TokenIndex(DESCRIPTIONS)
+
+        results = index.match(
+            {
+                "proximity": [
+                    {"terms": ["monthly", "subscription"], "distance": 1}
+                ]
+            }
+        )
+
+        assert results.tolist() == [True, True, False, False, False, True]
+
+    def test_match_all_and_exclude(self):
+        index = TokenIndex(DESCRIPTIONS)
+
+        results = index.match(
+            {
+                "match": "all",
+                "keywords": ["monthly"],
+                "phrases": ["monthly subscription"],
+                "exclude": {"keywords": ["hardware"]},
+            }
+        )
+
+        assert results.tolist() == [True, False, False, False, False, True]
+
+    def test_requires_criteria(self):
+        with pytest.raises(InvalidOperationException):
+            TokenIndex(DESCRIPTIONS).match({"field": "Description"})
+
+    def test_rule_row_and_column_wise_agree(self):
+        companies_df = pd.DataFrame({"Description": DESCRIPTIONS})
+        rule = Rule(
+            name="SaaS business model",
+            rule_id="saas_business_model",
+            rule_type="text",
+            parameters={
+                "type": "text",
+                "field": "Description",
+                "keywords": ["cloud-based"],
+                "phrases": ["software as a service"],
+            },
+        )
+
+        column_wise = rule.evaluate(companies_df, factorize=True)
+        row_wise = rule.evaluate(companies_df, factorize=False)
+
+        assert column_wise.tolist() == row_wise.tolist()
+        assert column_wise.tolist() == [True, False, True, False, False, True]
+
+    def test_description_rule_replaces_the_saas_check(
+        self, tmp_path, monkeypatch
+    ):
+        # "Software as a service" is not SaaS for the built-in patterns
+        write_rules(
+            tmp_path,
+            monkeypatch,
+            {
+                "replaces": "is_saas",
+                "parameters": {
+                    "type": "text",
+                    "field": "Description",
+                    "phrases": ["software as a service"],
+                },
+            },
+        )
+        companies_df = pd.DataFrame({"Description": DESCRIPTIONS})
+
+        results_df = ClassificationEngine().classify("dynamic", companies_df)
+
+        assert "is_saas" not in results_df.columns
+        assert results_df["is_interesting"].tolist() == [
+            False,
+            False,
+            True,
+            False,
+            False,
+            False,
+        ]
+
+    def test_description_rules_keep_the_saas_check(
+        self, tmp_path, monkeypatch
+    ):
+        write_rules(
+            tmp_path,
+            monkeypatch,
+            {
+                "parameters": {
+                    "type": "text",
+                    "field": "Description",
+                    "phrases": ["software as a service"],
+                }
+            },
+        )
+        companies_df = pd.DataFrame({"Description": DESCRIPTIONS})
+
+        results_df = ClassificationEngine().classify("dynamic", companies_df)
+
+        assert "is_saas" in results_df.columns
+        assert not results_df["is_interesting"].any()
+
+    @pytest.mark.parametrize(
+        "rule",
+        [
+            {
+                "replaces": "is_b2b",
+                "parameters": {
+                    "type": "text",
+                    "field": "Description",
+                    "keywords": ["saas"],
+                },
+            },
+            {
+                "replaces": "is_saas",
+                "parameters": {
+                    "type": "numeric",
+                    "operator": "greater",
+                    "value": 1,
+                    "field": "Total Employees",
+                },
+            },
+        ],
+    )
+    def test_rejects_invalid_replacements(self, tmp_path, monkeypatch, rule):
+        write_rules(tmp_path, monkeypatch, rule)
+
+        with pytest.raises(InvalidOperationException, match="replace"):
+            DynamicRulesEngine()
+
+    def test_rejects_unknown_match_modes(self, tmp_path, monkeypatch):
+        write_rules(
+            tmp_path,
+            monkeypatch,
+            {
+                "parameters": {
+                    "type": "text",
+                    "field": "Description",
+                    "match": "most",
+                    "keywords": ["saas"],
+                }
+            },
+        )
+
+        with pytest.raises(InvalidOperationException, match="most"):
+            DynamicRulesEngine()
@@ -0,0 +1,45 @@
+from src.watcher import COMPLETED, DirectoryWatcher, FileLedger
+
+
+class TestWatcher:
+    def test_ledger_survives_restarts(self, tmp_path):
+        ledger = FileLedger(tmp_path / "ledger.json")
+        fingerprint = {"size": 10, "mtime": 1.5}
+        ledger.start("a.csv", fingerprint, "parsed_a.csv")
+        ledger.complete("a.csv", rows=3)
+
+        reloaded = FileLedger(tmp_path / "ledger.json")
+
+        assert reloaded.entries["a.csv"]["status"] == COMPLETED
+        assert reloaded.is_done("a.csv", fingerprint)
+        # A modified file is a new version
+        assert not reloaded.is_done("a.csv", {"size": 11, "mtime": 2.0})
+
+    def test_recover_discards_interrupted_outputs(self, tmp_path):
+        ledger = FileLedger(tmp_path / "ledger.json")
+        ledger.start("a.csv", {"size": 10, "mtime": 1.5}, "parsed_a.csv")
+        (tmp_path / "parsed_a.csv").write_text("partial")
+
+        interrupted = FileLedger(tmp_path / "ledger.json").recover(
+            str(tmp_path)
+        )
+
+        assert interrupted == ["a.csv"]
+        assert not (tmp_path / "parsed_a.csv").exists()
+        assert FileLedger(tmp_path / "ledger.json").entries == {}
+
+    def test_poll_waits_for_stable_files(self, tmp_path):
+        input_dir = tmp_path / "input"
+        input_dir.mkdir()
+        ledger = FileLedger(tmp_path / "ledger.json")
+        watcher = DirectoryWatcher(str(input_dir), ledger)
+        dataset = input_dir / "a.csv"
+        dataset.write_text("Company Name\nA\n")
+
+        # Seen for the first time, it may still be copied
+        assert watcher.poll() == []
+        assert watcher.poll() == [dataset]
+
+        ledger.start("a.csv", watcher.fingerprint(dataset), "parsed_a.csv")
+        ledger.complete("a.csv", rows=1)
+        assert watcher.poll() == []